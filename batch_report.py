@@ -0,0 +1,163 @@
+import argparse
+import html
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+from results_store import load_arrays
+
+# Unattended reports for one or many result sets (results JSON files or store
+# directories): all figures of a run go into one self-contained HTML file
+# (plotly.js inlined, no browser or internet needed), or into static images
+# (needs kaleido). Runs are rendered in parallel, and traces are built from
+# whole arrays: one stacked-area trace per category and one heatmap per
+# component type, so the figure size does not grow with the component count.
+# Horizons longer than --max-points hours are averaged into equal bins.
+
+MAX_POINTS = 2000
+IMAGE_FORMATS = ("png", "svg", "pdf")
+
+def downsample(values, max_points=MAX_POINTS):
+    # (hours, values) with the hour axis of a (..., hours) array averaged into
+    # at most max_points bins; hours are the first hour of each bin
+    num_hours = values.shape[-1]
+    step = -(-num_hours // max_points)
+    if step <= 1:
+        return np.arange(num_hours), np.asarray(values, dtype=float)
+    bins = -(-num_hours // step)
+    padded = np.full(values.shape[:-1] + (bins * step,), np.nan)
+    padded[..., :num_hours] = values
+    return np.arange(0, num_hours, step), np.nanmean(padded.reshape(values.shape[:-1] + (bins, step)), axis=-1)
+
+def heatmap_figure(data, category, name, title, colorbar, max_points, colorscale="Viridis", zmid=None):
+    hours, z = downsample(np.asarray(data["arrays"][category][name]), max_points)
+    fig = go.Figure(go.Heatmap(z=z, x=hours, y=data["components"][category], colorscale=colorscale, zmid=zmid,
+                               colorbar={"title": colorbar}))
+    fig.update_layout(title=title, xaxis_title="Time (Hours)", template="plotly_white",
+                      height=max(350, min(1200, 20 * len(data["components"][category]) + 150)))
+    return fig
+
+def report_figures(data, max_points=MAX_POINTS):
+    # Figures of one run, from load_arrays output
+    arrays = data["arrays"]
+    demand = np.asarray(arrays["buses"]["demand"])
+    shift = np.asarray(arrays["buses"]["shift"])
+    totals = np.vstack([
+        np.asarray(arrays["generators"]["power_output"]).sum(axis=0),
+        np.asarray(arrays["renewables_generators"]["power_output"]).sum(axis=0),
+        np.asarray(arrays["storage"]["discharge"]).sum(axis=0),
+        np.asarray(arrays["storage"]["charge"]).sum(axis=0),
+        demand.sum(axis=0),
+        (demand + shift).sum(axis=0),
+    ])
+    hours, totals = downsample(totals, max_points)
+
+    # Generation by category against demand
+    fig_mix = go.Figure()
+    for row, label in enumerate(("Thermal generation", "Renewable generation", "Storage discharge")):
+        fig_mix.add_trace(go.Scatter(x=hours, y=totals[row], name=label, mode="lines", stackgroup="supply",
+                                     hovertemplate=f"{label}<br>Hour: %{{x}}<br>%{{y:.2f}} MW"))
+    for row, label, dash in ((3, "Storage charge", "dash"), (4, "Total Demand", "solid"), (5, "Total Shifted Demand", "dot")):
+        fig_mix.add_trace(go.Scatter(x=hours, y=totals[row], name=label, mode="lines", line=dict(dash=dash),
+                                     hovertemplate=f"{label}<br>Hour: %{{x}}<br>%{{y:.2f}} MW"))
+    fig_mix.update_layout(title="Generation Mix and Demand Over Time", xaxis_title="Time (Hours)",
+                          yaxis_title="Power (MW)", template="plotly_white")
+
+    return [
+        fig_mix,
+        heatmap_figure(data, "generators", "power_output", "Generator Power Output Over Time", "MW", max_points),
+        heatmap_figure(data, "generators", "on_off_status", "Generator On/Off Status Over Time", "On", max_points,
+                       colorscale="Blues"),
+        heatmap_figure(data, "transmission_lines", "flow", "Transmission Line Flows Over Time", "MW", max_points,
+                       colorscale="RdBu", zmid=0),
+        heatmap_figure(data, "buses", "shift", "Bus Demand Shift Over Time", "MW", max_points,
+                       colorscale="RdBu", zmid=0),
+        heatmap_figure(data, "storage", "SoC", "Storage State of Charge Over Time", "SOC", max_points),
+    ]
+
+def run_name(path):
+    return os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+
+def figure_divs(path, max_points):
+    # Heading and figure <div>s of one run, without plotly.js
+    data = load_arrays(path)
+    heading = f"<h2>{html.escape(run_name(path))}</h2><p>Total cost: {data['total_cost']:,.2f}</p>"
+    return heading + "".join(pio.to_html(fig, include_plotlyjs=False, full_html=False)
+                             for fig in report_figures(data, max_points))
+
+def html_document(title, body):
+    return (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title>"
+            f"<script type=\"text/javascript\">{get_plotlyjs()}</script></head><body>{body}</body></html>")
+
+def render_run(path, output_dir, fmt="html", max_points=MAX_POINTS, combined=False):
+    # Writes the report of one run; with combined=True returns its HTML
+    # fragment instead. Returns the written path(s) otherwise.
+    if fmt == "html":
+        body = figure_divs(path, max_points)
+        if combined:
+            return body
+        target = os.path.join(output_dir, f"{run_name(path)}.html")
+        with open(target, "w") as f:
+            f.write(html_document(run_name(path), body))
+        return [target]
+    targets = []
+    for i, fig in enumerate(report_figures(load_arrays(path), max_points), start=1):
+        target = os.path.join(output_dir, f"{run_name(path)}_{i}.{fmt}")
+        fig.write_image(target)
+        targets.append(target)
+    return targets
+
+def render_reports(paths, output_dir="reports", fmt="html", workers=None, max_points=MAX_POINTS, combined=None):
+    # combined: file name of a single HTML report holding every run (html only)
+    if fmt in IMAGE_FORMATS:
+        try:
+            import kaleido  # noqa: F401  (plotly's static image backend)
+        except ImportError:
+            raise SystemExit("Static images need the kaleido package (pip install kaleido); use --format html")
+    os.makedirs(output_dir, exist_ok=True)
+    bodies = {}
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(render_run, path, output_dir, fmt, max_points, combined is not None): path
+                   for path in paths}
+        for n, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failed.append(path)
+                print(f"[{n}/{len(paths)}] {path}: failed ({e})")
+                continue
+            if combined is not None:
+                bodies[path] = result
+                print(f"[{n}/{len(paths)}] {path}: rendered")
+            else:
+                print(f"[{n}/{len(paths)}] {path}: {', '.join(result)}")
+
+    if combined is not None and bodies:
+        target = os.path.join(output_dir, combined)
+        with open(target, "w") as f:
+            f.write(html_document("Unit commitment results", "".join(bodies[path] for path in paths if path in bodies)))
+        print(f"Combined report saved to {target}")
+    return failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render result reports without a browser")
+    parser.add_argument("results", nargs="+", help="results JSON files and/or results store directories")
+    parser.add_argument("--output-dir", default="reports")
+    parser.add_argument("--format", choices=("html",) + IMAGE_FORMATS, default="html")
+    parser.add_argument("--combined", metavar="FILE", help="write one HTML file holding every run (html only)")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--max-points", type=int, default=MAX_POINTS, help="hours per figure before averaging into bins")
+    args = parser.parse_args(argv)
+    if args.combined and args.format != "html":
+        parser.error("--combined needs --format html")
+
+    failed = render_reports(args.results, args.output_dir, args.format, args.workers, args.max_points, args.combined)
+    if failed:
+        raise SystemExit(f"{len(failed)} report(s) failed")
+
+if __name__ == '__main__':
+    main()
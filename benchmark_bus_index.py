@@ -0,0 +1,50 @@
+import argparse
+import time
+from pyomo.environ import *
+from unit_commitment_model_solar import define_model
+from synthetic_case import generate_case
+
+# PowerBalance construction time with the bus incidence index (GenAtBus, ...)
+# against the previous rule that scanned every set for each (bus, hour).
+
+def legacy_power_balance_rule(model, b, t):
+    gen_renewables = sum(model.P_renewables[gs, t] for gs in model.GS if model.GenBusRenewables[gs] == b)
+    gen_sum = sum(model.P[g, t] for g in model.G if model.GenBus[g] == b)
+    discharge = sum(model.Discharge[i, t] for i in model.SD if model.StorageBus[i] == b)
+    charge = sum(model.Charge[i, t] for i in model.SD if model.StorageBus[i] == b)
+    line_flow_sum = (
+        sum(model.Flow[l, t] for l in model.L if model.LineFrom[l] == b)
+        - sum(model.Flow[l, t] for l in model.L if model.LineTo[l] == b)
+    )
+    return gen_sum + gen_renewables + discharge - charge + line_flow_sum == model.Demand[b, t]
+
+def time_build(data, legacy):
+    model = define_model(0, 0)
+    if legacy:
+        model.del_component(model.PowerBalance)
+        model.PowerBalance = Constraint(model.B, model.T, rule=legacy_power_balance_rule)
+    start = time.perf_counter()
+    model.create_instance(data)
+    return time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark PowerBalance construction with and without the bus index")
+    parser.add_argument("--buses", type=int, default=2000)
+    parser.add_argument("--generators", type=int, default=500)
+    parser.add_argument("--lines", type=int, default=None, help="default: 1.3 x buses")
+    parser.add_argument("--renewables", type=int, default=200)
+    parser.add_argument("--storage", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    data = generate_case(args.buses, args.generators, args.lines, args.renewables, args.storage)
+    print(f"Synthetic case: {args.buses} buses, {args.generators} generators, "
+          f"{len(data[None]['L'][None])} lines, {args.renewables} renewables, {args.storage} storage")
+
+    indexed = time_build(data, legacy=False)
+    print(f"create_instance with bus index:    {indexed:.2f} s")
+    legacy = time_build(data, legacy=True)
+    print(f"create_instance with set scanning: {legacy:.2f} s")
+    print(f"Speedup: {legacy / indexed:.1f}x")
+
+if __name__ == '__main__':
+    main()
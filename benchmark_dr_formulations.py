@@ -0,0 +1,47 @@
+import argparse
+import sys
+import time
+from pyomo.environ import *
+from unit_commitment_model_solar import define_model
+from solver_config import make_solver, solve_instance, check_solution, add_solver_arguments, solver_config_from_args
+
+# Checks that the 'backlog' demand-shift formulation reaches the same optimal
+# cost as the 'pairwise' one on the shipped dataset, and reports model size
+# and build time for both.
+
+CASES = [(0.2, 2), (0.05, 1), (0.5, 4), (0.3, 8), (0.95, 23), (0.0, 5), (0.2, 0)]
+
+def build_and_solve(data_file, shift_max_percent, shift_max_hours, dr_formulation, config):
+    start = time.perf_counter()
+    instance = define_model(shift_max_percent, shift_max_hours, dr_formulation=dr_formulation).create_instance(data_file)
+    build_time = time.perf_counter() - start
+    num_vars = sum(len(v) for v in instance.component_objects(Var, active=True))
+    check_solution(solve_instance(make_solver(config), instance, config))
+    return value(instance.TotalCost), num_vars, build_time
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the pairwise and backlog demand-shift formulations")
+    parser.add_argument("--data", default="unit_commitment_data_solar.dat")
+    add_solver_arguments(parser)
+    parser.add_argument("--tolerance", type=float, default=1e-4, help="relative cost tolerance")
+    args = parser.parse_args(argv)
+    config = solver_config_from_args(args)
+
+    mismatches = 0
+    print(f"{'percent':>8} {'hours':>5} {'pairwise cost':>14} {'backlog cost':>14} "
+          f"{'vars':>12} {'build s':>14}")
+    for p, h in CASES:
+        pair_cost, pair_vars, pair_time = build_and_solve(args.data, p, h, 'pairwise', config)
+        back_cost, back_vars, back_time = build_and_solve(args.data, p, h, 'backlog', config)
+        match = abs(pair_cost - back_cost) <= args.tolerance * max(abs(pair_cost), 1)
+        mismatches += not match
+        print(f"{p:>8} {h:>5} {pair_cost:>14.1f} {back_cost:>14.1f} "
+              f"{pair_vars:>5}/{back_vars:<6} {pair_time:>6.2f}/{back_time:<6.2f}{'' if match else '  MISMATCH'}")
+
+    if mismatches:
+        print(f"{mismatches} case(s) differ")
+        sys.exit(1)
+    print("All cases match")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import pyomo.version
+from pyomo.environ import *
+from unit_commitment_model_solar import DR_FORMULATIONS, define_model
+from solve_uc_solar import extract_arrays, extract_results
+from solver_config import make_solver, solve_instance, add_solver_arguments, solver_config_from_args
+from synthetic_case import generate_case, parse_case, write_dat
+from data_loader import load_data
+from results_store import load_arrays
+from network_layout import create_fixed_positions
+from network_view import build_cube, process_network_data
+
+# Times every phase of a unit commitment run on synthetic cases of growing
+# size: .dat parsing, create_instance, LP writing, solve, extraction, JSON
+# write and the dashboard's preprocessing of the written results (cube,
+# layout and the first hour's network payload). Each run is appended to a
+# JSON lines file together with the git commit, case sizes and solver
+# settings, so runs of different versions can be compared with --summary.
+
+PHASES = ("data_load", "create_instance", "lp_write", "solve", "extraction", "json_write", "dashboard")
+DEFAULT_CASES = ("30x20", "120x80", "300x200x48")
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_phases(dat_file, num_hours, config, work_dir, shift_max_percent=0.2, shift_max_hours=2,
+               dr_formulation='pairwise'):
+    # {"phases": {phase: seconds}, ...} for one run of the case in dat_file
+    phases = {}
+
+    def timed(name, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        phases[name] = time.perf_counter() - start
+        return result
+
+    data = timed("data_load", load_data, dat_file, cache_dir=None)
+    model = define_model(shift_max_percent, shift_max_hours, dr_formulation=dr_formulation, num_hours=num_hours)
+    instance = timed("create_instance", model.create_instance, data)
+    timed("lp_write", instance.write, os.path.join(work_dir, "model.lp"), io_options={"symbolic_solver_labels": False})
+    status = timed("solve", solve_instance, make_solver(config), instance, config)
+    results_data = None
+    if status["has_solution"]:
+        results_data = timed("extraction", lambda: extract_results(instance, extracted=extract_arrays(instance)))
+        json_file = os.path.join(work_dir, "results.json")
+
+        def write_json():
+            with open(json_file, "w") as f:
+                json.dump(results_data, f, indent=4)
+        timed("json_write", write_json)
+
+        def dashboard():
+            results = load_arrays(json_file)
+            positions = create_fixed_positions(results, cache_dir=None)
+            return process_network_data(build_cube(results), 0, positions)
+        timed("dashboard", dashboard)
+
+    return {
+        "phases": phases,
+        "variables": sum(len(v) for v in instance.component_objects(Var, active=True)),
+        "constraints": sum(len(c) for c in instance.component_objects(Constraint, active=True)),
+        "termination_condition": status["termination_condition"],
+        "gap": status["gap"],
+        "total_cost": results_data["total_cost"] if results_data is not None else None,
+    }
+
+def run_benchmark(cases, config, output, repeat=1, seed=42, **model_args):
+    commit = git_commit()
+    records = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for spec in cases:
+            case = {"seed": seed, **parse_case(spec)}
+            dat_file = os.path.join(work_dir, "case.dat")
+            write_dat(generate_case(**case), dat_file)
+            for _ in range(repeat):
+                record = {
+                    "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+                    "commit": commit,
+                    "python": platform.python_version(),
+                    "pyomo": pyomo.version.version,
+                    "case": spec,
+                    "case_args": case,
+                    "solver": {k: v for k, v in config.items() if k not in ("logfile", "tee")},
+                    **run_phases(dat_file, case.get("num_hours", 24), config, work_dir, **model_args),
+                }
+                records.append(record)
+                with open(output, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+                print(f"{spec:<20} " + " ".join(f"{name} {record['phases'][name]:.2f}s"
+                                                 for name in PHASES if name in record["phases"]))
+    print(f"Benchmark results appended to {output}")
+    return records
+
+def summarize(output):
+    # Median seconds per phase for each (commit, case, solver) in a results file
+    groups = {}
+    with open(output, "r") as f:
+        for line in f:
+            record = json.loads(line)
+            key = (record["commit"] or "-", record["case"], record["solver"]["name"])
+            groups.setdefault(key, []).append(record["phases"])
+    print(f"{'commit':<10} {'case':<20} {'solver':<12} " + " ".join(f"{name:>15}" for name in PHASES))
+    for (commit, case, solver), runs in groups.items():
+        medians = [statistics.median(run[name] for run in runs if name in run)
+                   if any(name in run for run in runs) else None for name in PHASES]
+        print(f"{commit:<10} {case:<20} {solver:<12} "
+              + " ".join(f"{'-':>15}" if m is None else f"{m:>15.3f}" for m in medians))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time each phase of a unit commitment run on synthetic cases")
+    parser.add_argument("--cases", nargs="+", default=list(DEFAULT_CASES),
+                        help="synthetic cases (see synthetic_case.parse_case), e.g. 30x20 or 300x200x48,storage=20")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--shift-max-percent", type=float, default=0.2)
+    parser.add_argument("--shift-max-hours", type=int, default=2)
+    parser.add_argument("--dr-formulation", choices=DR_FORMULATIONS, default="pairwise")
+    add_solver_arguments(parser)
+    parser.add_argument("--output", default="benchmark_phases.jsonl", help="JSON lines file the runs are appended to")
+    parser.add_argument("--summary", action="store_true", help="only print the median phase times in --output")
+    args = parser.parse_args(argv)
+
+    if not args.summary:
+        run_benchmark(args.cases, solver_config_from_args(args), args.output, args.repeat, args.seed,
+                      shift_max_percent=args.shift_max_percent, shift_max_hours=args.shift_max_hours,
+                      dr_formulation=args.dr_formulation)
+    summarize(args.output)
+
+if __name__ == '__main__':
+    main()
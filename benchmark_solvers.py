@@ -0,0 +1,80 @@
+import argparse
+import json
+import time
+from pyomo.environ import *
+from pyomo.opt import SolverFactory
+from unit_commitment_model_solar import DR_FORMULATIONS, define_model
+from solver_config import SOLVER_BACKENDS, solver_config, make_solver, solve_instance
+from synthetic_case import generate_case, parse_case
+from data_loader import load_data
+
+# Compares solver backends on the shipped dataset and on scaled synthetic
+# cases: wall time, termination condition, cost and the gap each backend
+# reports, with the same threads/gap/time limit settings for all of them.
+# Backends that are not installed are skipped.
+
+DEFAULT_SYNTHETIC = ("60x40", "120x80")
+
+def benchmark_cases(data_file, synthetic, seed=42):
+    # [(name, data dict, num_hours)]
+    cases = []
+    if data_file:
+        cases.append((data_file, load_data(data_file), 24))
+    for spec in synthetic:
+        case = parse_case(spec)
+        cases.append((f"synthetic {spec}", generate_case(**{"seed": seed, **case}), case.get("num_hours", 24)))
+    return cases
+
+def run_case(data, num_hours, config, shift_max_percent, shift_max_hours, dr_formulation):
+    start = time.perf_counter()
+    instance = define_model(shift_max_percent, shift_max_hours, dr_formulation=dr_formulation,
+                            num_hours=num_hours).create_instance(data)
+    build_time = time.perf_counter() - start
+    status = solve_instance(make_solver(config), instance, config)
+    status["build_time"] = build_time
+    status["total_cost"] = value(instance.TotalCost) if status["has_solution"] else None
+    return status
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare solver backends on the unit commitment model")
+    parser.add_argument("--solvers", nargs="+", default=list(SOLVER_BACKENDS), help="backends to compare")
+    parser.add_argument("--data", default="unit_commitment_data_solar.dat", help="shipped case ('' to skip)")
+    parser.add_argument("--synthetic", nargs="*", default=list(DEFAULT_SYNTHETIC),
+                        help="synthetic cases (see synthetic_case.parse_case), e.g. 60x40 or 120x80x48,storage=10")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--mip-gap", type=float, default=None)
+    parser.add_argument("--time-limit", type=float, default=300)
+    parser.add_argument("--shift-max-percent", type=float, default=0.2)
+    parser.add_argument("--shift-max-hours", type=int, default=2)
+    parser.add_argument("--dr-formulation", choices=DR_FORMULATIONS, default="pairwise")
+    parser.add_argument("--output", default=None, help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    solvers = []
+    for name in args.solvers:
+        if SolverFactory(name).available(exception_flag=False):
+            solvers.append(name)
+        else:
+            print(f"Skipping {name}: not available")
+
+    rows = []
+    print(f"{'case':<32} {'solver':<12} {'termination':<14} {'cost':>14} {'gap':>9} {'build s':>8} {'solve s':>8}")
+    for case_name, data, num_hours in benchmark_cases(args.data, args.synthetic, args.seed):
+        for name in solvers:
+            config = solver_config(name, args.threads, args.mip_gap, args.time_limit)
+            status = run_case(data, num_hours, config, args.shift_max_percent, args.shift_max_hours,
+                              args.dr_formulation)
+            rows.append({"case": case_name, **status})
+            cost = "-" if status["total_cost"] is None else f"{status['total_cost']:.1f}"
+            gap = "-" if status["gap"] is None else f"{status['gap']:.3%}"
+            print(f"{case_name:<32} {name:<12} {status['termination_condition']:<14} {cost:>14} {gap:>9} "
+                  f"{status['build_time']:>8.2f} {status['wall_time']:>8.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=4)
+        print(f"Benchmark results saved to {args.output}")
+
+if __name__ == '__main__':
+    main()
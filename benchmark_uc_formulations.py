@@ -0,0 +1,98 @@
+import argparse
+import json
+import sys
+import time
+from pyomo.environ import *
+from unit_commitment_model_solar import COMMITMENT_FORMULATIONS, DR_FORMULATIONS, define_model
+from solver_config import make_solver, solve_instance, check_solution, add_solver_arguments, solver_config_from_args
+from commitment_heuristic import set_binary_domains
+from benchmark_solvers import benchmark_cases
+
+# Compares the 'basic' and 'tight' commitment formulations on the shipped
+# dataset and on scaled synthetic cases: the root gap between the LP
+# relaxation and the MILP optimum, branch-and-bound nodes (where the solver
+# reports them) and solve time. Both formulations must reach the same
+# optimal cost; the number of hours where their schedules differ is shown
+# too (non-zero only for ties between equally cheap schedules).
+
+DEFAULT_SYNTHETIC = ("60x40", "120x80", "120x80x48")
+
+def run_formulation(data, num_hours, config, commitment_formulation, shift_max_percent, shift_max_hours,
+                    dr_formulation):
+    start = time.perf_counter()
+    instance = define_model(shift_max_percent, shift_max_hours, dr_formulation=dr_formulation, num_hours=num_hours,
+                            commitment_formulation=commitment_formulation).create_instance(data)
+    build_time = time.perf_counter() - start
+    solver = make_solver(config)
+
+    set_binary_domains(instance, UnitInterval)
+    lp = check_solution(solve_instance(solver, instance, config))
+    lp_bound = value(instance.TotalCost)
+    set_binary_domains(instance, Binary)
+
+    status = check_solution(solve_instance(solver, instance, config))
+    cost = value(instance.TotalCost)
+    return {
+        "formulation": commitment_formulation,
+        "constraints": sum(len(c) for c in instance.component_objects(Constraint, active=True)),
+        "build_time": build_time,
+        "lp_bound": lp_bound,
+        "lp_time": lp["wall_time"],
+        "root_gap": (cost - lp_bound) / max(abs(cost), 1e-10),
+        "total_cost": cost,
+        "nodes": status["nodes"],
+        "solve_time": status["wall_time"],
+        "mip_gap": status["gap"],
+        "termination_condition": status["termination_condition"],
+        "schedule": {f"{g},{t}": int(round(var.value)) for (g, t), var in instance.y.items()},
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the basic and tight unit commitment formulations")
+    parser.add_argument("--data", default="unit_commitment_data_solar.dat", help="shipped case ('' to skip)")
+    parser.add_argument("--synthetic", nargs="*", default=list(DEFAULT_SYNTHETIC),
+                        help="synthetic cases (see synthetic_case.parse_case), e.g. 60x40 or 120x80x48,storage=10")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--shift-max-percent", type=float, default=0.2)
+    parser.add_argument("--shift-max-hours", type=int, default=2)
+    parser.add_argument("--dr-formulation", choices=DR_FORMULATIONS, default="pairwise")
+    add_solver_arguments(parser)
+    parser.add_argument("--tolerance", type=float, default=1e-3,
+                        help="relative cost tolerance (at least the MIP gap the solver stops at)")
+    parser.add_argument("--output", default=None, help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+    config = solver_config_from_args(args)
+
+    rows = []
+    mismatches = 0
+    print(f"{'case':<32} {'formulation':<11} {'rows':>8} {'LP bound':>14} {'cost':>14} {'root gap':>9} "
+          f"{'nodes':>7} {'solve s':>8} {'diff':>5}")
+    for case_name, data, num_hours in benchmark_cases(args.data, args.synthetic, args.seed):
+        results = [run_formulation(data, num_hours, config, formulation, args.shift_max_percent,
+                                   args.shift_max_hours, args.dr_formulation)
+                   for formulation in COMMITMENT_FORMULATIONS]
+        reference = results[0]
+        for result in results:
+            result["case"] = case_name
+            result["schedule_differences"] = sum(result["schedule"][k] != reference["schedule"][k]
+                                                 for k in reference["schedule"])
+        for result in results:
+            match = abs(result["total_cost"] - reference["total_cost"]) <= args.tolerance * max(abs(reference["total_cost"]), 1)
+            mismatches += not match
+            nodes = "-" if result["nodes"] is None else result["nodes"]
+            print(f"{case_name:<32} {result['formulation']:<11} {result['constraints']:>8} {result['lp_bound']:>14.1f} "
+                  f"{result['total_cost']:>14.1f} {result['root_gap']:>9.3%} {nodes:>7} {result['solve_time']:>8.2f} "
+                  f"{result['schedule_differences']:>5}{'' if match else '  MISMATCH'}")
+            rows.append({k: v for k, v in result.items() if k != "schedule"})
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=4)
+        print(f"Benchmark results saved to {args.output}")
+    if mismatches:
+        print(f"{mismatches} case(s) differ in cost")
+        sys.exit(1)
+    print("All formulations reach the same cost")
+
+if __name__ == '__main__':
+    main()
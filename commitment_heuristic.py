@@ -0,0 +1,180 @@
+import argparse
+import json
+from pyomo.environ import *
+from unit_commitment_model_solar import DR_FORMULATIONS, NETWORK_MODES, define_model
+from solver_config import (HIGHS_BACKENDS, solve_instance, check_solution, make_solver, add_solver_arguments,
+                           solver_config_from_args)
+from instrumentation import timer
+from dc_network import solve_network
+from data_loader import load_data
+
+# Fast approximate commitment by LP relaxation and fix-and-optimize:
+#   1. solve the LP relaxation of the y/u/v binaries (its cost is a lower
+#      bound on the MILP optimum);
+#   2. round y per generator and hour, walking forward in time so that the
+#      initial status, the carried-over minimum up/down time (UT0/DT0) and
+#      MUT/MDT after every switch hold; u/v follow from y;
+#   3. fix y/u/v and re-solve the remaining LP for the dispatch.
+# If the rounded commitment is infeasible (e.g. too little capacity on at
+# some hour), rounding is repeated with lower thresholds, which commit more
+# units. Optionally the full MILP is then solved with the heuristic solution
+# as its MIP start. The report gives the heuristic cost, the LP bound and the
+# gap between them, so the heuristic's accuracy can be weighed against its
+# run time.
+
+BINARIES = ("y", "u", "v")
+THRESHOLDS = (0.5, 0.25, 0.1, 1e-6)
+
+# HiGHS solves the relaxation several times faster with its interior point
+# method; crossover to a vertex is not needed for rounding or for the bound
+HIGHS_RELAXATION_OPTIONS = {"solver": "ipm", "run_crossover": "off"}
+
+def set_binary_domains(instance, domain):
+    for name in BINARIES:
+        for var in instance.component(name).values():
+            var.domain = domain
+
+def round_commitment(instance, threshold):
+    # {g: [y_t for t in T]} from the y values of the LP relaxation
+    hours = list(instance.T)
+    commitment = {}
+    for g in instance.G:
+        mut, mdt = int(value(instance.MUT[g])), int(value(instance.MDT[g]))
+        status = int(value(instance.y0[g]))
+        ut0, dt0 = int(value(instance.UT0[g])), int(value(instance.DT0[g]))
+        # Status is held through locked_until: hour 1 keeps y0, and a carried-over
+        # up/down time keeps the unit in its initial state for the rest of MUT/MDT
+        locked_until = max(1, mut - ut0 if status == 1 and ut0 > 0 else 0,
+                           mdt - dt0 if status == 0 and dt0 > 0 else 0)
+        schedule = []
+        for t in hours:
+            if t > locked_until:
+                rounded = int((instance.y[g, t].value or 0) >= threshold)
+                if rounded != status:
+                    # A switch holds the new status for MUT (start) or MDT (stop) hours
+                    locked_until = t + (mut if rounded else mdt) - 1
+                    status = rounded
+            schedule.append(status)
+        commitment[g] = schedule
+    return commitment
+
+def hold_value(var, val):
+    # Pin var through its bounds rather than var.fix(): Pyomo's HiGHS interfaces
+    # remove fixed variables from the solver model one at a time, which costs
+    # far more than the LP itself on large instances
+    var.set_value(val)
+    var.setlb(val)
+    var.setub(val)
+
+def fix_commitment(instance, commitment):
+    hours = list(instance.T)
+    for g, schedule in commitment.items():
+        previous = int(value(instance.y0[g]))
+        for t, status in zip(hours, schedule):
+            hold_value(instance.y[g, t], status)
+            hold_value(instance.u[g, t], max(status - previous, 0))
+            hold_value(instance.v[g, t], max(previous - status, 0))
+            previous = status
+
+def unfix_commitment(instance):
+    for name in BINARIES:
+        for var in instance.component(name).values():
+            var.setlb(None)
+            var.setub(None)
+
+def relaxation_options(solver, config):
+    # The options dict of solver to put HIGHS_RELAXATION_OPTIONS in, or None
+    if config is None:
+        return solver.highs_options
+    return solver.options if config["name"] in HIGHS_BACKENDS else None
+
+def fix_and_optimize(instance, solver, config=None, thresholds=THRESHOLDS, warmstart_milp=False, solve=solve_instance):
+    # Heuristic commitment of instance (left loaded with its solution); solver
+    # and config as for solver_config.solve_instance, which solve replaces
+    # (e.g. with dc_network.solve_network). Returns the report.
+    if any(value(instance.Units[g]) > 1 for g in instance.G):
+        raise ValueError("The heuristic rounds per-unit binaries; solve clustered generators with mode='milp'")
+    report = {}
+    options = relaxation_options(solver, config)
+    saved = dict(options) if options is not None else None
+    set_binary_domains(instance, UnitInterval)
+    try:
+        if options is not None:
+            options.update(HIGHS_RELAXATION_OPTIONS)
+        with timer("lp_relaxation"):
+            status = check_solution(solve(solver, instance, config))
+        report["lp_bound"] = value(instance.TotalCost)
+        report["lp_time"] = status["wall_time"]
+    finally:
+        set_binary_domains(instance, Binary)
+        if options is not None:
+            options.clear()
+            options.update(saved)
+
+    lp_values = {key: var.value for key, var in instance.y.items()}
+    with timer("fix_and_optimize"):
+        for threshold in thresholds:
+            for key, var in instance.y.items():
+                var.set_value(lp_values[key], skip_validation=True)
+            fix_commitment(instance, round_commitment(instance, threshold))
+            status = solve(solver, instance, config)
+            if status["has_solution"]:
+                break
+            print(f"Rounded commitment at threshold {threshold} is infeasible, retrying with more units on")
+        else:
+            unfix_commitment(instance)
+            raise RuntimeError("No feasible commitment found by rounding the LP relaxation")
+    report["threshold"] = threshold
+    report["fix_time"] = status["wall_time"]
+    report["heuristic_cost"] = value(instance.TotalCost)
+    report["gap"] = (report["heuristic_cost"] - report["lp_bound"]) / max(abs(report["heuristic_cost"]), 1e-10)
+    report["status"] = status
+    print(f"Heuristic cost {report['heuristic_cost']:.2f}, LP bound {report['lp_bound']:.2f}, "
+          f"gap {report['gap']:.4%} ({report['lp_time']:.2f} s + {report['fix_time']:.2f} s)")
+
+    if warmstart_milp:
+        unfix_commitment(instance)
+        with timer("warmstarted_milp"):
+            status = check_solution(solve(solver, instance, config, warmstart=True))
+        report["milp_cost"] = value(instance.TotalCost)
+        report["milp_time"] = status["wall_time"]
+        report["milp_gap"] = status["gap"]
+        report["status"] = status
+        print(f"MILP from the heuristic start: cost {report['milp_cost']:.2f} in {report['milp_time']:.2f} s")
+    else:
+        unfix_commitment(instance)
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Approximate unit commitment by LP relaxation and fix-and-optimize")
+    parser.add_argument("--data", default="unit_commitment_data_solar.dat")
+    parser.add_argument("--shift-max-percent", type=float, default=0.2)
+    parser.add_argument("--shift-max-hours", type=int, default=2)
+    parser.add_argument("--dr-formulation", choices=DR_FORMULATIONS, default="pairwise")
+    parser.add_argument("--network", choices=NETWORK_MODES, default="transport")
+    parser.add_argument("--warmstart-milp", action="store_true", help="then solve the MILP from the heuristic solution")
+    parser.add_argument("--compare", action="store_true", help="also solve the MILP from scratch and report its cost")
+    add_solver_arguments(parser)
+    parser.add_argument("--report", default=None, help="write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    config = solver_config_from_args(args)
+    model = define_model(args.shift_max_percent, args.shift_max_hours, dr_formulation=args.dr_formulation,
+                         network=args.network)
+    instance = model.create_instance(load_data(args.data))
+    solver = make_solver(config)
+    report = fix_and_optimize(instance, solver, config, warmstart_milp=args.warmstart_milp, solve=solve_network)
+    if args.compare:
+        instance = model.create_instance(load_data(args.data))
+        status = check_solution(solve_network(solver, instance, config))
+        report["reference_cost"] = value(instance.TotalCost)
+        report["reference_time"] = status["wall_time"]
+        print(f"MILP from scratch: cost {report['reference_cost']:.2f} in {report['reference_time']:.2f} s, "
+              f"heuristic is {report['heuristic_cost'] / report['reference_cost'] - 1:.4%} above it")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"Heuristic report saved to {args.report}")
+
+if __name__ == '__main__':
+    main()
@@ -1,364 +1,450 @@
+import argparse
 import json
-import networkx as nx  # NetworkX for generating spring layout
+import numpy as np
+from functools import lru_cache
 from dash import dcc, html
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
 import dash
 import os
 import signal
-
-# Helper function to get a color based on a value range
-def get_color(value, min_val, max_val, cmap_name):
-    norm_value = (value - min_val) / (max_val - min_val) if max_val != min_val else 0
+from results_store import load_arrays
+from network_view import build_cube, process_network_data
+from instrumentation import timer, flush_metrics
+from network_layout import LAYOUT_STRATEGIES, create_fixed_positions, read_bus_coordinates
+from fetch_vis_assets import ASSETS_DIR, VIS_FILES
+from results_watcher import RunWatcher
+from scenario_store import ScenarioStore
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+# Number of opened runs (results, layout and cube) kept in memory
+RUN_CACHE_SIZE = 8
+
+# Number of (hour, bus filter) payloads kept by network_payload
+PAYLOAD_CACHE_SIZE = 256
+
+# Results, layout and per-hour cube of one run. A run is identified by its
+# path and version (see results_watcher), so a rewritten run is reloaded.
+@lru_cache(maxsize=RUN_CACHE_SIZE)
+def open_run(path, version):
+    # Stores are memory-mapped: only the series in the cube are read
+    with timer("load_results"):
+        results = load_arrays(path)
+    with timer("layout"):
+        positions = create_fixed_positions(results, args.layout, bus_coordinates)
     return {
-        'Blues': f'rgba(0, 0, 255, {norm_value})',  # Blue scale
-        'Reds': f'rgba(255, 0, 0, {norm_value})',  # Red scale
-        'Greens': f'rgba(100, 255, 0, {norm_value})',  # Green scale
-        'Yellows': f'rgba(255, 255, 0, {norm_value})',  # Yellow for renewables
-        'Grays': f'rgba(200, 200, 200, 1)',  # Light Gray for zero values
-    }[cmap_name]
-
-# Create a fixed layout for the nodes using NetworkX spring layout
-def create_fixed_positions(json_data):
-    G = nx.Graph()
-
-    # Add buses as nodes
-    for bus in json_data['buses']:
-        G.add_node(bus)
-
-    # Add generators and connect them to buses
-    for generator, gen_data in json_data['generators'].items():
-        G.add_node(generator)
-        G.add_edge(generator, gen_data['connected_bus'])
-
-    # Add renewable generators and connect them to buses
-    for renewable, ren_data in json_data['renewables_generators'].items():
-        G.add_node(renewable)
-        G.add_edge(renewable, ren_data['connected_bus'])
-
-    # Add storage and connect them to buses
-    if 'storage' in json_data:
-        for storage, storage_data in json_data['storage'].items():
-            G.add_node(storage)
-            G.add_edge(storage, storage_data['connected_bus'])
-
-    # Add transmission lines between buses
-    for line_data in json_data['transmission_lines'].values():
-        G.add_edge(line_data['from_bus'], line_data['to_bus'])
-
-    # Use NetworkX spring layout to generate positions
-    pos = nx.spring_layout(G, seed=42)  # Fixed seed for consistent layout
-
-    fixed_positions = {}
-    for node, (x, y) in pos.items():
-        fixed_positions[node] = {'x': x * 1000, 'y': y * 1000}  # Scaling for better visualization
-
-    return fixed_positions
-
-# Function to process the JSON data and return nodes and edges
-def process_network_data(json_data, selected_hour, fixed_positions, selected_buses=None):
-    nodes = []
-    edges = []
-
-    is_average = selected_hour == 'average'
-
-    # If no buses are selected, show the full network
-    if not selected_buses:
-        selected_buses = list(json_data['buses'].keys())  # Default to all buses
-
-    # Compute the max values for scaling the color intensity
-    max_demand = max(
-        max(sum(bus['demand']) / len(bus['demand']) for bus in json_data['buses'].values()) if is_average
-        else max(bus['demand'][int(selected_hour)] for bus in json_data['buses'].values()), 1
-    )
-    max_generation = max(
-        max(sum(gen['power_output']) / len(gen['power_output']) for gen in json_data['generators'].values()) if is_average
-        else max(gen['power_output'][int(selected_hour)] for gen in json_data['generators'].values()), 1
-    )
-    max_renewable = max(
-        max(sum(ren['power_output']) / len(ren['power_output']) for ren in json_data['renewables_generators'].values()) if is_average
-        else max(ren['power_output'][int(selected_hour)] for ren in json_data['renewables_generators'].values()), 1
-    )
-    max_soc = max(
-        max(sum(storage['SoC']) / len(storage['SoC']) for storage in json_data['storage'].values()) if is_average
-        else max(storage['SoC'][int(selected_hour)] for storage in json_data['storage'].values()), 1
-    )
-
-    # Filter and add buses as nodes
-    for bus, bus_data in json_data['buses'].items():
-        if bus in selected_buses:
-            demand = (
-                sum(bus_data['demand']) / len(bus_data['demand'])
-                if is_average
-                else bus_data['demand'][int(selected_hour)]
-            )
-            curtailment = (
-                sum(bus_data['curtailment']) / len(bus_data['curtailment'])
-                if is_average
-                else bus_data['curtailment'][int(selected_hour)]
-            )
-
-            hover_text = (
-                f"Bus {bus}<br>Demand: {demand:.2f} MW<br>"
-                f"Curtailment: {curtailment:.2f} MW"
-            )
-
-            nodes.append({
-                "id": bus,
-                "label": f"{bus}",
-                "color": get_color(demand, 0, max_demand, 'Reds' if demand > 0 else 'Grays'),
-                "borderWidth": 3,
-                "borderColor": "red",
-                "title": hover_text,
-                "x": fixed_positions[bus]['x'],
-                "y": fixed_positions[bus]['y'],
-            })
-
-    # Filter and add generators as nodes
-    for generator, gen_data in json_data['generators'].items():
-        if gen_data['connected_bus'] in selected_buses:
-            power_output = (
-                sum(gen_data['power_output']) / len(gen_data['power_output'])
-                if is_average
-                else gen_data['power_output'][int(selected_hour)]
-            )
-            hover_text = f"Generator {generator}<br>Power Output: {power_output:.2f} MW"
-
-            nodes.append({
-                "id": generator,
-                "label": f"{generator}",
-                "color": get_color(power_output, 0, max_generation, 'Blues' if power_output > 0 else 'Grays'),
-                "borderWidth": 3,
-                "borderColor": "blue",
-                "title": hover_text,
-                "x": fixed_positions[generator]['x'],
-                "y": fixed_positions[generator]['y'],
-            })
-
-            edges.append({
-                "from": generator,
-                "to": gen_data['connected_bus'],
-                "arrows": {"to": True},
-                "color": {"color": "gray"}
-            })
-
-    # Filter and add renewable generators as nodes
-    for renewable, ren_data in json_data['renewables_generators'].items():
-        if ren_data['connected_bus'] in selected_buses:
-            power_output = (
-                sum(ren_data['power_output']) / len(ren_data['power_output'])
-                if is_average
-                else ren_data['power_output'][int(selected_hour)]
-            )
-            hover_text = f"Renewable {renewable}<br>Power Output: {power_output:.2f} MW"
-
-            nodes.append({
-                "id": renewable,
-                "label": f"{renewable}",
-                "color": get_color(power_output, 0, max_renewable, 'Yellows' if power_output > 0 else 'Grays'),
-                "borderWidth": 3,
-                "borderColor": "yellow",
-                "title": hover_text,
-                "x": fixed_positions[renewable]['x'],
-                "y": fixed_positions[renewable]['y'],
-            })
-
-            edges.append({
-                "from": renewable,
-                "to": ren_data['connected_bus'],
-                "arrows": {"to": True},
-                "color": {"color": "gray"}
-            })
-
-    # Filter and add storage nodes
-    if 'storage' in json_data:
-        for storage, storage_data in json_data['storage'].items():
-            if storage_data['connected_bus'] in selected_buses:
-                soc = (
-                    sum(storage_data['SoC']) / len(storage_data['SoC'])
-                    if is_average
-                    else storage_data['SoC'][int(selected_hour)]
-                )
-                charge_discharge = (
-                    sum(storage_data['charge_discharge']) / len(storage_data['charge_discharge'])
-                    if is_average
-                    else storage_data['charge_discharge'][int(selected_hour)]
-                )
-                hover_text = f"Storage {storage}<br>State of Charge: {soc:.2f}%<br>Charge/Discharge: {charge_discharge:.2f} MW"
-
-                nodes.append({
-                    "id": storage,
-                    "label": f"{storage}",
-                    "color": get_color(soc, 0, max_soc, 'Greens' if soc > 0 else 'Grays'),
-                    "borderWidth": 3,
-                    "borderColor": "green",
-                    "shape": "square",
-                    "title": hover_text,
-                    "x": fixed_positions[storage]['x'],
-                    "y": fixed_positions[storage]['y'],
-                })
-                edges.append({
-                    "from": storage if charge_discharge > 0 else storage_data['connected_bus'],
-                    "to": storage_data['connected_bus'] if charge_discharge > 0 else storage,
-                    "arrows": {"to": True},
-                    "color": {"color": "gray"}
-                })
-
-    # Filter and add transmission lines as edges between selected buses
-    for line, line_data in json_data['transmission_lines'].items():
-        if line_data['from_bus'] in selected_buses or line_data['to_bus'] in selected_buses:
-            flow = (
-                sum(line_data['flow']) / len(line_data['flow'])
-                if is_average
-                else line_data['flow'][int(selected_hour)]
-            )
-            bus_from = line_data['from_bus']
-            bus_to = line_data['to_bus']
-
-            if flow > 0:
-                edges.append({
-                    "from": bus_from,
-                    "to": bus_to,
-                    "arrows": {"to": True},
-                    "color": {"color": "gray"},
-                    "title": f"Flow: {flow:.2f} MW from {bus_from} to {bus_to}"
-                })
-            else:
-                edges.append({
-                    "from": bus_to,
-                    "to": bus_from,
-                    "arrows": {"to": True},
-                    "color": {"color": "gray"},
-                    "title": f"Flow: {abs(flow):.2f} MW from {bus_to} to {bus_from}"
-                })
-
-    return nodes, edges
-
-# Create the Dash app
-app = dash.Dash(__name__)
-
-# Load the JSON data
-with open('unit_commitment_results.json', 'r') as f:
-    network_data = json.load(f)
-
-# Generate fixed positions for the network nodes using NetworkX spring layout
-fixed_positions = create_fixed_positions(network_data)
-
-# Dynamically get the number of hours from the JSON file (based on the flow or demand)
-num_hours = len(next(iter(network_data['transmission_lines'].values()))['flow'])
-
-# Layout of the Dash app
-app.layout = html.Div([
-    html.H1('Interactive Power Network'),
-    dcc.Dropdown(
-        id='bus-dropdown',
-        options=[{'label': f'Bus {bus}', 'value': bus} for bus in network_data['buses'].keys()],
-        multi=True,
-        placeholder="Select buses to filter",
-    ),
-    dcc.Dropdown(
-        id='hour-dropdown',
-        options=[{'label': f'Hour {i}', 'value': i} for i in range(num_hours)] + [{'label': 'Average', 'value': 'average'}],
-        value='average',
-        clearable=False
-    ),
-    html.Iframe(id='vis-network', width='100%', height='800', srcDoc=''),  # Empty srcDoc for now
-    dcc.Store(id='network-data'),  # Store network data here
-    #html.Button('Exit', id='exit-button')  # Add Exit button
-    html.Button('Exit', id='exit-button', style={
-    'position': 'fixed',
-    'bottom': '45px',
-    'right': '120px',
-    'padding': '10px 20px',
-    'background-color': '#f44336',  # Red background for emphasis
-    'color': 'white',
-    'border': 'none',
-    'border-radius': '5px',
-    'cursor': 'pointer',
-    'font-size': '16px'
-})
-])
+        'total_cost': results['total_cost'],
+        'buses': list(results['components']['buses']),
+        'positions': positions,
+        'cube': build_cube(results),
+    }
+
+# Memoized nodes/edges payload per (run, hour, bus filter); run is a
+# (path, version) tuple and selected_buses a sorted tuple of bus ids, or None
+# for the full network
+@lru_cache(maxsize=PAYLOAD_CACHE_SIZE)
+def network_payload(run, selected_hour, selected_buses):
+    view = open_run(*run)
+    nodes, edges = process_network_data(view['cube'], selected_hour, view['positions'], selected_buses)
+    return {'nodes': nodes, 'edges': edges}
 
-# Callback to process the network data and store it
+# The browser keeps one live vis.Network. A change of run or bus filter sends
+# the full payload (the structure); a change of hour only sends, in structure
+# order, each node's color and values and each directed edge's direction and
+# values, and the client rebuilds hover text from the templates and applies
+# the entries that changed through DataSet.update.
+def filter_key(run, selected_buses):
+    return json.dumps([run, selected_buses])
+
+@lru_cache(maxsize=PAYLOAD_CACHE_SIZE)
+def hour_state(run, selected_hour, selected_buses):
+    payload = network_payload(run, selected_hour, selected_buses)
+    return {
+        'key': filter_key(run, selected_buses),
+        'nodes': [[node['color']] + node['values'] for node in payload['nodes']],
+        'edges': [[int(edge['forward'])] + edge.get('values', []) if 'ends' in edge else []
+                  for edge in payload['edges']],
+    }
+
+def bus_filter(selected_buses):
+    return tuple(sorted(selected_buses)) if selected_buses else None
+
+def run_key(run):
+    # dcc.Store value (JSON) -> hashable (path, (mtime_ns, size))
+    if not run:
+        raise PreventUpdate
+    path, version = run
+    return (path, tuple(version))
+
+def preload_run(name, path, version):
+    # New runs are opened in the watcher thread, so following them is instant
+    open_run(path, version)
+    print(f"Loaded run {name}")
+
+parser = argparse.ArgumentParser(description="Interactive power network dashboard")
+parser.add_argument("results", nargs="?", default="unit_commitment_results.json",
+                    help="results JSON file, results store directory, or a directory of them to watch")
+parser.add_argument("--layout", choices=LAYOUT_STRATEGIES, default="auto", help="node layout strategy")
+parser.add_argument("--data", help=".dat file with BusX/BusY bus coordinates (for --layout coordinates)")
+parser.add_argument("--poll", type=float, default=2.0, help="seconds between checks for new results")
+parser.add_argument("--scenarios", help="scenario store directory (sweep.py --scenario-store) to compare")
+args, _ = parser.parse_known_args()
+
+# Create the Dash app. Dash serves (and includes) everything in assets/
+# itself, including the committed vis-network files, so the dashboard needs
+# no internet access. Without them the network tab would stay blank.
+missing = [name for name in VIS_FILES.values() if not os.path.exists(os.path.join(ASSETS_DIR, name))]
+if missing:
+    raise SystemExit(f"vis-network files missing from {ASSETS_DIR}: {', '.join(missing)} "
+                     "(restore them from git or run fetch_vis_assets.py)")
+app = dash.Dash(__name__, assets_folder=ASSETS_DIR)
+
+bus_coordinates = read_bus_coordinates(args.data) if args.data else None
+
+# Watch the results (file, store or directory of runs) for new solves
+watcher = RunWatcher(args.results, args.poll, on_new_version=preload_run).start()
+
+# Scenarios for the comparison view
+scenario_store = ScenarioStore(args.scenarios) if args.scenarios else None
+
+# Series compared across scenarios: key -> (category, series, label)
+COMPARE_SERIES = {
+    'commitment': ('generators', 'on_off_status', 'Generator commitment'),
+    'flow': ('transmission_lines', 'flow', 'Line flows (MW)'),
+    'soc': ('storage', 'SoC', 'Storage SOC'),
+}
+
+def scenario_options(store):
+    return [{'label': f"{entry['scenario']}  (cost {entry['total_cost']:,.0f})", 'value': entry['scenario']}
+            for entry in sorted(store.scenarios(), key=lambda e: sorted(e['params'].items()))]
+
+def comparison_figure(store, scenarios, compare):
+    # Heatmaps (components x hours) of each scenario minus the first one; a
+    # single scenario is shown as is. Only the selected records are read.
+    category, name, label = COMPARE_SERIES[compare]
+    ids = store.ids(category)
+    hours = list(range(store.num_hours))
+    base = np.asarray(store.slice(scenarios[0], category, name))
+    others = scenarios[1:]
+    fig = make_subplots(rows=max(len(others), 1), cols=1, shared_xaxes=True,
+                        subplot_titles=[f"{s} - {scenarios[0]}" for s in others] or [scenarios[0]])
+    for row, scenario in enumerate(others or scenarios, start=1):
+        z = np.asarray(store.slice(scenario, category, name)) - base if others else base
+        fig.add_trace(go.Heatmap(z=z, x=hours, y=ids, colorscale='RdBu', zmid=0 if others else None,
+                                 showscale=row == 1, colorbar={'title': label}), row=row, col=1)
+    fig.update_layout(title=label, height=max(300, 250 * max(len(others), 1)))
+    fig.update_xaxes(title_text='Hour', row=max(len(others), 1), col=1)
+    return fig
+
+def comparison_summary(store, scenarios):
+    # Differences of each scenario from the first one
+    base = scenarios[0]
+    header = ['Scenario', 'Parameters', 'Total cost', 'Cost change', 'Commitment changes (unit-hours)',
+              'Max flow change (MW)', 'Max SOC change']
+    rows = []
+    for scenario in scenarios:
+        entry = store.index[scenario]
+        commitment = np.asarray(store.slice(scenario, 'generators', 'on_off_status'))
+        flow = np.asarray(store.slice(scenario, 'transmission_lines', 'flow'))
+        soc = np.asarray(store.slice(scenario, 'storage', 'SoC'))
+        rows.append([
+            scenario,
+            ", ".join(f"{k}={v}" for k, v in entry['params'].items()),
+            f"{entry['total_cost']:,.2f}",
+            f"{entry['total_cost'] - store.index[base]['total_cost']:+,.2f}",
+            int(np.sum(np.abs(np.round(commitment) - np.round(store.slice(base, 'generators', 'on_off_status'))))),
+            f"{np.max(np.abs(flow - store.slice(base, 'transmission_lines', 'flow')), initial=0):.2f}",
+            f"{np.max(np.abs(soc - store.slice(base, 'storage', 'SoC')), initial=0):.3f}",
+        ])
+    return html.Table([html.Tr([html.Th(h) for h in header])] +
+                      [html.Tr([html.Td(cell) for cell in row]) for row in rows])
+
+def comparison_layout():
+    return [
+        html.H2('Scenario comparison'),
+        dcc.Dropdown(
+            id='scenario-dropdown',
+            options=scenario_options(scenario_store),
+            multi=True,
+            placeholder="Select scenarios (the first one is the baseline)",
+        ),
+        dcc.RadioItems(
+            id='compare-series',
+            options=[{'label': label, 'value': key} for key, (_, _, label) in COMPARE_SERIES.items()],
+            value='commitment',
+            inline=True,
+        ),
+        html.Div(id='compare-summary'),
+        dcc.Graph(id='compare-graph'),
+    ]
+
+# Layout of the Dash app, built on each page load so it starts at the newest run
+def serve_layout():
+    runs = watcher.runs()
+    return html.Div([
+        html.H1('Interactive Power Network'),
+        dcc.Dropdown(
+            id='run-dropdown',
+            options=[{'label': name, 'value': name} for name, _, _ in runs],
+            value=runs[0][0] if runs else None,
+            clearable=False,
+            placeholder="Waiting for results...",
+        ),
+        dcc.Checklist(id='follow-latest', options=[{'label': 'Follow latest run', 'value': 'follow'}], value=['follow']),
+        html.Div(id='run-status'),
+        dcc.Store(id='run-key'),  # [path, version] of the run shown
+        dcc.Interval(id='run-poll', interval=int(args.poll * 1000)),
+        dcc.Dropdown(
+            id='bus-dropdown',
+            multi=True,
+            placeholder="Select buses to filter",
+        ),
+        dcc.Dropdown(
+            id='hour-dropdown',
+            options=[{'label': 'Average', 'value': 'average'}],
+            value='average',
+            clearable=False
+        ),
+        html.Div(id='vis-network', style={'width': '100%', 'height': '800px', 'border': '1px solid lightgray'}),
+        dcc.Store(id='network-structure'),  # Full payload, sent when the run or bus filter changes
+        dcc.Store(id='network-state'),  # Per-hour colors, hover titles and edge directions
+        html.Div(id='network-rendered', style={'display': 'none'}),
+        *(comparison_layout() if scenario_store is not None else []),
+        #html.Button('Exit', id='exit-button')  # Add Exit button
+        html.Button('Exit', id='exit-button', style={
+        'position': 'fixed',
+        'bottom': '45px',
+        'right': '120px',
+        'padding': '10px 20px',
+        'background-color': '#f44336',  # Red background for emphasis
+        'color': 'white',
+        'border': 'none',
+        'border-radius': '5px',
+        'cursor': 'pointer',
+        'font-size': '16px'
+    })
+    ])
+
+app.layout = serve_layout
+
+# Callback to refresh the run list, and move to the newest run when following
 @app.callback(
-    Output('network-data', 'data'),
-    [Input('hour-dropdown', 'value'),
-     Input('bus-dropdown', 'value')]
+    [Output('run-dropdown', 'options'),
+     Output('run-dropdown', 'value')],
+    [Input('run-poll', 'n_intervals'),
+     Input('follow-latest', 'value')],
+    State('run-dropdown', 'value')
 )
-def update_network_data(selected_hour, selected_buses):
-    nodes, edges = process_network_data(network_data, selected_hour, fixed_positions, selected_buses)
-    return {'nodes': nodes, 'edges': edges}
-
-# Callback to update the iframe's content with JavaScript and the network data
+def update_run_list(n_intervals, follow, selected_run):
+    runs = watcher.runs()
+    names = [name for name, _, _ in runs]
+    if runs and ('follow' in (follow or []) or selected_run not in names):
+        selected_run = names[0]
+    return [{'label': name, 'value': name} for name in names], selected_run
+
+# Callback to pick up the selected run, or a new version of it
 @app.callback(
-    Output('vis-network', 'srcDoc'),
-    Input('network-data', 'data')
+    Output('run-key', 'data'),
+    [Input('run-dropdown', 'value'),
+     Input('run-poll', 'n_intervals')],
+    State('run-key', 'data')
+)
+def update_run_key(selected_run, n_intervals, current):
+    run = watcher.get(selected_run) if selected_run else None
+    if run is None:
+        raise PreventUpdate
+    path, version = run
+    if [path, list(version)] == current:
+        raise PreventUpdate
+    return [path, list(version)]
+
+# Callback to fill the bus and hour choices of the run
+@app.callback(
+    [Output('bus-dropdown', 'options'),
+     Output('hour-dropdown', 'options'),
+     Output('hour-dropdown', 'value'),
+     Output('run-status', 'children')],
+    Input('run-key', 'data'),
+    State('hour-dropdown', 'value')
+)
+def update_run_choices(run, selected_hour):
+    path, version = run_key(run)
+    try:
+        view = open_run(path, version)
+    except (OSError, ValueError, KeyError) as e:
+        watcher.discard(path, version)
+        return dash.no_update, dash.no_update, dash.no_update, f"Could not load {path}: {e}"
+    num_hours = view['cube']['num_hours']
+    if selected_hour != 'average' and selected_hour >= num_hours:
+        selected_hour = 'average'
+    return ([{'label': f'Bus {bus}', 'value': bus} for bus in view['buses']],
+            [{'label': f'Hour {i}', 'value': i} for i in range(num_hours)] + [{'label': 'Average', 'value': 'average'}],
+            selected_hour,
+            f"{path}: total cost {view['total_cost']:,.2f}")
+
+# Callback to send the full network when the run or bus filter changes
+@app.callback(
+    Output('network-structure', 'data'),
+    [Input('run-key', 'data'),
+     Input('bus-dropdown', 'value')],
+    State('hour-dropdown', 'value')
+)
+def update_network_structure(run, selected_buses, selected_hour):
+    run = run_key(run)
+    selected_buses = bus_filter(selected_buses)
+    try:
+        payload = network_payload(run, selected_hour, selected_buses)
+    except (OSError, ValueError, KeyError):
+        raise PreventUpdate
+    return dict(payload, key=filter_key(run, selected_buses))
+
+# Callback to send the per-hour part of the network
+@app.callback(
+    Output('network-state', 'data'),
+    [Input('run-key', 'data'),
+     Input('hour-dropdown', 'value'),
+     Input('bus-dropdown', 'value')]
+)
+def update_network_state(run, selected_hour, selected_buses):
+    try:
+        return hour_state(run_key(run), selected_hour, bus_filter(selected_buses))
+    except (OSError, ValueError, KeyError):
+        raise PreventUpdate
+
+if scenario_store is not None:
+    # Callback to list scenarios added since the page was loaded (e.g. by a running sweep)
+    @app.callback(
+        Output('scenario-dropdown', 'options'),
+        Input('run-poll', 'n_intervals')
+    )
+    def update_scenario_options(n_intervals):
+        if not scenario_store.refresh():
+            raise PreventUpdate
+        return scenario_options(scenario_store)
+
+    # Callback to compare the selected scenarios
+    @app.callback(
+        [Output('compare-graph', 'figure'),
+         Output('compare-summary', 'children')],
+        [Input('scenario-dropdown', 'value'),
+         Input('compare-series', 'value')]
+    )
+    def update_comparison(scenarios, compare):
+        if not scenarios:
+            return go.Figure(), "Select one or more scenarios to compare."
+        return comparison_figure(scenario_store, scenarios, compare), comparison_summary(scenario_store, scenarios)
+
+# Client-side rendering: build the vis.Network when the structure changes,
+# otherwise update only the nodes and edges whose hour state changed
+app.clientside_callback(
+    r"""
+    function(structure, state) {
+      if (typeof vis === 'undefined') {
+        throw new Error('vis-network did not load from assets/');
+      }
+      if (!structure) {
+        return window.dash_clientside.no_update;
+      }
+      // vis-network shows a string title as plain text, so the hover
+      // templates' <br> line breaks become elements
+      function tooltip(text) {
+        var element = document.createElement('div');
+        text.split('<br>').forEach(function(line, k) {
+          if (k) { element.appendChild(document.createElement('br')); }
+          element.appendChild(document.createTextNode(line));
+        });
+        return element;
+      }
+      function withTooltip(item) {
+        return item.title ? Object.assign({}, item, {title: tooltip(item.title)}) : item;
+      }
+      var view = window.ucNetwork;
+      if (!view || view.key !== structure.key) {
+        var options = {
+          nodes: {
+            borderWidth: 2,
+            borderWidthSelected: 2,
+            borderColor: 'black',
+            shape: 'dot',
+            font: { color: '#000', size: 14 },
+            scaling: { label: true },
+            size: 15
+          },
+          edges: {
+            arrows: { to: {enabled: true, scaleFactor: 1} },
+            color: { color: 'gray' },
+            smooth: { enabled: true }
+          },
+          interaction: {
+            dragNodes: true,
+            hover: true,
+            zoomView: true,
+            dragView: true
+          },
+          physics: {
+            enabled: false  // Disable physics for fixed positions
+          }
+        };
+        var nodes = new vis.DataSet(structure.nodes.map(withTooltip));
+        var edges = new vis.DataSet(structure.edges.map(withTooltip));
+        if (view) {
+          view.network.setData({nodes: nodes, edges: edges});
+        } else {
+          var network = new vis.Network(document.getElementById('vis-network'), {nodes: nodes, edges: edges}, options);
+          view = window.ucNetwork = {network: network};
+        }
+        view.key = structure.key;
+        view.nodes = nodes;
+        view.edges = edges;
+        view.nodeInfo = structure.nodes;
+        view.edgeInfo = structure.edges;
+        view.nodeState = structure.nodes.map(function(n) { return [n.color].concat(n.values); });
+        view.edgeState = structure.edges.map(function(e) {
+          return e.ends ? [e.forward ? 1 : 0].concat(e.values || []) : [];
+        });
+      }
+      // Same formatting as hover() on the server: values are already rounded to 2 decimals
+      function fill(template, values, names) {
+        return template.replace(/\{(\w+)\}/g, function(match, key) {
+          return key in names ? names[key] : values[key].toFixed(2);
+        });
+      }
+      function changed(a, b) {
+        if (a.length !== b.length) { return true; }
+        for (var k = 0; k < a.length; k++) { if (a[k] !== b[k]) { return true; } }
+        return false;
+      }
+      if (state && state.key === view.key) {
+        var changedNodes = [];
+        state.nodes.forEach(function(s, i) {
+          if (changed(view.nodeState[i], s)) {
+            var info = view.nodeInfo[i];
+            changedNodes.push({id: info.id, color: s[0], title: tooltip(fill(info.template, s.slice(1), {}))});
+          }
+        });
+        var changedEdges = [];
+        state.edges.forEach(function(s, i) {
+          if (s.length && changed(view.edgeState[i], s)) {
+            var info = view.edgeInfo[i];
+            var ends = s[0] ? {from: info.ends[0], to: info.ends[1]} : {from: info.ends[1], to: info.ends[0]};
+            var update = {id: info.id, from: ends.from, to: ends.to};
+            if (info.template) { update.title = tooltip(fill(info.template, s.slice(1), ends)); }
+            changedEdges.push(update);
+          }
+        });
+        if (changedNodes.length) { view.nodes.update(changedNodes); }
+        if (changedEdges.length) { view.edges.update(changedEdges); }
+        view.nodeState = state.nodes;
+        view.edgeState = state.edges;
+      }
+      return structure.key;
+    }
+    """,
+    Output('network-rendered', 'children'),
+    [Input('network-structure', 'data'),
+     Input('network-state', 'data')]
 )
-def update_iframe(network_data):
-    # Generate the HTML content that will be injected into the iframe
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-      <script type="text/javascript" src="https://cdnjs.cloudflare.com/ajax/libs/vis/4.21.0/vis.min.js"></script>
-      <link href="https://cdnjs.cloudflare.com/ajax/libs/vis/4.21.0/vis.min.css" rel="stylesheet" type="text/css">
-      <style type="text/css">
-        #mynetwork {{
-          width: 100%;
-          height: 800px;
-          border: 1px solid lightgray;
-        }}
-      </style>
-    </head>
-    <body>
-    <div id="mynetwork"></div>
-    <script type="text/javascript">
-      var nodes = new vis.DataSet({json.dumps(network_data['nodes'])});
-      var edges = new vis.DataSet({json.dumps(network_data['edges'])});
-
-      var container = document.getElementById('mynetwork');
-      var data = {{
-        nodes: nodes,
-        edges: edges
-      }};
-      var options = {{
-        nodes: {{
-          borderWidth: 2,
-          borderWidthSelected: 2,
-          borderColor: 'black',
-          shape: 'dot',
-          font: {{ color: '#000', size: 14 }},
-          scaling: {{
-            label: true
-          }},
-          size: 15
-        }},
-        edges: {{
-          arrows: {{
-            to: {{enabled: true, scaleFactor: 1}}
-          }},
-          color: {{
-            color: 'gray'
-          }},
-          smooth: {{
-            enabled: true
-          }}
-        }},
-        interaction: {{
-          dragNodes: true,
-          hover: true,
-          zoomView: true,
-          dragView: true
-        }},
-        physics: {{
-          enabled: false  // Disable physics for fixed positions
-        }}
-      }};
-      var network = new vis.Network(container, data, options);
-    </script>
-    </body>
-    </html>
-    """
-    return html_content
 
 # Callback to handle the exit button
 @app.callback(
@@ -367,7 +453,8 @@ def update_iframe(network_data):
 )
 def exit_app(n_clicks):
     if n_clicks is not None:
+        flush_metrics()
         os.kill(os.getpid(), signal.SIGTERM)  # Terminate the process
 
 if __name__ == '__main__':
-    app.run_server(debug=True)
+    app.run(debug=True)
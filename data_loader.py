@@ -0,0 +1,155 @@
+import hashlib
+import itertools
+import os
+import pickle
+import re
+import numpy as np
+
+# Data loading for define_model: reads the AMPL .dat subset used by
+# unit_commitment_data_solar.dat natively (sets, one-dimensional params and
+# (component x hour) tables), optionally replaces time series with CSV or
+# Parquet tables, and returns the data dict that create_instance accepts.
+# Parsed inputs are cached as a pickle of NumPy tables keyed by a hash of the
+# input files and the parameters they replace, so repeated runs skip parsing entirely.
+#
+# CSV/Parquet time series are either wide (first column component id, one
+# column per hour, as in the .dat tables) or long (columns component, hour,
+# value).
+
+LOADER_VERSION = 2
+CACHE_DIR = ".uc_data_cache"
+
+class Table:
+    # A parameter indexed by (component, hour) as a dense 2-D array
+    def __init__(self, rows, columns, values):
+        self.rows = list(rows)
+        self.columns = list(columns)
+        self.values = np.asarray(values, dtype=np.float64).reshape(len(self.rows), len(self.columns))
+
+    def to_dict(self):
+        return dict(zip(itertools.product(self.rows, self.columns), self.values.ravel().tolist()))
+
+def convert_token(token):
+    token = token.strip('"\'')
+    try:
+        return int(token)
+    except ValueError:
+        pass
+    try:
+        return float(token)
+    except ValueError:
+        return token
+
+def parse_dat(path):
+    # Returns {name: list (set) | dict (param) | Table (param table)}; raises
+    # ValueError on syntax outside the supported subset
+    with open(path, "r") as f:
+        text = re.sub(r"#[^\n]*", " ", f.read())
+    text = re.sub(r":=", " := ", text)
+    text = re.sub(r":(?!=)", " : ", text)
+
+    parsed = {}
+    for statement in text.split(";"):
+        tokens = statement.split()
+        if not tokens:
+            continue
+        kind, name, rest = tokens[0], tokens[1], tokens[2:]
+        if kind == "set" and rest[:1] == [":="]:
+            parsed[name] = [convert_token(t) for t in rest[1:]]
+        elif kind == "param" and rest[:1] == [":="]:
+            values = rest[1:]
+            if len(values) % 2:
+                raise ValueError(f"{path}: param {name} is not a list of (index, value) pairs")
+            parsed[name] = {convert_token(k): convert_token(v) for k, v in zip(values[0::2], values[1::2])}
+        elif kind == "param" and rest[:1] == [":"] and ":=" in rest:
+            split = rest.index(":=")
+            columns = [convert_token(t) for t in rest[1:split]]
+            body = rest[split + 1:]
+            width = len(columns) + 1
+            if not columns or len(body) % width:
+                raise ValueError(f"{path}: param {name} table rows do not match its {len(columns)} columns")
+            rows = [convert_token(t) for t in body[0::width]]
+            values = [[float(v.strip('"\'')) for v in body[i + 1:i + width]] for i in range(0, len(body), width)]
+            parsed[name] = Table(rows, columns, values)
+        else:
+            raise ValueError(f"{path}: unsupported .dat statement starting with {' '.join(tokens[:3])!r}")
+    return parsed
+
+def read_timeseries(path):
+    # CSV or Parquet time series table (wide or long layout) as a Table
+    import pandas as pd
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+    if {"component", "hour", "value"} <= set(df.columns):
+        df = df.pivot(index="component", columns="hour", values="value")
+    else:
+        df = df.set_index(df.columns[0])
+    columns = [convert_token(str(c)) for c in df.columns]
+    return Table([convert_token(str(r)) for r in df.index], columns, df.to_numpy(dtype=np.float64))
+
+def inputs_hash(data_file, timeseries):
+    # Covers each time series file together with the parameter it replaces
+    digest = hashlib.sha256(f"uc-data-loader-{LOADER_VERSION}".encode())
+    for name, path in [(None, data_file)] + sorted(timeseries.items()):
+        digest.update(f"{name}={os.path.basename(path)}\0".encode())
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+def parse_inputs(data_file, timeseries):
+    try:
+        parsed = parse_dat(data_file)
+    except ValueError:
+        # Syntax outside the native subset: let Pyomo's parser handle it
+        from pyomo.environ import DataPortal
+        from unit_commitment_model_solar import define_model
+        parsed = DataPortal(model=define_model(0, 0), filename=data_file).data()
+    for name, path in (timeseries or {}).items():
+        parsed[name] = read_timeseries(path)
+    return parsed
+
+def to_data_dict(parsed):
+    data = {}
+    for name, values in parsed.items():
+        if isinstance(values, Table):
+            data[name] = values.to_dict()
+        elif isinstance(values, list):
+            data[name] = {None: values}
+        else:
+            data[name] = values
+    return {None: data}
+
+def parse_timeseries_args(items):
+    # ["Demand=demand.csv", ...] from --timeseries into {param name: path}
+    timeseries = {}
+    for item in items or []:
+        name, sep, path = item.partition("=")
+        if not sep or not name or not path:
+            raise ValueError(f"--timeseries expects NAME=PATH, got {item!r}")
+        timeseries[name] = path
+    return timeseries
+
+def load_data(data_file, timeseries=None, cache_dir=CACHE_DIR):
+    # data_file: .dat file; timeseries: optional
+    # {param name: CSV/Parquet path} replacing tables such as Demand or RenewablesProfile.
+    # cache_dir=None disables the parsed-input cache.
+    timeseries = timeseries or {}
+    if cache_dir is None:
+        return to_data_dict(parse_inputs(data_file, timeseries))
+
+    key = inputs_hash(data_file, timeseries)
+    cache_file = os.path.join(cache_dir, f"{key}.pkl")
+    if os.path.exists(cache_file):
+        with open(cache_file, "rb") as f:
+            parsed = pickle.load(f)
+    else:
+        parsed = parse_inputs(data_file, timeseries)
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(parsed, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_file)
+    return to_data_dict(parsed)
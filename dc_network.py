@@ -0,0 +1,156 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+from scipy.sparse.linalg import splu
+from pyomo.environ import *
+from solver_config import solve_instance
+from instrumentation import timer, count
+
+# DC power flow for define_model(network='dc'). The PTDF matrix (line flow
+# per MW injected at a bus and withdrawn at the slack bus of its island) is
+# computed once per instance from a sparse LU factorisation of the reduced
+# bus susceptance matrix, in blocks of lines, and kept as a sparse matrix
+# with entries below PTDF_TOLERANCE dropped. Line limits start out absent:
+# solve_with_line_limits solves, computes all flows in one sparse product,
+# adds LineLimit constraints for the (line, hour) pairs above their limit and
+# re-solves until no limit is violated. On meshed grids few lines bind, so
+# the model keeps only a small fraction of the line limits.
+#
+# Flows are stored in Flow with the sign convention of the transport model:
+# positive Flow[l] carries power into LineFrom[l] (from LineTo[l]).
+
+PTDF_TOLERANCE = 1e-5      # PTDF entries below this are dropped
+LINE_BLOCK = 512           # lines per block of the PTDF computation
+DEFAULT_REACTANCE = 1.0    # used for lines without a Reactance in the data
+MAX_ROUNDS = 50
+
+def ptdf_matrix(buses, lines, from_bus, to_bus, reactance, tolerance=PTDF_TOLERANCE):
+    # Sparse (lines x buses) PTDF, flows counted from from_bus to to_bus. The
+    # first bus of every island is its slack bus (zero column).
+    n, m = len(buses), len(lines)
+    position = {b: i for i, b in enumerate(buses)}
+    f = np.array([position[from_bus[l]] for l in lines], dtype=int)
+    t = np.array([position[to_bus[l]] for l in lines], dtype=int)
+    susceptance = 1.0 / np.asarray([reactance[l] for l in lines], dtype=float)
+    incidence = sp.csr_matrix((np.r_[np.ones(m), -np.ones(m)], (np.r_[np.arange(m), np.arange(m)], np.r_[f, t])),
+                              shape=(m, n))
+    bbus = (incidence.T @ sp.diags(susceptance) @ incidence).tocsc()
+
+    _, island = csgraph.connected_components(bbus, directed=False)
+    _, slack = np.unique(island, return_index=True)
+    keep = np.setdiff1d(np.arange(n), slack)
+    lu = splu(bbus[keep][:, keep].tocsc())
+
+    # PTDF^T restricted to non-slack buses = B_red^-1 (diag(b) A_red)^T, per block of lines
+    flows_per_injection = (sp.diags(susceptance) @ incidence[:, keep]).T.tocsc()
+    blocks = []
+    for start in range(0, m, LINE_BLOCK):
+        block = lu.solve(flows_per_injection[:, start:start + LINE_BLOCK].toarray()).T
+        block[np.abs(block) < tolerance] = 0
+        blocks.append(sp.csr_matrix(block))
+    reduced = sp.vstack(blocks).tocsr() if blocks else sp.csr_matrix((0, len(keep)))
+    # Re-insert the slack columns (zeros)
+    expand = sp.csr_matrix((np.ones(len(keep)), (np.arange(len(keep)), keep)), shape=(len(keep), n))
+    return (reduced @ expand).tocsr()
+
+def is_dc_instance(instance):
+    return instance.component("LineLimit") is not None
+
+def dc_network(instance):
+    # PTDF and line data of an instance, computed on first use and kept on it
+    network = getattr(instance, "dc_network_data", None)
+    if network is None:
+        buses, lines = list(instance.B), list(instance.L)
+        reactance = {l: instance.Reactance[l] for l in lines}
+        missing = [l for l, x in reactance.items() if x is None]
+        if missing:
+            print(f"No Reactance for {len(missing)} of {len(lines)} lines, using {DEFAULT_REACTANCE}")
+            reactance.update({l: DEFAULT_REACTANCE for l in missing})
+        with timer("ptdf"):
+            ptdf = ptdf_matrix(buses, lines, instance.LineFrom, instance.LineTo, reactance)
+        count("ptdf_nonzeros", ptdf.nnz)
+        network = {"buses": buses, "lines": lines, "ptdf": ptdf,
+                   "limits": np.array([value(instance.LineMax[l]) for l in lines], dtype=float)}
+        instance.dc_network_data = network
+    return network
+
+def injection_array(instance, buses):
+    # (buses, hours) net injections of the loaded solution
+    from solve_uc_solar import variable_array, net_shift_array
+    hours = list(instance.T)
+    position = {b: i for i, b in enumerate(buses)}
+    injection = -np.array([[value(instance.Demand[b, t]) for t in hours] for b in buses], dtype=float)
+    injection -= net_shift_array(instance, buses, hours)
+    for var, units, bus_of in ((instance.P, instance.G, instance.GenBus),
+                               (instance.P_renewables, instance.GS, instance.GenBusRenewables),
+                               (instance.Discharge, instance.SD, instance.StorageBus)):
+        rows = np.array([position[bus_of[u]] for u in units], dtype=int)
+        np.add.at(injection, rows, variable_array(var, (len(rows), len(hours))))
+    rows = np.array([position[instance.StorageBus[s]] for s in instance.SD], dtype=int)
+    np.subtract.at(injection, rows, variable_array(instance.Charge, (len(rows), len(hours))))
+    return injection
+
+def line_flows(instance):
+    # (lines, hours) flows from LineFrom to LineTo of the loaded solution
+    network = dc_network(instance)
+    return network["ptdf"] @ injection_array(instance, network["buses"])
+
+def add_line_limits(instance, pairs):
+    # Adds LineLimit constraints for (line position, hour position) pairs
+    network = dc_network(instance)
+    ptdf, buses, lines = network["ptdf"], network["buses"], network["lines"]
+    hours = list(instance.T)
+    for i, j in pairs:
+        l, t = lines[i], hours[j]
+        row = ptdf.getrow(i)
+        flow = sum(coef * instance.Injection[buses[b], t] for b, coef in zip(row.indices, row.data))
+        instance.LineLimitIndex.add((l, t))
+        instance.LineLimit[l, t] = inequality(-instance.LineMax[l], flow, instance.LineMax[l])
+
+def store_flows(instance, flows):
+    # Flow values in the transport model's sign convention (see above)
+    for (l, t), var in instance.Flow.items():
+        var.set_value(0.0)
+    lines, hours = dc_network(instance)["lines"], list(instance.T)
+    for i, l in enumerate(lines):
+        for j, t in enumerate(hours):
+            instance.Flow[l, t].set_value(-float(flows[i, j]))
+
+def solve_with_line_limits(solver, instance, config=None, warmstart=False, tolerance=1e-6, max_rounds=MAX_ROUNDS):
+    # solver_config.solve_instance for DC network instances: re-solves with the
+    # violated line limits added until the flows respect every limit. The
+    # returned status has a "line_limits" entry with the rounds and limits.
+    network = dc_network(instance)
+    active = {(network["lines"].index(l), list(instance.T).index(t)) for l, t in instance.LineLimitIndex}
+    added = 0
+    for rounds in range(1, max_rounds + 1):
+        status = solve_instance(solver, instance, config, warmstart and rounds == 1)
+        if not status["has_solution"]:
+            break
+        with timer("line_limit_check"):
+            flows = line_flows(instance)
+            excess = np.abs(flows) - network["limits"][:, None] * (1 + tolerance) - tolerance
+            overloaded = np.nonzero((excess > 0).any(axis=1))[0]
+            # A line overloaded at one hour tends to bind at its neighbours too,
+            # so its limit is added for every hour at once
+            violated = [(i, j) for i in overloaded for j in range(excess.shape[1]) if (i, j) not in active]
+        if not violated:
+            store_flows(instance, flows)
+            break
+        print(f"DC network round {rounds}: adding {len(violated)} violated line limits "
+              f"(largest excess {excess.max():.2f} MW)")
+        with timer("add_line_limits"):
+            add_line_limits(instance, violated)
+        active.update(violated)
+        added += len(violated)
+    else:
+        raise RuntimeError(f"Line limits still violated after {max_rounds} rounds")
+    status["line_limits"] = {"rounds": rounds, "added": added, "active": len(active),
+                             "total": len(network["lines"]) * len(instance.T)}
+    return status
+
+def solve_network(solver, instance, config=None, warmstart=False):
+    # solve_instance or solve_with_line_limits, whichever the instance needs
+    if is_dc_instance(instance):
+        return solve_with_line_limits(solver, instance, config, warmstart)
+    return solve_instance(solver, instance, config, warmstart)
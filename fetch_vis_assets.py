@@ -0,0 +1,35 @@
+import argparse
+import os
+import urllib.request
+
+# The vis-network files used by dashapp.py are committed in assets/ (with
+# their license, assets/LICENSE-vis-network.txt), which Dash serves itself,
+# so the dashboard needs no internet access. This script re-downloads the
+# pinned release, e.g. after changing VIS_VERSION; review the diff before
+# committing the new files.
+
+VIS_VERSION = '9.1.2'
+VIS_JS = f'https://unpkg.com/vis-network@{VIS_VERSION}/standalone/umd/vis-network.min.js'
+VIS_CSS = f'https://unpkg.com/vis-network@{VIS_VERSION}/styles/vis-network.min.css'
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+# File name in assets/ for each URL
+VIS_FILES = {VIS_JS: 'vis-network.min.js', VIS_CSS: 'vis-network.css'}
+
+def fetch_vis_assets(assets_dir=ASSETS_DIR):
+    os.makedirs(assets_dir, exist_ok=True)
+    for url, name in VIS_FILES.items():
+        target = os.path.join(assets_dir, name)
+        with urllib.request.urlopen(url, timeout=60) as response:
+            content = response.read()
+        with open(target, "wb") as f:
+            f.write(content)
+        print(f"Saved {url} to {target}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=f"Download vis-network {VIS_VERSION} into assets/ for dashapp.py")
+    parser.add_argument("--assets-dir", default=ASSETS_DIR)
+    args = parser.parse_args(argv)
+    fetch_vis_assets(args.assets_dir)
+
+if __name__ == '__main__':
+    main()
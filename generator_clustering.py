@@ -0,0 +1,225 @@
+import argparse
+import json
+import numpy as np
+import scipy.sparse as sp
+from scipy.optimize import linprog
+from data_loader import load_data
+
+# Generator clustering for large fleets of near-identical units. Generators on
+# the same bus with the same minimum up/down times and initial state, and with
+# capacities, ramp rates and costs within a relative tolerance of each other,
+# are merged into one cluster generator with Units = number of members. Its
+# y/u/v variables count the committed, started and stopped units (integers
+# instead of one binary per unit), which removes the symmetric branches of
+# identical units. Cluster parameters are the member means, so clustering is
+# exact for identical units and an approximation otherwise.
+#
+# disaggregate() maps a clustered solution back to per-unit schedules: starts
+# go to the unit that has been off longest, stops to the unit that has been
+# on longest (both respecting MUT/MDT), and the cluster output is split over
+# the units on by a small LP within their Pmin/Pmax, startup/shutdown and
+# ramp limits.
+
+# Parameters that must match exactly within a cluster
+EXACT_PARAMS = ("GenBus", "MUT", "MDT", "y0", "UT0", "DT0")
+# Parameters that may differ by the clustering tolerance (relative)
+SIMILAR_PARAMS = ("Pmin", "Pmax", "Cgen", "Cstartup", "Cshutdown", "Rup", "Rdown")
+
+def generator_params(params):
+    # Names of the parameters indexed by generator in a data dict
+    generators = set(params["G"][None])
+    return [name for name, values in params.items()
+            if name != "G" and isinstance(values, dict) and values and set(values) <= generators]
+
+def similar(a, b, tolerance):
+    return abs(a - b) <= tolerance * max(abs(a), abs(b), 1e-10)
+
+def find_clusters(params, tolerance=0.05):
+    # {cluster name: [member generators]} in generator order; singletons keep
+    # their name, clusters are named after their first member and size
+    groups = []
+    for g in params["G"][None]:
+        key = tuple(params[name].get(g) for name in EXACT_PARAMS if name in params)
+        key += (params.get("P0", {}).get(g) is None,)
+        for group_key, members in groups:
+            seed = members[0]
+            if group_key == key and all(similar(params[name][g], params[name][seed], tolerance)
+                                        for name in SIMILAR_PARAMS if name in params):
+                members.append(g)
+                break
+        else:
+            groups.append((key, [g]))
+    return {members[0] if len(members) == 1 else f"{members[0]}x{len(members)}": members
+            for _, members in groups}
+
+def cluster_generators(data, tolerance=0.05):
+    # (clustered data dict, clusters) for a data dict in create_instance format
+    params = data[None]
+    clusters = find_clusters(params, tolerance)
+    clustered = {name: values for name, values in params.items() if name not in generator_params(params)}
+    clustered["G"] = {None: list(clusters)}
+    for name in generator_params(params):
+        values = params[name]
+        merged = {}
+        for cluster, members in clusters.items():
+            member_values = [values[g] for g in members if g in values]
+            if not member_values:
+                continue
+            if name in ("y0", "P0"):
+                # Units initially on and their total output
+                merged[cluster] = None if None in member_values else sum(member_values)
+            elif name in SIMILAR_PARAMS:
+                merged[cluster] = float(np.mean(member_values))
+            else:
+                merged[cluster] = member_values[0]
+        clustered[name] = {c: v for c, v in merged.items() if v is not None}
+    clustered["Units"] = {c: len(members) for c, members in clusters.items()}
+    merged_units = sum(len(m) for m in clusters.values() if len(m) > 1)
+    print(f"Clustered {len(params['G'][None])} generators into {len(clusters)} "
+          f"({merged_units} units in {sum(len(m) > 1 for m in clusters.values())} clusters)")
+    return {None: clustered}, clusters
+
+def assign_commitment(members, params, starts, stops, num_hours):
+    # (units, hours) on/off schedule of a cluster's members for its start and
+    # stop counts per hour
+    on = np.array([int(params["y0"][g]) for g in members], dtype=bool)
+    ut0, dt0 = params.get("UT0", {}), params.get("DT0", {})
+    # Hours in the current state (no carry-over: free to switch)
+    since = np.array([(ut0.get(g, 0) if on[i] else dt0.get(g, 0)) or num_hours + 1 for i, g in enumerate(members)])
+    mut = np.array([params["MUT"][g] for g in members])
+    mdt = np.array([params["MDT"][g] for g in members])
+    schedule = np.zeros((len(members), num_hours), dtype=int)
+    for t in range(num_hours):
+        was_on = on.copy()
+        for count, candidates, minimum in ((stops[t], was_on, mut), (starts[t], ~was_on, mdt)):
+            if count == 0:
+                continue
+            # Longest in its state first; units within their minimum time last
+            order = sorted(np.nonzero(candidates)[0], key=lambda i: (since[i] < minimum[i], -since[i]))
+            chosen = order[:count]
+            if len(chosen) < count or any(since[i] < minimum[i] for i in chosen):
+                print(f"Warning: cluster {members[0]}.. hour {t + 1}: switching units within their minimum up/down time")
+            on[chosen] = ~on[chosen]
+        since = np.where(on == was_on, since + 1, 1)
+        schedule[:, t] = on
+    return schedule
+
+def split_output(members, params, schedule, output):
+    # (units, hours) output of the members on: a small LP that meets the
+    # cluster output at the least cost within each unit's Pmin/Pmax, startup
+    # (Rup) and pre-shutdown (Rdown) limits and ramp rates. Returns the split
+    # and the largest MW it could not place (slack).
+    n, num_hours = schedule.shape
+    param = lambda name: np.array([params[name][g] for g in members], dtype=float)
+    pmin, pmax, rup, rdown, cgen = (param(name) for name in ("Pmin", "Pmax", "Rup", "Rdown", "Cgen"))
+    p0 = params.get("P0", {})
+    on = schedule.astype(bool)
+    was_on = np.hstack([np.array([int(params["y0"][g]) for g in members], dtype=bool)[:, None], on[:, :-1]])
+    stopping = on & ~np.hstack([on[:, 1:], on[:, -1:]])
+    low = np.where(on, pmin[:, None], 0.0)
+    high = np.where(on, pmax[:, None], 0.0)
+    high = np.where(on & ~was_on, np.minimum(high, rup[:, None]), high)       # startup hour
+    high = np.where(stopping, np.minimum(high, rdown[:, None]), high)         # hour before a shutdown
+    low = np.minimum(low, high)
+
+    # Variables: p[i, t] (unit-major), then shortfall and surplus per hour
+    index = np.arange(n * num_hours).reshape(n, num_hours)
+    size = n * num_hours + 2 * num_hours
+    rows, cols, vals, upper = [], [], [], []
+    for i in range(n):
+        for t in range(num_hours):
+            if t == 0:
+                if p0.get(members[i]) is None or not on[i, 0]:
+                    continue
+                # Ramp from the output before the horizon
+                rows += [len(upper), len(upper) + 1]
+                cols += [index[i, 0], index[i, 0]]
+                vals += [1.0, -1.0]
+                upper += [p0[members[i]] + rup[i], rdown[i] - p0[members[i]]]
+            elif on[i, t] and was_on[i, t]:
+                rows += [len(upper)] * 2 + [len(upper) + 1] * 2
+                cols += [index[i, t], index[i, t - 1]] * 2
+                vals += [1.0, -1.0, -1.0, 1.0]
+                upper += [rup[i], rdown[i]]
+    ramps = sp.csr_matrix((vals, (rows, cols)), shape=(len(upper), size))
+    balance = sp.hstack([sp.kron(np.ones((1, n)), sp.identity(num_hours)), sp.identity(num_hours),
+                         -sp.identity(num_hours)])
+    penalty = 1e3 * max(cgen.max(), 1.0)
+    cost = np.concatenate([np.repeat(cgen, num_hours), np.full(2 * num_hours, penalty)])
+    bounds = list(zip(low.ravel(), high.ravel())) + [(0, None)] * (2 * num_hours)
+    result = linprog(cost, A_ub=ramps if len(upper) else None, b_ub=np.array(upper) if len(upper) else None,
+                     A_eq=balance, b_eq=np.asarray(output, dtype=float), bounds=bounds, method="highs")
+    if result.status != 0:
+        # Ramps that the rounded schedule cannot meet: split within the bounds only
+        result = linprog(cost, A_eq=balance, b_eq=np.asarray(output, dtype=float), bounds=bounds, method="highs")
+    power = result.x[:n * num_hours].reshape(n, num_hours)
+    return power, float(result.x[n * num_hours:].max(initial=0.0))
+
+def disaggregate(extracted, clusters, data):
+    # Replace the cluster rows of extract_arrays output by per-unit rows of
+    # the original generators (data: the unclustered data dict). Returns a
+    # summary with the per-unit cost and the largest output mismatch.
+    params = data[None]
+    hours = extracted["hours"]
+    ids = extracted["components"]["generators"]
+    series = extracted["arrays"]["generators"]
+    rows = {name: {} for name in series}
+    mismatch = 0.0
+    for row, cluster in enumerate(ids):
+        members = clusters[cluster]
+        if len(members) == 1:
+            for name in series:
+                rows[name][members[0]] = series[name][row]
+            continue
+        starts = np.rint(series["startup"][row]).astype(int)
+        stops = np.rint(series["shutdown"][row]).astype(int)
+        schedule = assign_commitment(members, params, starts, stops, len(hours))
+        power, cluster_mismatch = split_output(members, params, schedule, series["power_output"][row])
+        mismatch = max(mismatch, cluster_mismatch)
+        previous = np.array([int(params["y0"][g]) for g in members])[:, None]
+        change = np.diff(np.hstack([previous, schedule]), axis=1)
+        for i, g in enumerate(members):
+            rows["power_output"][g] = power[i]
+            rows["on_off_status"][g] = schedule[i].astype(float)
+            rows["startup"][g] = (change[i] > 0).astype(float)
+            rows["shutdown"][g] = (change[i] < 0).astype(float)
+
+    generators = list(params["G"][None])
+    extracted["components"]["generators"] = generators
+    extracted["arrays"]["generators"] = {name: np.array([rows[name][g] for g in generators]) for name in series}
+    extracted["attributes"]["generators"] = {"max_capacity": [params["Pmax"][g] for g in generators],
+                                             "connected_bus": [str(params["GenBus"][g]) for g in generators]}
+    arrays = extracted["arrays"]["generators"]
+    cost = sum(params["Cgen"][g] * arrays["power_output"][i].sum() + params["Cstartup"][g] * arrays["startup"][i].sum()
+               + params["Cshutdown"][g] * arrays["shutdown"][i].sum() for i, g in enumerate(generators))
+    if mismatch > 1e-6:
+        print(f"Warning: disaggregated output differs from the cluster output by up to {mismatch:.3f} MW")
+    return {"cost": float(cost), "output_mismatch": float(mismatch)}
+
+def clustering_summary(clusters, tolerance, num_hours):
+    # Commitment variables with and without clustering, for the solve report
+    units = sum(len(members) for members in clusters.values())
+    return {"tolerance": tolerance, "units": units, "generators": len(clusters),
+            "clusters": {c: members for c, members in clusters.items() if len(members) > 1},
+            "commitment_variables": 3 * len(clusters) * num_hours,
+            "unclustered_commitment_variables": 3 * units * num_hours}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the generator clusters of a unit commitment case")
+    parser.add_argument("--data", default="unit_commitment_data_solar.dat")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="relative parameter tolerance within a cluster")
+    parser.add_argument("--output", default=None, help="write the clusters to this JSON file")
+    args = parser.parse_args(argv)
+
+    data = load_data(args.data)
+    _, clusters = cluster_generators(data, args.tolerance)
+    for cluster, members in clusters.items():
+        if len(members) > 1:
+            print(f"{cluster:<16} {' '.join(members)}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(clusters, f, indent=4)
+        print(f"Clusters saved to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+import atexit
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+
+# Lightweight timers and counters for the solve pipeline and the dashboard.
+# Timers are context managers (or decorators) that add their wall time to a
+# per-name aggregate (count, total, min, max); counters add up numbers such
+# as model sizes. Aggregates live in memory and cost one perf_counter pair
+# per call, so the instrumentation stays on in normal runs.
+#
+# Output is opt-in, through configure() or environment variables:
+#   UC_METRICS=metrics.json       aggregates written as JSON when the process exits
+#   UC_METRICS_LOG=metrics.jsonl  one JSON line per timed call (with pid, so
+#                                 process-pool workers can share the file)
+#   UC_PROFILE=prefix             cProfile and tracemalloc capture around
+#                                 profiling() blocks, see profiling()
+# add_listener() also passes every timed call to a callback (solve_service.py
+# streams them as job progress).
+
+METRICS_ENV = "UC_METRICS"
+LOG_ENV = "UC_METRICS_LOG"
+PROFILE_ENV = "UC_PROFILE"
+
+_lock = threading.Lock()
+_timers = {}     # name -> {"count", "total", "min", "max"}
+_counters = {}   # name -> total
+_config = {"metrics_file": None, "log_file": None, "at_exit": False}
+_listeners = []  # callables that receive every event, e.g. to stream progress
+
+def flush_metrics():
+    # Write the metrics file now, if one is configured (e.g. before a process
+    # ends without running atexit handlers)
+    if _config["metrics_file"] is not None:
+        write_metrics(_config["metrics_file"])
+
+def configure(metrics_file=None, log_file=None):
+    # metrics_file: JSON file written at exit; log_file: JSON lines event log
+    _config.update(metrics_file=metrics_file, log_file=log_file)
+    if metrics_file is not None and not _config["at_exit"]:
+        atexit.register(flush_metrics)
+        _config["at_exit"] = True
+
+def add_listener(callback):
+    _listeners.append(callback)
+
+def remove_listener(callback):
+    if callback in _listeners:
+        _listeners.remove(callback)
+
+def log_event(event):
+    if not _listeners and _config["log_file"] is None:
+        return
+    event = {"time": time.time(), "pid": os.getpid(), **event}
+    for callback in list(_listeners):
+        callback(event)
+    if _config["log_file"] is None:
+        return
+    line = json.dumps(event) + "\n"
+    with _lock, open(_config["log_file"], "a") as f:
+        f.write(line)
+
+def record(name, seconds, **fields):
+    with _lock:
+        entry = _timers.get(name)
+        if entry is None:
+            _timers[name] = {"count": 1, "total": seconds, "min": seconds, "max": seconds}
+        else:
+            entry["count"] += 1
+            entry["total"] += seconds
+            entry["min"] = min(entry["min"], seconds)
+            entry["max"] = max(entry["max"], seconds)
+    log_event({"timer": name, "seconds": seconds, **fields})
+
+@contextmanager
+def timer(name, **fields):
+    # with timer("create_instance", hours=24): ...; fields only go to the event log
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start, **fields)
+
+def timed(name=None):
+    # Decorator form of timer; the name defaults to the function name
+    def decorator(func):
+        label = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count(name, n=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+def metrics():
+    # Snapshot of the aggregates: {"timers": {name: {...}}, "counters": {name: total}}
+    with _lock:
+        return {"pid": os.getpid(),
+                "timers": {name: {**entry, "mean": entry["total"] / entry["count"]} for name, entry in _timers.items()},
+                "counters": dict(_counters)}
+
+def reset():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+def write_metrics(path):
+    with open(path, "w") as f:
+        json.dump(metrics(), f, indent=4)
+
+def report():
+    # Aggregates as a text table, slowest total first
+    lines = [f"{'timer':<32} {'count':>7} {'total s':>10} {'mean s':>10} {'max s':>10}"]
+    for name, entry in sorted(metrics()["timers"].items(), key=lambda item: -item[1]["total"]):
+        lines.append(f"{name:<32} {entry['count']:>7} {entry['total']:>10.3f} {entry['mean']:>10.4f} {entry['max']:>10.3f}")
+    for name, total in metrics()["counters"].items():
+        lines.append(f"{name:<32} {total:>7}")
+    return "\n".join(lines)
+
+@contextmanager
+def profiling(prefix=None, cprofile=True, memory=True, top=40):
+    # Opt-in capture of the enclosed block; no-op when prefix is None. Writes
+    #   <prefix>.prof          cProfile data (snakeviz, pstats)
+    #   <prefix>_profile.txt   top functions by cumulative time
+    #   <prefix>_memory.json   peak traced memory and the top allocation sites
+    # cProfile only sees the calling thread; tracemalloc sees all threads.
+    if prefix is None:
+        yield
+        return
+    profiler = cProfile.Profile() if cprofile else None
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(f"{prefix}.prof")
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(top)
+            with open(f"{prefix}_profile.txt", "w") as f:
+                f.write(text.getvalue())
+        if memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            sites = tracemalloc.take_snapshot().statistics("lineno")[:top]
+            with open(f"{prefix}_memory.json", "w") as f:
+                json.dump({"current_bytes": current, "peak_bytes": peak,
+                           "top": [{"site": str(stat.traceback), "bytes": stat.size, "count": stat.count}
+                                   for stat in sites]}, f, indent=4)
+            if started_tracing:
+                tracemalloc.stop()
+        print(f"Profile written to {prefix}* files")
+
+if os.environ.get(METRICS_ENV) or os.environ.get(LOG_ENV):
+    configure(os.environ.get(METRICS_ENV), os.environ.get(LOG_ENV))
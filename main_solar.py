@@ -1,17 +1,28 @@
+import os
 import subprocess
+import sys
 from solve_uc_solar import solve_unit_commitment
 from plot_results_solar import plot_results
-
-# Step 1: Solve the optimization problem and store results in JSON
-solve_unit_commitment(
-    'unit_commitment_data_solar.dat',
-    'unit_commitment_results.json',
-    shift_max_percent=.2,
-    shift_max_hours=2
-)
-
-# Step 2: Plot the results using the generated JSON file
-plot_results('unit_commitment_results.json')
+from instrumentation import PROFILE_ENV, profiling, timer, report
+
+# Phase timings are printed at the end; set UC_METRICS / UC_METRICS_LOG to
+# also write them to files and UC_PROFILE=<prefix> to capture a cProfile and
+# tracemalloc profile of steps 1-2 (see instrumentation.py)
+with profiling(os.environ.get(PROFILE_ENV)):
+    # Step 1: Solve the optimization problem and store results in JSON
+    solve_unit_commitment(
+        'unit_commitment_data_solar.dat',
+        'unit_commitment_results.json',
+        shift_max_percent=.2,
+        shift_max_hours=2,
+        output_store='unit_commitment_results_store'
+    )
+
+    # Step 2: Plot the results from the columnar results store
+    with timer("plot_results"):
+        plot_results('unit_commitment_results_store')
+
+print(report())
 
 # Step 3: Visualize the network using the same JSON file
 
@@ -20,8 +31,10 @@ plot_results('unit_commitment_results.json')
 
 # Option 02 - Dynamic Network
 def run_dash_app():
-    # Run the Dash app located in dashapp.py using subprocess
-    subprocess.run(["python3", "dashapp.py"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    # Start the Dash app located in dashapp.py in the background. It watches the
+    # results file, so a running dashboard shows later solves without a restart
+    # (a second copy just fails to bind the port and exits).
+    subprocess.Popen([sys.executable, "dashapp.py", "unit_commitment_results.json"])
 
 # Choose which option to execute
 #option = input("Select Option (1: Static Network, 2: Dynamic Network): ")
@@ -0,0 +1,370 @@
+import argparse
+import json
+import sys
+import time
+import numpy as np
+import scipy.sparse as sp
+from pyomo.environ import *
+from data_loader import load_data
+from unit_commitment_model_solar import define_model
+from solver_config import solver_config, as_solver_config, solver_options, make_solver, solve_instance, check_solution
+from solve_uc_solar import arrays_to_results
+from results_store import write_store_arrays
+from instrumentation import timer, count
+
+# Builds the unit commitment MILP of define_model (basic commitment
+# formulation, transport network, pairwise demand shift) directly as sparse
+# matrices: every constraint family is a block of rows whose column indices
+# come from index arithmetic on (component, hour) arrays of variable
+# positions, so no Pyomo expressions or LP file are created. The model goes
+# to HiGHS in memory through highspy, and the solution is mapped to the same
+# results dict as solve_unit_commitment.
+#
+# Bounds replace rows where define_model's rows only bound one variable
+# (flow, renewable, storage and SOC limits, initial conditions); the optimal
+# cost is the same. `python matrix_builder.py` checks the objective against
+# the Pyomo path on the shipped and synthetic cases.
+
+INF = float("inf")
+
+# HiGHS model status -> the termination condition names of solver_config.solve_status
+TERMINATIONS = {"Optimal": "optimal", "Infeasible": "infeasible", "Unbounded": "unbounded",
+                "Time limit reached": "maxTimeLimit", "Iteration limit reached": "maxIterations",
+                "Primal infeasible or unbounded": "infeasibleOrUnbounded", "Interrupted by user": "userInterrupt"}
+
+def add_columns(columns, shape, lower=0.0, upper=INF, cost=0.0, integer=False):
+    # Positions (array of shape) of a block of new variables
+    size = int(np.prod(shape))
+    start = columns["count"]
+    columns["count"] += size
+    for key, values in (("lower", lower), ("upper", upper), ("cost", cost)):
+        columns[key].append(np.broadcast_to(np.asarray(values, dtype=float), shape).ravel())
+    columns["integer"].append(np.full(size, integer))
+    return np.arange(start, start + size).reshape(shape)
+
+def add_rows(rows, lower, upper, mask=None):
+    # Positions of a block of new rows with the given bounds; -1 where mask is False
+    lower, upper, mask = np.broadcast_arrays(np.asarray(lower, dtype=float), np.asarray(upper, dtype=float),
+                                             np.asarray(True if mask is None else mask, dtype=bool))
+    index = np.full(lower.shape, -1)
+    index[mask] = rows["count"] + np.arange(mask.sum())
+    rows["count"] += int(mask.sum())
+    rows["lower"].append(lower[mask])
+    rows["upper"].append(upper[mask])
+    return index
+
+def add_terms(rows, row_index, column_index, coefficients=1.0):
+    # coefficient * variable in each row; entries with a row or column of -1 are skipped
+    row_index, column_index, coefficients = np.broadcast_arrays(row_index, column_index,
+                                                                np.asarray(coefficients, dtype=float))
+    keep = (row_index >= 0) & (column_index >= 0)
+    rows["entries"].append((row_index[keep], column_index[keep], coefficients[keep]))
+
+def shifted(index, lag, fill=-1):
+    # index[:, t - lag] (fill where t - lag is before the first hour)
+    result = np.full(index.shape, fill)
+    if lag < index.shape[1]:
+        result[:, lag:] = index[:, :index.shape[1] - lag]
+    return result
+
+def column(params, name, ids, default=None):
+    values = params.get(name, {})
+    return np.array([default if values.get(i) is None else values[i] for i in ids], dtype=float)
+
+def table(params, name, ids, num_hours):
+    values = params[name]
+    return np.array([[values[i, t] for t in range(1, num_hours + 1)] for i in ids], dtype=float)
+
+def build_matrix(data, shift_max_percent, shift_max_hours, num_hours=24):
+    # The MILP as a sparse constraint matrix with row/column bounds, costs and
+    # integrality, plus the variable positions per (component, hour) for
+    # extraction; data is a data dict as accepted by create_instance
+    params = data[None]
+    if any(units > 1 for units in params.get("Units", {}).values()):
+        raise ValueError("matrix_builder does not support generator clusters (Units > 1)")
+    G, B, L, GS, SD = (list(params[name][None]) for name in ("G", "B", "L", "GS", "SD"))
+    T = num_hours
+    hours = np.arange(1, T + 1)
+    bus = {b: i for i, b in enumerate(B)}
+    columns = {"count": 0, "lower": [], "upper": [], "cost": [], "integer": []}
+    rows = {"count": 0, "lower": [], "upper": [], "entries": []}
+
+    # --- Variables (bounds replace the single-variable rows) ---
+    pmin, pmax, cgen = column(params, "Pmin", G), column(params, "Pmax", G), column(params, "Cgen", G)
+    mut, mdt = column(params, "MUT", G).astype(int), column(params, "MDT", G).astype(int)
+    rup, rdown = column(params, "Rup", G), column(params, "Rdown", G)
+    y0 = column(params, "y0", G)
+    ut0, dt0 = column(params, "UT0", G, 0), column(params, "DT0", G, 0)
+    p0 = column(params, "P0", G, np.nan)
+
+    # y fixed by InitialConditions (hour 1) and the carried-over minimum up/down time
+    y_lower, y_upper = np.zeros((len(G), T)), np.ones((len(G), T))
+    y_lower[:, 0] = y_upper[:, 0] = y0
+    held_on = (y0 == 1)[:, None] & (ut0 > 0)[:, None] & (hours[None, :] <= (mut - ut0)[:, None])
+    held_off = (y0 == 0)[:, None] & (dt0 > 0)[:, None] & (hours[None, :] <= (mdt - dt0)[:, None])
+    y_lower[held_on] = 1
+    y_upper[held_off] = 0
+
+    y = add_columns(columns, (len(G), T), y_lower, y_upper, integer=True)
+    u = add_columns(columns, (len(G), T), 0, 1, column(params, "Cstartup", G)[:, None], integer=True)
+    v = add_columns(columns, (len(G), T), 0, 1, column(params, "Cshutdown", G)[:, None], integer=True)
+    P = add_columns(columns, (len(G), T), 0, INF, cgen[:, None])
+    line_max = column(params, "LineMax", L)[:, None]
+    flow = add_columns(columns, (len(L), T), -line_max, line_max)
+    renewable_max = column(params, "Pmax_renewables", GS)[:, None] * table(params, "RenewablesProfile", GS, T) / 100
+    renewables = add_columns(columns, (len(GS), T), 0, renewable_max)
+    storage_max = column(params, "Pmax_storage", SD)[:, None]
+    charge = add_columns(columns, (len(SD), T), 0, storage_max)
+    discharge = add_columns(columns, (len(SD), T), 0, storage_max)
+    soc = add_columns(columns, (len(SD), T), 0, 1)
+
+    demand = table(params, "Demand", B, T)
+    shift_enabled = shift_max_percent != 0 and shift_max_hours != 0
+    pairs = [(t1, t2) for t1 in range(T) for t2 in range(T) if 0 < abs(t1 - t2) <= shift_max_hours]
+    if not shift_enabled:
+        pairs = []
+    pair_from = np.array([p[0] for p in pairs], dtype=int)
+    pair_to = np.array([p[1] for p in pairs], dtype=int)
+    shift = add_columns(columns, (len(B), len(pairs)))
+
+    # --- Power balance (B, T): generation + net line flow - net shift = demand ---
+    balance = add_rows(rows, demand, demand)
+    gen_bus = np.array([bus[params["GenBus"][g]] for g in G], dtype=int)
+    add_terms(rows, balance[gen_bus], P)
+    add_terms(rows, balance[[bus[params["GenBusRenewables"][s]] for s in GS]], renewables)
+    storage_bus = np.array([bus[params["StorageBus"][s]] for s in SD], dtype=int)
+    add_terms(rows, balance[storage_bus], discharge)
+    add_terms(rows, balance[storage_bus], charge, -1)
+    add_terms(rows, balance[[bus[params["LineFrom"][l]] for l in L]], flow)
+    add_terms(rows, balance[[bus[params["LineTo"][l]] for l in L]], flow, -1)
+    if pairs:
+        # shift (t1, t2) moves demand out of t1 and into t2
+        add_terms(rows, balance[:, pair_from], shift)
+        add_terms(rows, balance[:, pair_to], shift, -1)
+        limit = add_rows(rows, -INF, shift_max_percent * demand)
+        add_terms(rows, limit[:, pair_from], shift)
+
+    # --- Generator limits: Pmin*y <= P <= Pmax*y ---
+    rows_min = add_rows(rows, np.zeros(y.shape), INF)
+    add_terms(rows, rows_min, P)
+    add_terms(rows, rows_min, y, -pmin[:, None])
+    rows_max = add_rows(rows, -INF, np.zeros(y.shape))
+    add_terms(rows, rows_max, P)
+    add_terms(rows, rows_max, y, -pmax[:, None])
+
+    # --- Startup/shutdown: y[t] - y[t-1] = u[t] - v[t], y[0] = y0 ---
+    status_rhs = np.zeros(y.shape)
+    status_rhs[:, 0] = y0
+    status = add_rows(rows, status_rhs, status_rhs)
+    add_terms(rows, status, y)
+    add_terms(rows, status, shifted(y, 1), -1)
+    add_terms(rows, status, u, -1)
+    add_terms(rows, status, v)
+
+    # --- Minimum up/down time from hour MUT/MDT on ---
+    for switches, minimum, sign, rhs in ((u, mut, -1, 0), (v, mdt, 1, 1)):
+        window = add_rows(rows, -INF, np.full(y.shape, rhs, dtype=float), hours[None, :] >= minimum[:, None])
+        add_terms(rows, window, y, sign)
+        for lag in range(int(minimum.max(initial=0))):
+            add_terms(rows, np.where(lag < minimum[:, None], window, -1), shifted(switches, lag))
+
+    # --- Ramps (hour 1 only where P0 is given) ---
+    has_p0 = ~np.isnan(p0)
+    first = np.zeros(y.shape, dtype=bool)
+    first[:, 0] = True
+    ramp_mask = ~first | has_p0[:, None]
+    for sign, limit, p0_sign in ((1, rup, 1), (-1, rdown, -1)):
+        rhs = np.broadcast_to(limit[:, None], y.shape).copy()
+        rhs[:, 0] += p0_sign * np.nan_to_num(p0)
+        ramp = add_rows(rows, -INF, rhs, ramp_mask)
+        add_terms(rows, ramp, P, sign)
+        add_terms(rows, ramp, shifted(P, 1), -sign)
+
+    # --- State of charge ---
+    efficiency = column(params, "Storage_efficiency", SD)[:, None]
+    energy = storage_max * column(params, "Storage_duration", SD)[:, None]
+    soc_rhs = np.zeros(soc.shape)
+    soc_rhs[:, 0] = column(params, "SOC_init", SD)
+    balance_soc = add_rows(rows, soc_rhs, soc_rhs)
+    add_terms(rows, balance_soc, soc)
+    add_terms(rows, balance_soc, shifted(soc, 1), -1)
+    add_terms(rows, balance_soc, charge, -efficiency / energy)
+    add_terms(rows, balance_soc, discharge, 1 / (efficiency * energy))
+
+    entries = [np.concatenate(parts) for parts in zip(*rows["entries"])]
+    matrix = sp.csc_matrix((entries[2], (entries[0], entries[1])), shape=(rows["count"], columns["count"]))
+    return {
+        "matrix": matrix,
+        "col_lower": np.concatenate(columns["lower"]), "col_upper": np.concatenate(columns["upper"]),
+        "cost": np.concatenate(columns["cost"]), "integer": np.concatenate(columns["integer"]),
+        "row_lower": np.concatenate(rows["lower"]), "row_upper": np.concatenate(rows["upper"]),
+        "index": {"y": y, "u": u, "v": v, "P": P, "flow": flow, "renewables": renewables, "charge": charge,
+                  "discharge": discharge, "soc": soc, "shift": shift},
+        "pairs": (pair_from, pair_to), "demand": demand, "sets": {"G": G, "B": B, "L": L, "GS": GS, "SD": SD},
+        "hours": hours.tolist(), "params": params,
+    }
+
+def highs_model(model):
+    import highspy
+    lp = highspy.HighsLp()
+    lp.num_col_ = len(model["cost"])
+    lp.num_row_ = len(model["row_lower"])
+    lp.col_cost_ = model["cost"]
+    lp.col_lower_ = model["col_lower"]
+    lp.col_upper_ = model["col_upper"]
+    lp.row_lower_ = model["row_lower"]
+    lp.row_upper_ = model["row_upper"]
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+    lp.a_matrix_.start_ = model["matrix"].indptr
+    lp.a_matrix_.index_ = model["matrix"].indices
+    lp.a_matrix_.value_ = model["matrix"].data
+    lp.integrality_ = [highspy.HighsVarType.kInteger if integer else highspy.HighsVarType.kContinuous
+                       for integer in model["integer"]]
+    return lp
+
+def solve_matrix(model, config=None):
+    # Solves with highspy; returns (column values or None, status dict as solver_config.solve_status)
+    import highspy
+    config = as_solver_config(config or solver_config("highs"))
+    highs = highspy.Highs()
+    highs.setOptionValue("output_flag", bool(config["tee"] or config["logfile"]))
+    for name, option in solver_options({**config, "name": "highs"}).items():
+        highs.setOptionValue(name, option)
+    highs.passModel(highs_model(model))
+    start = time.perf_counter()
+    highs.run()
+    wall_time = time.perf_counter() - start
+    info = highs.getInfo()
+    termination = highs.modelStatusToString(highs.getModelStatus())
+    has_solution = info.primal_solution_status == 2
+    upper = info.objective_function_value if has_solution else None
+    lower = info.mip_dual_bound if np.isfinite(info.mip_dual_bound) else None
+    status = {"name": "highspy", "status": "ok" if termination == "Optimal" else "warning",
+              "termination_condition": TERMINATIONS.get(termination, termination), "has_solution": has_solution,
+              "upper_bound": upper, "lower_bound": lower,
+              "gap": abs(upper - lower) / max(abs(upper), 1e-10) if upper is not None and lower is not None else None,
+              "wall_time": wall_time, "nodes": info.mip_node_count}
+    return (np.array(highs.getSolution().col_value) if has_solution else None), status
+
+def extract_matrix_arrays(model, values):
+    # Solution as extract_arrays output (same layout as for a Pyomo instance)
+    index, sets, params = model["index"], model["sets"], model["params"]
+    arrays = {name: values[positions] for name, positions in index.items()}
+    net_shift = np.zeros(model["demand"].shape)
+    pair_from, pair_to = model["pairs"]
+    if len(pair_from):
+        np.add.at(net_shift, (slice(None), pair_to), arrays["shift"])
+        np.add.at(net_shift, (slice(None), pair_from), -arrays["shift"])
+    G, B, L, GS, SD = (sets[name] for name in ("G", "B", "L", "GS", "SD"))
+    return {
+        "hours": model["hours"],
+        "components": {"generators": [str(g) for g in G], "buses": [str(b) for b in B],
+                       "transmission_lines": [str(l) for l in L], "renewables_generators": [str(g) for g in GS],
+                       "storage": [str(s) for s in SD]},
+        "attributes": {
+            "generators": {"max_capacity": [params["Pmax"][g] for g in G],
+                           "connected_bus": [str(params["GenBus"][g]) for g in G]},
+            "buses": {},
+            "transmission_lines": {"from_bus": [str(params["LineFrom"][l]) for l in L],
+                                   "to_bus": [str(params["LineTo"][l]) for l in L]},
+            "renewables_generators": {"max_capacity": [params["Pmax_renewables"][g] for g in GS],
+                                      "connected_bus": [str(params["GenBusRenewables"][g]) for g in GS]},
+            "storage": {"connected_bus": [str(params["StorageBus"][s]) for s in SD]},
+        },
+        "arrays": {
+            "generators": {"power_output": arrays["P"], "on_off_status": arrays["y"],
+                           "startup": arrays["u"], "shutdown": arrays["v"]},
+            "buses": {"demand": model["demand"], "shift": net_shift},
+            "transmission_lines": {"flow": arrays["flow"]},
+            "renewables_generators": {"power_output": arrays["renewables"]},
+            "storage": {"charge_discharge": arrays["charge"] - arrays["discharge"], "charge": arrays["charge"],
+                        "discharge": arrays["discharge"], "SoC": arrays["soc"]},
+        },
+    }
+
+def solve_unit_commitment_matrix(data_file,
+                                 output_json="unit_commitment_results.json",
+                                 shift_max_percent=0.2,
+                                 shift_max_hours=4,
+                                 num_hours=24,
+                                 output_store=None,
+                                 solver_settings=None):
+    # solve_unit_commitment through the matrix builder and highspy; writes the
+    # same results JSON / store and returns the solve status
+    print("Solving Unit Commitment Problem with Solar and Storage (matrix builder)...")
+    with timer("data_load"):
+        data = load_data(data_file) if isinstance(data_file, str) else data_file
+    with timer("matrix_build"):
+        model = build_matrix(data, shift_max_percent, shift_max_hours, num_hours)
+    count("variables", len(model["cost"]))
+    count("constraints", len(model["row_lower"]))
+    with timer("solve", solver="highspy"):
+        values, status = solve_matrix(model, solver_settings)
+    check_solution(status)
+    solve_info = {"solver": status}
+
+    with timer("extraction"):
+        extracted = extract_matrix_arrays(model, values)
+    total_cost = float(model["cost"] @ values)
+    if output_json is not None:
+        with timer("extraction"):
+            results_data = {"total_cost": total_cost, **arrays_to_results(extracted)}
+        results_data.update(solve_info)
+        with timer("json_write"):
+            with open(output_json, "w") as f:
+                json.dump(results_data, f, indent=4)
+        print(f"Optimization results saved to {output_json}")
+    if output_store is not None:
+        with timer("store_write"):
+            write_store_arrays(output_store, extracted["components"], extracted["attributes"], extracted["arrays"],
+                               len(extracted["hours"]), total_cost, extra=solve_info)
+        print(f"Optimization results saved to {output_store}")
+    return status
+
+def parity_case(data, num_hours, shift_max_percent, shift_max_hours, config):
+    # Objective and build/solve times of the Pyomo and matrix paths
+    start = time.perf_counter()
+    instance = define_model(shift_max_percent, shift_max_hours, num_hours=num_hours).create_instance(data)
+    pyomo_build = time.perf_counter() - start
+    status = check_solution(solve_instance(make_solver(config), instance, config))
+    start = time.perf_counter()
+    model = build_matrix(data, shift_max_percent, shift_max_hours, num_hours)
+    matrix_build = time.perf_counter() - start
+    values, matrix_status = solve_matrix(model, config)
+    check_solution(matrix_status)
+    return {"pyomo_cost": value(instance.TotalCost), "matrix_cost": float(model["cost"] @ values),
+            "pyomo_build": pyomo_build, "pyomo_solve": status["wall_time"],
+            "matrix_build": matrix_build, "matrix_solve": matrix_status["wall_time"]}
+
+def main(argv=None):
+    from benchmark_solvers import benchmark_cases
+    parser = argparse.ArgumentParser(description="Check the matrix builder's objective against the Pyomo model")
+    parser.add_argument("--data", default="unit_commitment_data_solar.dat", help="shipped case ('' to skip)")
+    parser.add_argument("--synthetic", nargs="*", default=["30x20", "60x40"],
+                        help="synthetic cases (see synthetic_case.parse_case)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--shift", nargs=2, action="append", type=float, metavar=("PERCENT", "HOURS"),
+                        help="demand shift settings to check (default: 0.2 2 and 0 0)")
+    parser.add_argument("--solver", default="appsi_highs", help="Pyomo solver for the reference solve")
+    parser.add_argument("--mip-gap", type=float, default=1e-6)
+    parser.add_argument("--tolerance", type=float, default=1e-4, help="relative cost tolerance")
+    args = parser.parse_args(argv)
+
+    mismatches = 0
+    print(f"{'case':<32} {'shift':>8} {'pyomo cost':>14} {'matrix cost':>14} "
+          f"{'build s (pyomo/matrix)':>24} {'solve s':>14}")
+    for case_name, data, num_hours in benchmark_cases(args.data, args.synthetic, args.seed):
+        for percent, hours in args.shift or [(0.2, 2), (0, 0)]:
+            result = parity_case(data, num_hours, percent, int(hours), solver_config(args.solver, mip_gap=args.mip_gap))
+            match = abs(result["pyomo_cost"] - result["matrix_cost"]) <= args.tolerance * max(abs(result["pyomo_cost"]), 1)
+            mismatches += not match
+            print(f"{case_name:<32} {f'{percent:g}/{int(hours)}':>8} {result['pyomo_cost']:>14.1f} "
+                  f"{result['matrix_cost']:>14.1f} {result['pyomo_build']:>12.2f}/{result['matrix_build']:<11.3f} "
+                  f"{result['pyomo_solve']:>6.2f}/{result['matrix_solve']:<6.2f}{'' if match else '  MISMATCH'}")
+    if mismatches:
+        print(f"{mismatches} case(s) differ")
+        sys.exit(1)
+    print("All cases match")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import numpy as np
+import networkx as nx
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+from scipy.sparse.linalg import eigsh
+from scipy.spatial import cKDTree
+
+# Node positions for the network dashboard. Layouts are cached on disk, keyed
+# by a hash of the network topology (and strategy/coordinates), so restarting
+# the dashboard on the same network skips the layout entirely.
+#
+# Strategies:
+#   spring       NetworkX spring layout over every node (the original layout)
+#   sparse       force layout over the buses only, with repulsion limited to
+#                nearby buses (grid variant of Fruchterman-Reingold, one KD-tree
+#                query per iteration); units are placed around their bus
+#   coordinates  bus positions given in the data file (BusX/BusY), units
+#                placed around their bus
+#   auto         spring for small networks, sparse otherwise
+
+LAYOUT_VERSION = 1
+LAYOUT_CACHE_DIR = ".uc_layout_cache"
+LAYOUT_STRATEGIES = ('auto', 'spring', 'sparse', 'coordinates')
+SPRING_MAX_NODES = 500   # auto switches to the sparse layout above this
+SCALE = 1000             # Scaling for better visualization
+
+UNIT_CATEGORIES = ('generators', 'renewables_generators', 'storage')
+
+def network_topology(results):
+    # (buses, [(unit, bus)], [(from_bus, to_bus)]) from results_store.load_arrays output
+    components, attributes = results['components'], results['attributes']
+    buses = list(components['buses'])
+    units = [(unit, bus)
+             for category in UNIT_CATEGORIES
+             for unit, bus in zip(components.get(category, []),
+                                  attributes.get(category, {}).get('connected_bus', []))]
+    lines = list(zip(attributes['transmission_lines']['from_bus'], attributes['transmission_lines']['to_bus']))
+    return buses, units, lines
+
+def spring_positions(buses, units, lines):
+    G = nx.Graph()
+    G.add_nodes_from(buses)
+    for unit, bus in units:
+        G.add_node(unit)
+        G.add_edge(unit, bus)
+    G.add_edges_from(lines)
+    return {node: (x, y) for node, (x, y) in nx.spring_layout(G, seed=42).items()}  # Fixed seed for consistent layout
+
+def spectral_start(n, u, v):
+    # Second and third Laplacian eigenvectors, from a shift-invert sparse
+    # eigen-solve (nx.spectral_layout's ARPACK call converges very slowly on
+    # large grids)
+    adjacency = sp.coo_matrix((np.ones(len(u)), (u, v)), shape=(n, n)).tocsr()
+    adjacency = ((adjacency + adjacency.T) > 0).astype(float)
+    laplacian = csgraph.laplacian(adjacency).tocsc()
+    _, vectors = eigsh(laplacian, k=3, sigma=-1e-3, which='LM')
+    return vectors[:, 1:3]
+
+def sparse_force_layout(buses, lines, iterations=60, seed=42):
+    # Fruchterman-Reingold where each bus only repels buses within 2k (the
+    # optimal edge length), found with a KD-tree; cost per iteration is about
+    # linear in the number of buses and lines instead of quadratic
+    n = len(buses)
+    position = {bus: i for i, bus in enumerate(buses)}
+    if n < 3:
+        return np.random.default_rng(seed).random((n, 2))
+    u = np.array([position[a] for a, b in lines if a != b], dtype=int)
+    v = np.array([position[b] for a, b in lines if a != b], dtype=int)
+
+    pos = spectral_start(n, u, v) + np.random.default_rng(seed).normal(scale=1e-3, size=(n, 2))
+    pos = (pos - pos.min(axis=0)) / np.maximum(np.ptp(pos, axis=0), 1e-9)
+
+    k = 1 / np.sqrt(n)
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        disp = np.zeros_like(pos)
+
+        pairs = cKDTree(pos).query_pairs(2 * k, output_type='ndarray')
+        if len(pairs):
+            i, j = pairs[:, 0], pairs[:, 1]
+            delta = pos[i] - pos[j]
+            dist = np.maximum(np.linalg.norm(delta, axis=1), 0.01 * k)[:, None]
+            push = delta / dist * (k * k / dist)
+            np.add.at(disp, i, push)
+            np.add.at(disp, j, -push)
+
+        delta = pos[u] - pos[v]
+        dist = np.maximum(np.linalg.norm(delta, axis=1), 0.01 * k)[:, None]
+        pull = delta / dist * (dist * dist / k)
+        np.add.at(disp, u, -pull)
+        np.add.at(disp, v, pull)
+
+        length = np.maximum(np.linalg.norm(disp, axis=1), 1e-9)[:, None]
+        pos += disp / length * np.minimum(length, temperature)
+        temperature -= cooling
+    return pos
+
+def place_units(bus_xy, units, radius):
+    # Units on a small circle around their bus
+    xy = {}
+    by_bus = {}
+    for unit, bus in units:
+        by_bus.setdefault(bus, []).append(unit)
+    for bus, attached in by_bus.items():
+        bx, by = bus_xy[bus]
+        for i, unit in enumerate(attached):
+            angle = 2 * np.pi * i / len(attached)
+            xy[unit] = (bx + radius * np.cos(angle), by + radius * np.sin(angle))
+    return xy
+
+def bus_layout_positions(buses, units, lines, bus_coordinates=None):
+    if bus_coordinates is None:
+        pos = sparse_force_layout(buses, lines)
+    else:
+        missing = [bus for bus in buses if bus not in bus_coordinates]
+        if missing:
+            raise ValueError(f"No coordinates for {len(missing)} bus(es), e.g. {missing[0]}")
+        pos = np.array([bus_coordinates[bus] for bus in buses], dtype=float)
+    pos = nx.rescale_layout(pos - pos.mean(axis=0)) if len(buses) > 1 else np.zeros((len(buses), 2))
+    bus_xy = dict(zip(buses, map(tuple, pos.tolist())))
+    # Unit circles scale with the typical bus spacing
+    radius = 0.5 / np.sqrt(max(len(buses), 1))
+    return {**bus_xy, **place_units(bus_xy, units, radius)}
+
+def layout_key(buses, units, lines, strategy, bus_coordinates):
+    digest = hashlib.sha256(f"uc-layout-{LAYOUT_VERSION}-{strategy}".encode())
+    digest.update(json.dumps([sorted(buses), sorted(units), sorted(map(sorted, lines))]).encode())
+    if bus_coordinates is not None:
+        digest.update(json.dumps(sorted((str(b), list(map(float, xy))) for b, xy in bus_coordinates.items())).encode())
+    return digest.hexdigest()
+
+def create_fixed_positions(results, strategy='auto', bus_coordinates=None, cache_dir=LAYOUT_CACHE_DIR):
+    # {node: {'x', 'y'}} for every bus and unit of load_arrays output;
+    # bus_coordinates {bus: (x, y)} is required by (and only used with) the
+    # 'coordinates' strategy
+    buses, units, lines = network_topology(results)
+    if strategy == 'auto':
+        strategy = 'spring' if len(buses) + len(units) <= SPRING_MAX_NODES else 'sparse'
+    if strategy == 'coordinates' and bus_coordinates is None:
+        raise ValueError("The 'coordinates' layout needs bus coordinates (BusX/BusY in the data file)")
+    if strategy != 'coordinates':
+        bus_coordinates = None
+
+    cache_file = None
+    if cache_dir is not None:
+        cache_file = os.path.join(cache_dir, f"{layout_key(buses, units, lines, strategy, bus_coordinates)}.json")
+        if os.path.exists(cache_file):
+            with open(cache_file, "r") as f:
+                return json.load(f)
+
+    if strategy == 'spring':
+        pos = spring_positions(buses, units, lines)
+    else:
+        pos = bus_layout_positions(buses, units, lines, bus_coordinates)
+    fixed_positions = {node: {'x': float(x) * SCALE, 'y': float(y) * SCALE} for node, (x, y) in pos.items()}
+
+    if cache_file is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(fixed_positions, f)
+        os.replace(tmp, cache_file)
+    return fixed_positions
+
+def read_bus_coordinates(data_file):
+    # {bus: (x, y)} from the optional BusX/BusY parameters of a .dat file
+    from data_loader import parse_dat
+    parsed = parse_dat(data_file)
+    if 'BusX' not in parsed or 'BusY' not in parsed:
+        raise ValueError(f"{data_file} has no BusX/BusY bus coordinates")
+    return {bus: (float(parsed['BusX'][bus]), float(parsed['BusY'][bus])) for bus in parsed['BusX']}
@@ -0,0 +1,211 @@
+import numpy as np
+from instrumentation import timed
+
+# Dashboard preprocessing shared by dashapp.py and the benchmarks: the
+# per-run cube of network series and the vis.js nodes/edges for one hour.
+# Kept free of Dash so it can be imported without starting the app.
+
+# Helper function to get a color based on a value range
+def get_color(value, min_val, max_val, cmap_name):
+    norm_value = (value - min_val) / (max_val - min_val) if max_val != min_val else 0
+    norm_value = round(norm_value, 3)  # Finer steps are invisible and only grow the payload
+    return {
+        'Blues': f'rgba(0, 0, 255, {norm_value})',  # Blue scale
+        'Reds': f'rgba(255, 0, 0, {norm_value})',  # Red scale
+        'Greens': f'rgba(100, 255, 0, {norm_value})',  # Green scale
+        'Yellows': f'rgba(255, 255, 0, {norm_value})',  # Yellow for renewables
+        'Grays': f'rgba(200, 200, 200, 1)',  # Light Gray for zero values
+    }[cmap_name]
+
+# Series shown in the network view: category -> (series, ...)
+CUBE_SERIES = {
+    'buses': ('demand', 'shift'),
+    'generators': ('power_output',),
+    'renewables_generators': ('power_output',),
+    'storage': ('SoC', 'charge_discharge'),
+    'transmission_lines': ('flow',),
+}
+
+# Series whose per-hour maximum scales the node colors
+COLOR_SERIES = {
+    'buses': 'demand',
+    'generators': 'power_output',
+    'renewables_generators': 'power_output',
+    'storage': 'SoC',
+}
+
+# Precompute, once per results set, dense (components, hours + 1) arrays for
+# every series shown in the network; the extra last column holds the average
+# over all hours, so 'average' is just another column. Also precomputes the
+# color-scale maxima of every column. Takes results_store.load_arrays output,
+# so of a results store only the series shown here are read.
+@timed()
+def build_cube(results):
+    num_hours = results['num_hours']
+    cube = {'num_hours': num_hours, 'max': {}}
+    bus_position = {bus: i for i, bus in enumerate(results['components']['buses'])}
+    for category, series_names in CUBE_SERIES.items():
+        ids = results['components'].get(category, [])
+        attributes = results['attributes'].get(category, {})
+        data = {'ids': list(ids)}
+        for name in series_names:
+            values = np.asarray(results['arrays'][category][name], dtype=float).reshape(len(ids), num_hours)
+            data[name] = np.hstack([values, values.mean(axis=1, keepdims=True)])
+        # Bus ids plus their bus row positions, used for the bus filter
+        for key in (('from_bus', 'to_bus') if category == 'transmission_lines'
+                    else () if category == 'buses' else ('connected_bus',)):
+            data[key] = list(attributes[key])
+            data[key + '_row'] = np.array([bus_position[bus] for bus in data[key]], dtype=int)
+        cube[category] = data
+    for category, name in COLOR_SERIES.items():
+        # Same scale as before: the largest value at that hour, but at least 1
+        cube['max'][category] = cube[category][name].max(axis=0, initial=1)
+    return cube
+
+def hour_column(cube, selected_hour):
+    return cube['num_hours'] if selected_hour == 'average' else int(selected_hour)
+
+def display_values(*values):
+    # Values as shown in hover text (2 decimals, no negative zero); the same
+    # numbers are sent to the client for per-hour updates
+    return [round(v, 2) + 0.0 for v in values]
+
+def hover(template, values, **names):
+    # Fill a hover template: {0}, {1}, ... take values, {from}/{to} take names.
+    # The client fills the same templates (see the clientside callback).
+    return template.format(*(f"{v:.2f}" for v in values), **names)
+
+# Return nodes and edges for one hour (or 'average') and bus filter. Besides
+# the vis fields, nodes carry their hover "template" and "values", and edges
+# whose direction follows the sign of a value carry their "ends" and
+# "forward"; hour_state sends only those per-hour fields.
+@timed()
+def process_network_data(cube, selected_hour, fixed_positions, selected_buses=None):
+    nodes = []
+    edges = []
+
+    col = hour_column(cube, selected_hour)
+    maxima = {category: float(values[col]) for category, values in cube['max'].items()}
+
+    # If no buses are selected, show the full network
+    buses = cube['buses']
+    if selected_buses:
+        selected = np.isin(buses['ids'], list(selected_buses))
+    else:
+        selected = np.ones(len(buses['ids']), dtype=bool)  # Default to all buses
+
+    def pick(data, key, rows):
+        return [data[key][i] for i in rows]
+
+    def attached(category):
+        # Components connected to a selected bus: row positions
+        return np.flatnonzero(selected[cube[category]['connected_bus_row']])
+
+    # Filter and add buses as nodes
+    rows = np.flatnonzero(selected)
+    for bus, demand, shift in zip(pick(buses, 'ids', rows),
+                                  buses['demand'][rows, col].tolist(),
+                                  buses['shift'][rows, col].tolist()):
+        template = f"Bus {bus}<br>Demand: {{0}} MW<br>Demand shift: {{1}} MW"
+        values = display_values(demand, shift)
+
+        nodes.append({
+            "id": bus,
+            "label": f"{bus}",
+            "color": get_color(demand, 0, maxima['buses'], 'Reds' if demand > 0 else 'Grays'),
+            "borderWidth": 3,
+            "borderColor": "red",
+            "title": hover(template, values),
+            "template": template,
+            "values": values,
+            "x": fixed_positions[bus]['x'],
+            "y": fixed_positions[bus]['y'],
+        })
+
+    # Filter and add generators and renewable generators as nodes
+    for category, kind, cmap, border in (('generators', 'Generator', 'Blues', 'blue'),
+                                         ('renewables_generators', 'Renewable', 'Yellows', 'yellow')):
+        data = cube[category]
+        rows = attached(category)
+        for unit, bus, power_output in zip(pick(data, 'ids', rows), pick(data, 'connected_bus', rows),
+                                           data['power_output'][rows, col].tolist()):
+            template = f"{kind} {unit}<br>Power Output: {{0}} MW"
+            values = display_values(power_output)
+
+            nodes.append({
+                "id": unit,
+                "label": f"{unit}",
+                "color": get_color(power_output, 0, maxima[category], cmap if power_output > 0 else 'Grays'),
+                "borderWidth": 3,
+                "borderColor": border,
+                "title": hover(template, values),
+                "template": template,
+                "values": values,
+                "x": fixed_positions[unit]['x'],
+                "y": fixed_positions[unit]['y'],
+            })
+
+            edges.append({
+                "id": unit,
+                "from": unit,
+                "to": bus,
+                "arrows": {"to": True},
+                "color": {"color": "gray"}
+            })
+
+    # Filter and add storage nodes
+    storage_data = cube['storage']
+    rows = attached('storage')
+    for storage, bus, soc, charge_discharge in zip(pick(storage_data, 'ids', rows),
+                                                   pick(storage_data, 'connected_bus', rows),
+                                                   storage_data['SoC'][rows, col].tolist(),
+                                                   storage_data['charge_discharge'][rows, col].tolist()):
+        template = f"Storage {storage}<br>State of Charge: {{0}}%<br>Charge/Discharge: {{1}} MW"
+        values = display_values(soc, charge_discharge)
+
+        nodes.append({
+            "id": storage,
+            "label": f"{storage}",
+            "color": get_color(soc, 0, maxima['storage'], 'Greens' if soc > 0 else 'Grays'),
+            "borderWidth": 3,
+            "borderColor": "green",
+            "shape": "square",
+            "title": hover(template, values),
+            "template": template,
+            "values": values,
+            "x": fixed_positions[storage]['x'],
+            "y": fixed_positions[storage]['y'],
+        })
+        forward = charge_discharge > 0
+        edges.append({
+            "id": storage,
+            "from": storage if forward else bus,
+            "to": bus if forward else storage,
+            "arrows": {"to": True},
+            "color": {"color": "gray"},
+            "ends": [storage, bus],
+            "forward": forward,
+        })
+
+    # Filter and add transmission lines as edges between selected buses
+    lines = cube['transmission_lines']
+    rows = np.flatnonzero(selected[lines['from_bus_row']] | selected[lines['to_bus_row']])
+    for line, bus_from, bus_to, flow in zip(pick(lines, 'ids', rows), pick(lines, 'from_bus', rows),
+                                            pick(lines, 'to_bus', rows), lines['flow'][rows, col].tolist()):
+        forward = flow > 0
+        template = "Flow: {0} MW from {from} to {to}"
+        values = display_values(abs(flow))
+        ends = {'from': bus_from, 'to': bus_to} if forward else {'from': bus_to, 'to': bus_from}
+        edges.append({
+            "id": line,
+            **ends,
+            "arrows": {"to": True},
+            "color": {"color": "gray"},
+            "title": hover(template, values, **ends),
+            "template": template,
+            "values": values,
+            "ends": [bus_from, bus_to],
+            "forward": forward,
+        })
+
+    return nodes, edges
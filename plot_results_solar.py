@@ -1,20 +1,25 @@
-import json
 import plotly.graph_objects as go
 import plotly.io as pio
-pio.renderers.default = "browser"
+import numpy as np
+from results_store import load_arrays
 
-def plot_results(json_file):
-    # Load the results from the JSON file
-    with open(json_file, 'r') as f:
-        data = json.load(f)
+def plot_results(json_file, renderer="browser"):
+    # Interactive figures, one browser tab each; batch_report.py renders
+    # reports without a browser
+    pio.renderers.default = renderer
 
-    time_steps = list(range(len(next(iter(data['buses'].values()))['demand'])))
+    # Load the results from the JSON file or a results store directory (whose
+    # arrays are memory-mapped: only the series plotted here are read)
+    data = load_arrays(json_file)
+    components, arrays = data['components'], data['arrays']
+
+    time_steps = list(range(data['num_hours']))
 
     # Plot generator power output
     fig_power = go.Figure()
-    for g, g_data in data['generators'].items():
+    for g, power_output in zip(components['generators'], arrays['generators']['power_output']):
         fig_power.add_trace(go.Scatter(
-            x=time_steps, y=g_data['power_output'],
+            x=time_steps, y=np.asarray(power_output),
             mode='lines+markers', name=f'Generator {g}',
             hovertemplate=f"Generator {g}<br>Hour: %{{x}}<br>Power Output: %{{y:.2f}} MW"
         ))
@@ -29,9 +34,9 @@ def plot_results(json_file):
 
     # Plot generator on/off status
     fig_status = go.Figure()
-    for g, g_data in data['generators'].items():
+    for g, on_off_status in zip(components['generators'], arrays['generators']['on_off_status']):
         fig_status.add_trace(go.Scatter(
-            x=time_steps, y=g_data['on_off_status'],
+            x=time_steps, y=np.asarray(on_off_status),
             mode='lines+markers', name=f'Generator {g}',
             line=dict(dash='dot'),
             hovertemplate=f"Generator {g}<br>Hour: %{{x}}<br>Status: %{{y}}"
@@ -47,9 +52,9 @@ def plot_results(json_file):
 
     # Plot transmission line flows
     fig_flow = go.Figure()
-    for l, l_data in data['transmission_lines'].items():
+    for l, flow in zip(components['transmission_lines'], arrays['transmission_lines']['flow']):
         fig_flow.add_trace(go.Scatter(
-            x=time_steps, y=l_data['flow'],
+            x=time_steps, y=np.asarray(flow),
             mode='lines+markers', name=f'Line {l}',
             hovertemplate=f"Line {l}<br>Hour: %{{x}}<br>Flow: %{{y:.2f}} MW"
         ))
@@ -64,15 +69,15 @@ def plot_results(json_file):
 
     # Plot demand vs shifted demand
     fig_demand = go.Figure()
-    for b, b_data in data['buses'].items():
+    demand, shift = np.asarray(arrays['buses']['demand']), np.asarray(arrays['buses']['shift'])
+    for b, bus_demand, bus_shift in zip(components['buses'], demand, shift):
         fig_demand.add_trace(go.Scatter(
-            x=time_steps, y=b_data['demand'],
+            x=time_steps, y=bus_demand,
             mode='lines+markers', name=f'Bus {b} Demand',
             hovertemplate=f"Bus {b}<br>Hour: %{{x}}<br>Demand: %{{y:.2f}} MW"
         ))
-        fig_shifted_demand = [b_data['demand'][t] + b_data['shift'][t] for t in time_steps]
         fig_demand.add_trace(go.Scatter(
-            x=time_steps, y=fig_shifted_demand,
+            x=time_steps, y=bus_demand + bus_shift,
             mode='lines+markers', name=f'Bus {b} Shifted Demand',
             line=dict(dash='dot'),
             hovertemplate=f"Bus {b}<br>Hour: %{{x}}<br>Shifted Demand: %{{y:.2f}} MW"
@@ -87,12 +92,8 @@ def plot_results(json_file):
 
     # Plot total demand vs total shifted demand
     fig_total_demand = go.Figure()
-    total_demand = [0]*len(time_steps)
-    total_shifted_demand = [0]*len(time_steps)
-    for b, b_data in data['buses'].items():
-        for t in time_steps:
-            total_demand[t] += b_data['demand'][t]
-            total_shifted_demand[t] += b_data['demand'][t] + b_data['shift'][t]
+    total_demand = demand.sum(axis=0)
+    total_shifted_demand = (demand + shift).sum(axis=0)
     fig_total_demand.add_trace(go.Scatter(
         x=time_steps, y=total_demand,
         mode='lines+markers', name='Total Demand',
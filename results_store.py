@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+import numpy as np
+
+# Columnar results store: one directory per run holding each time series as a
+# float64 .npy array of shape (components, hours), plus a small index.json with
+# component ids, static attributes and scalar results. Readers memory-map the
+# arrays and only touch the rows/columns they use; the legacy JSON layout
+# written by solve_unit_commitment stays available through to_dict/export_json.
+#
+#   <store>/index.json
+#   <store>/generators/power_output.npy
+#   <store>/buses/demand.npy
+#   ...
+
+STORE_VERSION = 1
+
+SERIES = {
+    "generators": ("power_output", "on_off_status", "startup", "shutdown"),
+    "buses": ("demand", "shift"),
+    "transmission_lines": ("flow",),
+    "renewables_generators": ("power_output",),
+    "storage": ("charge_discharge", "charge", "discharge", "SoC"),
+}
+
+ATTRIBUTES = {
+    "generators": ("max_capacity", "connected_bus"),
+    "buses": (),
+    "transmission_lines": ("from_bus", "to_bus"),
+    "renewables_generators": ("max_capacity", "connected_bus"),
+    "storage": ("connected_bus",),
+}
+
+def write_store_arrays(store_dir, components, attributes, arrays, num_hours, total_cost, extra=None):
+    # components: {category: [ids]}, attributes: {category: {attr: [values]}},
+    # arrays: {category: {series: ndarray (components, hours)}}
+    os.makedirs(store_dir, exist_ok=True)
+    for category, series in arrays.items():
+        os.makedirs(os.path.join(store_dir, category), exist_ok=True)
+        for name, array in series.items():
+            # Written to a temporary file and renamed over the old one: a reader
+            # still holding a memory map of a rewritten store keeps the old file
+            # (truncating it in place would crash the reader with SIGBUS)
+            target = os.path.join(store_dir, category, f"{name}.npy")
+            tmp = f"{target}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, np.ascontiguousarray(array, dtype=np.float64).reshape(len(components[category]), num_hours))
+            os.replace(tmp, target)
+
+    index = {
+        "version": STORE_VERSION,
+        "total_cost": total_cost,
+        "num_hours": num_hours,
+        "components": components,
+        "attributes": attributes,
+        "series": {category: list(series) for category, series in arrays.items()},
+        "extra": extra or {},
+    }
+    # index.json is written last and atomically: a store without it is incomplete
+    tmp = os.path.join(store_dir, "index.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp, os.path.join(store_dir, "index.json"))
+
+def results_arrays(results_data):
+    # (components, attributes, arrays, num_hours) of a results dict in the
+    # solve_unit_commitment JSON layout
+    components, attributes, arrays = {}, {}, {}
+    num_hours = len(next(iter(results_data["buses"].values()))["demand"])
+    for category, series_names in SERIES.items():
+        entries = results_data.get(category, {})
+        components[category] = list(entries)
+        attributes[category] = {attr: [entries[c][attr] for c in entries] for attr in ATTRIBUTES[category]}
+        arrays[category] = {
+            name: np.array([entries[c][name] for c in entries], dtype=np.float64).reshape(len(entries), num_hours)
+            for name in series_names
+        }
+    return components, attributes, arrays, num_hours
+
+def write_store(results_data, store_dir):
+    # Store a results dict in the solve_unit_commitment JSON layout
+    components, attributes, arrays, num_hours = results_arrays(results_data)
+    extra = {k: v for k, v in results_data.items() if k != "total_cost" and k not in SERIES}
+    write_store_arrays(store_dir, components, attributes, arrays, num_hours, results_data["total_cost"], extra)
+
+class ResultsStore:
+    def __init__(self, store_dir):
+        self.path = store_dir
+        with open(os.path.join(store_dir, "index.json"), "r") as f:
+            self.index = json.load(f)
+        self._arrays = {}
+        self._positions = {category: {c: i for i, c in enumerate(ids)}
+                           for category, ids in self.index["components"].items()}
+
+    @property
+    def total_cost(self):
+        return self.index["total_cost"]
+
+    @property
+    def num_hours(self):
+        return self.index["num_hours"]
+
+    def ids(self, category):
+        return self.index["components"][category]
+
+    def attribute(self, category, attr):
+        # {component id: value}
+        return dict(zip(self.ids(category), self.index["attributes"][category][attr]))
+
+    def series(self, category, name):
+        # Memory-mapped (components, hours) array; nothing is read until sliced
+        key = (category, name)
+        if key not in self._arrays:
+            self._arrays[key] = np.load(os.path.join(self.path, category, f"{name}.npy"), mmap_mode="r")
+        return self._arrays[key]
+
+    def component(self, category, component_id, name):
+        # One component's series over all hours
+        return self.series(category, name)[self._positions[category][component_id]]
+
+    def hour(self, category, name, hour):
+        # All components of a category at one hour (0-based)
+        return self.series(category, name)[:, hour]
+
+    def to_dict(self):
+        # Legacy nested-dict layout of solve_unit_commitment's JSON
+        results_data = {"total_cost": self.total_cost}
+        for category, series_names in SERIES.items():
+            ids = self.ids(category)
+            arrays = {name: np.asarray(self.series(category, name)).tolist() for name in series_names}
+            attrs = self.index["attributes"][category]
+            results_data[category] = {
+                c: {**{name: arrays[name][i] for name in series_names},
+                    **{attr: attrs[attr][i] for attr in ATTRIBUTES[category]}}
+                for i, c in enumerate(ids)
+            }
+        results_data.update(self.index["extra"])
+        return results_data
+
+def is_store(path):
+    return os.path.isfile(os.path.join(path, "index.json"))
+
+def load_results(path):
+    # Results dict from either a results JSON file or a store directory
+    if os.path.isdir(path):
+        return ResultsStore(path).to_dict()
+    with open(path, "r") as f:
+        return json.load(f)
+
+def load_arrays(path):
+    # {"total_cost", "num_hours", "components", "attributes", "arrays"} from a
+    # results JSON file or store directory; arrays of a store are memory-mapped
+    if os.path.isdir(path):
+        store = ResultsStore(path)
+        return {"total_cost": store.total_cost, "num_hours": store.num_hours,
+                "components": store.index["components"], "attributes": store.index["attributes"],
+                "arrays": {category: {name: store.series(category, name) for name in names}
+                           for category, names in store.index["series"].items()}}
+    with open(path, "r") as f:
+        results_data = json.load(f)
+    components, attributes, arrays, num_hours = results_arrays(results_data)
+    return {"total_cost": results_data["total_cost"], "num_hours": num_hours,
+            "components": components, "attributes": attributes, "arrays": arrays}
+
+def export_json(store_dir, output_json):
+    with open(output_json, "w") as f:
+        json.dump(ResultsStore(store_dir).to_dict(), f, indent=4)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert between results JSON and the columnar results store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    to_store = sub.add_parser("import", help="results JSON -> store directory")
+    to_store.add_argument("json_file")
+    to_store.add_argument("store_dir")
+    to_json = sub.add_parser("export", help="store directory -> results JSON")
+    to_json.add_argument("store_dir")
+    to_json.add_argument("json_file")
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        write_store(load_results(args.json_file), args.store_dir)
+        print(f"Results store written to {args.store_dir}")
+    else:
+        export_json(args.store_dir, args.json_file)
+        print(f"Results exported to {args.json_file}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import fnmatch
+import os
+import threading
+import time
+from results_store import is_store
+
+# Polls a results source in a background thread: a results JSON file, a
+# results store directory, or a directory holding many of them (one run
+# each). Each run has a version (mtime and size of the JSON file or of the
+# store's index.json), so rewritten runs are picked up as well as new ones.
+# A JSON file is only listed once its version is unchanged over two scans,
+# so half-written files are not opened; stores write index.json last and
+# atomically and are listed as soon as it exists. Runs that fail to load
+# (e.g. other JSON files in the directory) are discarded until rewritten.
+
+class RunWatcher:
+    def __init__(self, source, interval=2.0, pattern="*.json", on_new_version=None):
+        self.source = source
+        self.interval = interval
+        self.pattern = pattern
+        self.on_new_version = on_new_version   # Called from the watcher thread with (name, path, version)
+        self._runs = {}      # name -> (path, version)
+        self._seen = {}      # JSON path -> version at the previous scan
+        self._discarded = set()   # (path, version) that failed to load
+        self._lock = threading.Lock()
+        self._thread = None
+        self._scans = 0
+
+    def candidates(self):
+        # {name: path} of the runs currently present in the source
+        if not os.path.isdir(self.source) or is_store(self.source):
+            return {os.path.basename(os.path.normpath(self.source)): self.source} if os.path.exists(self.source) else {}
+        runs = {}
+        for entry in os.scandir(self.source):
+            if entry.is_dir() and is_store(entry.path):
+                runs[entry.name] = entry.path
+            elif entry.is_file() and fnmatch.fnmatch(entry.name, self.pattern):
+                runs[entry.name] = entry.path
+        return runs
+
+    @staticmethod
+    def version(path):
+        target = os.path.join(path, "index.json") if os.path.isdir(path) else path
+        stat = os.stat(target)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def scan(self):
+        # One pass over the source; returns the names of new or rewritten runs
+        changed = []
+        found = {}
+        for name, path in self.candidates().items():
+            try:
+                version = self.version(path)
+            except OSError:
+                continue   # Removed (or not complete) between listing and stat
+            if not os.path.isdir(path):
+                # Files present at the first scan are taken as complete
+                settled = self._scans == 0 or self._seen.get(path) == version
+                self._seen[path] = version
+                if not settled:
+                    if name in self._runs:
+                        found[name] = self._runs[name]
+                    continue
+            if (path, version) in self._discarded:
+                continue
+            found[name] = (path, version)
+            if self._runs.get(name) != (path, version):
+                changed.append(name)
+        with self._lock:
+            self._runs = found
+        self._scans += 1
+        return changed
+
+    def runs(self):
+        # [(name, path, version)], most recently written first
+        with self._lock:
+            runs = [(name, path, version) for name, (path, version) in self._runs.items()]
+        return sorted(runs, key=lambda run: run[2][0], reverse=True)
+
+    def get(self, name):
+        with self._lock:
+            return self._runs.get(name)
+
+    def discard(self, path, version):
+        # Drop a run that is not a readable results set (until it changes)
+        with self._lock:
+            self._discarded.add((path, version))
+            self._runs = {name: run for name, run in self._runs.items() if run != (path, version)}
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            for name in self.scan():
+                path, version = self.get(name) or (None, None)
+                if path is not None and self.on_new_version is not None:
+                    try:
+                        self.on_new_version(name, path, version)
+                    except Exception as e:
+                        print(f"Could not load run {name}: {e}")
+                        self.discard(path, version)
+
+    def start(self):
+        # First scan in the caller's thread, then poll in a daemon thread
+        if self._thread is None:
+            self.scan()
+            self._thread = threading.Thread(target=self._loop, name="results-watcher", daemon=True)
+            self._thread.start()
+        return self
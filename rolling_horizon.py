@@ -0,0 +1,176 @@
+import argparse
+import json
+from pyomo.environ import *
+from unit_commitment_model_solar import DR_FORMULATIONS, define_model
+from solve_uc_solar import extract_results
+from data_loader import load_data, parse_timeseries_args
+from solver_config import (as_solver_config, make_solver, solve_instance, check_solution,
+                           add_solver_arguments, solver_config_from_args)
+
+# Rolling-horizon unit commitment for multi-day studies. Each window covers
+# `horizon` hours that are committed plus `lookahead` hours that are solved
+# but discarded; the committed end state (status, time in state, output and
+# storage SOC) becomes the next window's initial conditions, and the
+# committed hours of all windows are stitched into one results JSON.
+#
+# Only the first window keeps InitialConditions (y[g,1] == y0[g]), as the
+# monolithic model does at hour 1. In later windows y0 is the previous
+# window's end state, so units may switch in hour 1: StartupShutdown at t=1
+# (y[1] - y0 = u - v) links the windows, and UT0/DT0 and P0 carry the
+# minimum up/down times and ramps across the boundary.
+
+TIME_SERIES = ("Demand", "RenewablesProfile")   # Parameters indexed by (component, hour)
+
+def data_hours(data):
+    return max(t for (_, t) in data[None]["Demand"])
+
+def tile_days(data, days):
+    # Repeat a 24-hour case over several days (for studies on the shipped dataset)
+    tiled = dict(data[None])
+    hours = data_hours(data)
+    for name in TIME_SERIES:
+        tiled[name] = {(c, t + d * hours): v for (c, t), v in data[None][name].items() for d in range(days)}
+    return {None: tiled}
+
+def window_data(data, start, length, state):
+    # Slice hours start+1 .. start+length, renumbered from 1, with the initial
+    # conditions in state
+    window = dict(data[None])
+    for name in TIME_SERIES:
+        window[name] = {(c, t - start): v for (c, t), v in data[None][name].items() if start < t <= start + length}
+    window.update(state)
+    return {None: window}
+
+def initial_state(data):
+    # Initial conditions of the first window, as given in the data
+    state = {name: dict(data[None][name]) for name in ("y0", "SOC_init")}
+    for name in ("UT0", "DT0", "P0"):
+        if name in data[None]:
+            state[name] = dict(data[None][name])
+    return state
+
+def time_in_state(history, initial_status, initial_hours):
+    # Hours the unit has been in its final state at the end of history; a run
+    # reaching back to the start of the study adds the hours given in the data
+    final = history[-1]
+    run = 0
+    for status in reversed(history):
+        if status != final:
+            return run
+        run += 1
+    return run + initial_hours if initial_status == final else run
+
+def next_state(instance, last_hour, stitched, first_state):
+    # End-of-window conditions carried into the next window
+    new_state = {"y0": {}, "UT0": {}, "DT0": {}, "P0": {}, "SOC_init": {}}
+    for g in instance.G:
+        status = int(round(value(instance.y[g, last_hour])))
+        history = [int(round(y)) for y in stitched["generators"][str(g)]["on_off_status"]]
+        initial_status = first_state["y0"][g]
+        new_state["y0"][g] = status
+        if status == 1:
+            new_state["UT0"][g] = time_in_state(history, initial_status, first_state.get("UT0", {}).get(g, 0))
+            new_state["DT0"][g] = 0
+        else:
+            new_state["UT0"][g] = 0
+            new_state["DT0"][g] = time_in_state(history, initial_status, first_state.get("DT0", {}).get(g, 0))
+        new_state["P0"][g] = value(instance.P[g, last_hour])
+    for s in instance.SD:
+        # Clip solver round-off so SOC_init stays within its NonNegativeReals domain
+        new_state["SOC_init"][s] = min(max(value(instance.SOC[s, last_hour]), 0), 1)
+    return new_state
+
+def confine_demand_shift(instance, last_hour):
+    # Demand may not be shifted across the end of the committed hours, since
+    # the look-ahead part of the window is discarded
+    if value(instance.dr_formulation) == 'backlog':
+        for b in instance.B:
+            instance.deferred_backlog[b, last_hour].fix(0)
+            instance.advanced_backlog[b, last_hour].fix(0)
+    else:
+        for (b, t1, t2) in instance.shift:
+            if min(t1, t2) <= last_hour < max(t1, t2):
+                instance.shift[b, t1, t2].fix(0)
+
+def append_results(stitched, window_results):
+    if stitched is None:
+        return window_results
+    stitched["total_cost"] += window_results["total_cost"]
+    for category, components in window_results.items():
+        if category == "total_cost":
+            continue
+        for name, series in components.items():
+            for key, values in series.items():
+                if isinstance(values, list):
+                    stitched[category][name][key].extend(values)
+    return stitched
+
+def run_rolling_horizon(data,
+                        output_json="unit_commitment_results.json",
+                        horizon=24,
+                        lookahead=12,
+                        shift_max_percent=0.2,
+                        shift_max_hours=2,
+                        dr_formulation='pairwise',
+                        solver_name='glpk'):
+    # solver_name: Pyomo solver name or solver_config dict
+
+    total_hours = data_hours(data)
+    config = as_solver_config(solver_name)
+    solver = make_solver(config)
+    first_state = state = initial_state(data)
+    stitched = None
+    windows = []
+
+    for start in range(0, total_hours, horizon):
+        committed = min(horizon, total_hours - start)
+        length = min(horizon + lookahead, total_hours - start)
+        print(f"Rolling horizon: hours {start + 1}-{start + committed} (+{length - committed} look-ahead)")
+
+        model = define_model(shift_max_percent, min(shift_max_hours, length - 1),
+                             dr_formulation=dr_formulation, num_hours=length)
+        instance = model.create_instance(window_data(data, start, length, state))
+        if start > 0:
+            instance.InitialConditions.deactivate()
+        if length > committed:
+            confine_demand_shift(instance, committed)
+        status = check_solution(solve_instance(solver, instance, config))
+
+        window_results = extract_results(instance, hours=range(1, committed + 1))
+        windows.append({"start_hour": start + 1, "end_hour": start + committed,
+                        "lookahead": length - committed, "cost": window_results["total_cost"],
+                        "solver": status})
+        stitched = append_results(stitched, window_results)
+        state = next_state(instance, committed, stitched, first_state)
+
+    stitched["rolling_horizon"] = {"horizon": horizon, "lookahead": lookahead, "windows": windows}
+    with open(output_json, "w") as f:
+        json.dump(stitched, f, indent=4)
+
+    print(f"Rolling horizon results saved to {output_json}")
+    return stitched
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-day rolling-horizon unit commitment")
+    parser.add_argument("--data", default="unit_commitment_data_solar.dat")
+    parser.add_argument("--output", default="unit_commitment_results.json")
+    parser.add_argument("--timeseries", action="append", metavar="NAME=PATH",
+                        help="CSV/Parquet table replacing a time series of --data, e.g. Demand=demand.csv")
+    parser.add_argument("--days", type=int, default=1, help="repeat the input profile over this many days")
+    parser.add_argument("--horizon", type=int, default=24, help="hours committed per window")
+    parser.add_argument("--lookahead", type=int, default=12, help="extra hours solved per window and discarded")
+    parser.add_argument("--shift-max-percent", type=float, default=0.2)
+    parser.add_argument("--shift-max-hours", type=int, default=2)
+    parser.add_argument("--dr-formulation", choices=DR_FORMULATIONS, default="pairwise")
+    add_solver_arguments(parser)
+    args = parser.parse_args(argv)
+
+    data = load_data(args.data, parse_timeseries_args(args.timeseries))
+    if args.days > 1:
+        data = tile_days(data, args.days)
+    run_rolling_horizon(data, args.output, args.horizon, args.lookahead,
+                        args.shift_max_percent, args.shift_max_hours,
+                        args.dr_formulation, solver_config_from_args(args))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import numpy as np
+from results_store import ATTRIBUTES, SERIES
+
+# Many scenarios of the same network in one directory: each series is one
+# append-only file of float64 records, one (components, hours) record per
+# scenario, and index.jsonl maps each scenario to its parameters, total cost
+# and record offset. Readers memory-map the series files, so comparing a
+# few scenarios reads only those records.
+#
+#   <store>/meta.json                      components, attributes, num_hours
+#   <store>/index.jsonl                    {"scenario", "params", "total_cost", "offset"} per line
+#   <store>/generators/on_off_status.f64   record r at byte r * components * hours * 8
+#   ...
+#
+# There is a single writer (e.g. the sweep's main process). A record is
+# written before its index line, so a crash in between only leaves an unused
+# record, which the next scenario overwrites.
+
+SCENARIO_STORE_VERSION = 1
+
+class ScenarioStore:
+    def __init__(self, path):
+        self.path = path
+        self.meta = None
+        self.index = {}       # scenario -> index entry (a later entry replaces an earlier one)
+        self._index_size = 0
+        self._arrays = {}
+        meta_file = os.path.join(path, "meta.json")
+        if os.path.exists(meta_file):
+            with open(meta_file, "r") as f:
+                self.meta = json.load(f)
+        self.refresh()
+
+    def refresh(self):
+        # Read index lines appended since the last call (e.g. by a running sweep)
+        index_file = os.path.join(self.path, "index.jsonl")
+        if not os.path.exists(index_file) or os.path.getsize(index_file) == self._index_size:
+            return False
+        if self.meta is None:
+            with open(os.path.join(self.path, "meta.json"), "r") as f:
+                self.meta = json.load(f)
+        with open(index_file, "r") as f:
+            f.seek(self._index_size)
+            for line in f:
+                if not line.endswith("\n"):
+                    break   # Line still being written
+                entry = json.loads(line)
+                self.index[entry["scenario"]] = entry
+                self._index_size += len(line.encode())
+        self._arrays = {}   # Series files may have grown
+        return True
+
+    @property
+    def num_hours(self):
+        return self.meta["num_hours"]
+
+    def ids(self, category):
+        return self.meta["components"][category]
+
+    def scenarios(self):
+        return list(self.index.values())
+
+    def _record_shape(self, category):
+        return (len(self.ids(category)), self.num_hours)
+
+    def _series_file(self, category, name):
+        return os.path.join(self.path, category, f"{name}.f64")
+
+    def add(self, scenario, params, total_cost, components, attributes, arrays, num_hours):
+        # components/attributes/arrays as returned by solve_uc_solar.extract_arrays
+        if self.meta is None:
+            os.makedirs(self.path, exist_ok=True)
+            self.meta = {"version": SCENARIO_STORE_VERSION, "num_hours": num_hours,
+                         "components": components, "attributes": attributes}
+            with open(os.path.join(self.path, "meta.json"), "w") as f:
+                json.dump(self.meta, f)
+        elif components != self.meta["components"] or num_hours != self.num_hours:
+            raise ValueError(f"Scenario {scenario} does not match the network of {self.path}")
+
+        offset = max((entry["offset"] for entry in self.index.values()), default=-1) + 1
+        for category, series_names in SERIES.items():
+            os.makedirs(os.path.join(self.path, category), exist_ok=True)
+            shape = self._record_shape(category)
+            for name in series_names:
+                record = np.ascontiguousarray(arrays[category][name], dtype=np.float64).reshape(shape)
+                series_file = self._series_file(category, name)
+                with open(series_file, "r+b" if os.path.exists(series_file) else "wb") as f:
+                    f.seek(offset * record.nbytes)
+                    f.write(record.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+
+        entry = {"scenario": scenario, "params": params, "total_cost": total_cost, "offset": offset}
+        line = json.dumps(entry) + "\n"
+        with open(os.path.join(self.path, "index.jsonl"), "a") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self.index[scenario] = entry
+        self._index_size += len(line.encode())
+        self._arrays = {}
+        return entry
+
+    def series(self, category, name):
+        # Memory-mapped (records, components, hours) array of one series
+        key = (category, name)
+        if key not in self._arrays:
+            shape = self._record_shape(category)
+            record_bytes = shape[0] * shape[1] * 8
+            series_file = self._series_file(category, name)
+            records = os.path.getsize(series_file) // record_bytes if record_bytes else 0
+            self._arrays[key] = np.memmap(series_file, dtype=np.float64, mode="r", shape=(records,) + shape)
+        return self._arrays[key]
+
+    def slice(self, scenario, category, name):
+        # (components, hours) array of one scenario
+        return self.series(category, name)[self.index[scenario]["offset"]]
+
+    def to_dict(self, scenario):
+        # One scenario in the legacy results JSON layout
+        results_data = {"total_cost": self.index[scenario]["total_cost"]}
+        for category, series_names in SERIES.items():
+            rows = {name: np.asarray(self.slice(scenario, category, name)).tolist() for name in series_names}
+            attrs = self.meta["attributes"][category]
+            results_data[category] = {
+                c: {**{name: rows[name][i] for name in series_names},
+                    **{attr: attrs[attr][i] for attr in ATTRIBUTES[category]}}
+                for i, c in enumerate(self.ids(category))
+            }
+        results_data["scenario"] = {"name": scenario, "params": self.index[scenario]["params"]}
+        return results_data
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List or export scenarios of a scenario store")
+    parser.add_argument("store_dir")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="print the scenario index")
+    export = sub.add_parser("export", help="write one scenario as a results JSON")
+    export.add_argument("scenario")
+    export.add_argument("json_file")
+    args = parser.parse_args(argv)
+
+    store = ScenarioStore(args.store_dir)
+    if args.command == "list":
+        for entry in sorted(store.scenarios(), key=lambda e: e["offset"]):
+            params = " ".join(f"{k}={v}" for k, v in entry["params"].items())
+            print(f"{entry['scenario']:<16} {params:<48} {entry['total_cost']:>14,.2f}")
+    else:
+        with open(args.json_file, "w") as f:
+            json.dump(store.to_dict(args.scenario), f, indent=4)
+        print(f"Scenario {args.scenario} exported to {args.json_file}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+
+# Command-line client of the local solve service (solve_service.py). It only
+# needs the standard library, so submitting a job does not load Pyomo:
+#   python solve_client.py submit unit_commitment_data_solar.dat --shift-max-hours 4 --priority -1 --follow
+#   python solve_client.py status [job id]
+#   python solve_client.py cancel <job id>
+# Choices such as --mode are checked by the service, which answers invalid
+# jobs with their error.
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+
+def request(url, method="GET", payload=None):
+    # (HTTP status, response) from the service; error responses are returned too
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as error:
+        return error.code, json.load(error)
+
+def submit_job(job, url=DEFAULT_URL):
+    # Job id for a job dict (see solve_service.py); ValueError if rejected
+    code, response = request(f"{url}/jobs", "POST", job)
+    if code != 201:
+        raise ValueError(response["error"])
+    return response["id"]
+
+def job_events(job_id, url=DEFAULT_URL):
+    # Yields the job's progress events until it has finished
+    with urllib.request.urlopen(f"{url}/jobs/{job_id}/events") as response:
+        for line in response:
+            yield json.loads(line)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Submit and inspect jobs of the local solve service")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    commands = parser.add_subparsers(dest="command", required=True)
+    submit = commands.add_parser("submit", help="submit a job")
+    submit.add_argument("data_file")
+    submit.add_argument("--inline", action="store_true", help="send the file contents instead of its path")
+    submit.add_argument("--shift-max-percent", type=float, default=0.2)
+    submit.add_argument("--shift-max-hours", type=int, default=2)
+    submit.add_argument("--mode", default="milp")
+    submit.add_argument("--network", default="transport")
+    submit.add_argument("--solver", default=None, help="solver name (default: the service's)")
+    submit.add_argument("--name", default=None, help="name of the results store, not used by another job (default: the job id)")
+    submit.add_argument("--priority", type=float, default=0, help="lower runs first")
+    submit.add_argument("--follow", action="store_true", help="print the job's progress until it finishes")
+    status = commands.add_parser("status", help="show one job or all jobs")
+    status.add_argument("job", nargs="?")
+    cancel = commands.add_parser("cancel", help="cancel a queued job")
+    cancel.add_argument("job")
+    args = parser.parse_args(argv)
+
+    if args.command == "submit":
+        job = {"shift_max_percent": args.shift_max_percent, "shift_max_hours": args.shift_max_hours,
+               "mode": args.mode, "network": args.network, "solver": args.solver, "name": args.name,
+               "priority": args.priority}
+        if args.inline:
+            with open(args.data_file, "r") as f:
+                job["data"] = f.read()
+        else:
+            job["data_file"] = os.path.abspath(args.data_file)
+        try:
+            job_id = submit_job(job, args.url)
+        except ValueError as error:
+            print(f"Job rejected: {error}")
+            sys.exit(1)
+        print(f"Submitted job {job_id}")
+        if args.follow:
+            for event in job_events(job_id, args.url):
+                print(json.dumps(event))
+            if event["event"] != "done":
+                sys.exit(1)
+        return
+    if args.command == "status":
+        code, response = request(f"{args.url}/jobs" + (f"/{args.job}" if args.job else ""))
+    else:
+        code, response = request(f"{args.url}/jobs/{args.job}", "DELETE")
+    print(json.dumps(response, indent=4))
+    if code >= 300:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,368 @@
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from solve_uc_solar import SOLVE_MODES, solve_unit_commitment
+from unit_commitment_model_solar import COMMITMENT_FORMULATIONS, DR_FORMULATIONS, NETWORK_MODES
+from solver_config import SOLVER_BACKENDS, as_solver_config, add_solver_arguments, solver_config_from_args
+from instrumentation import add_listener
+
+# Local solve service: many unit commitment solves from operators and
+# scripts without a fresh Python and Pyomo per request. An asyncio server on
+# 127.0.0.1 takes jobs over a small JSON HTTP API (standard library only),
+# keeps them in a priority queue and runs them in a process pool whose
+# workers import Pyomo and the model once at start-up. Each job's results go
+# to a results store under the results directory, which index.json makes
+# visible atomically, so a dashboard on that directory lists every finished
+# job:
+#   python solve_service.py --results service_results --solver appsi_highs
+#   python solve_client.py submit unit_commitment_data_solar.dat --follow
+#   python dashapp.py service_results
+#
+#   POST   /jobs              submit a job, returns {"id": ...}
+#   GET    /jobs              all jobs (without their events)
+#   GET    /jobs/<id>         one job
+#   GET    /jobs/<id>/events  its progress events as JSON lines, streamed
+#                             until the job has finished
+#   DELETE /jobs/<id>         cancel a queued job
+#
+# A job is a JSON object: "data_file" (a .dat path on this machine) or
+# "data" (.dat file contents), and optionally shift_max_percent,
+# shift_max_hours, dr_formulation, mode, network, commitment_formulation,
+# cluster_tolerance, "solver" (a name or solver_config fields, default the
+# server's --solver settings), "name" (of its results store, default the job
+# id; a name already used by a queued, running or finished job, or by an
+# existing store, is rejected with 409 Conflict) and "priority" (lower runs first, default 0; equal priorities run in
+# submission order). Progress events are the job's state changes and its
+# pipeline timers (see instrumentation.py), e.g. create_instance or solve.
+# Job records are kept in <results>/_jobs/<id>.json, and jobs finished
+# before a restart are listed again.
+
+DEFAULT_PORT = 8765
+FINISHED = ("done", "failed", "cancelled")
+JOB_DEFAULTS = {"shift_max_percent": 0.2, "shift_max_hours": 2, "dr_formulation": "pairwise", "mode": "milp",
+                "network": "transport", "commitment_formulation": "basic", "cluster_tolerance": None,
+                "solver": None, "name": None, "priority": 0}
+CHOICES = {"mode": SOLVE_MODES, "network": NETWORK_MODES, "dr_formulation": DR_FORMULATIONS,
+           "commitment_formulation": COMMITMENT_FORMULATIONS}
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           409: "Conflict"}
+
+_worker = {}
+
+def init_worker(progress):
+    # Process pool initializer: the imports above are done once per worker;
+    # timer events of the running job are forwarded to the server
+    _worker["progress"] = progress
+    _worker["job"] = None
+    add_listener(forward_event)
+
+def forward_event(event):
+    if _worker["job"] is not None and "timer" in event:
+        _worker["progress"].put({"job": _worker["job"], "event": "progress", "phase": event["timer"],
+                                 "seconds": event["seconds"], "time": event["time"]})
+
+def run_job(job_id, params, output_store):
+    # Solves one job in a worker; returns the solver status
+    _worker["job"] = job_id
+    _worker["progress"].put({"job": job_id, "event": "running", "pid": os.getpid(), "time": time.time()})
+    data_file = params.get("data_file")
+    try:
+        if data_file is None:
+            # Inline .dat contents
+            with tempfile.NamedTemporaryFile("w", suffix=".dat", delete=False) as f:
+                f.write(params["data"])
+            data_file = f.name
+        return solve_unit_commitment(data_file, None, shift_max_percent=params["shift_max_percent"],
+                                     shift_max_hours=params["shift_max_hours"],
+                                     dr_formulation=params["dr_formulation"], output_store=output_store,
+                                     solver_settings=params["solver"], mode=params["mode"],
+                                     network=params["network"],
+                                     commitment_formulation=params["commitment_formulation"],
+                                     cluster_tolerance=params["cluster_tolerance"])
+    finally:
+        _worker["job"] = None
+        if params.get("data_file") is None:
+            os.remove(data_file)
+        # Last message of the job on the queue: the server publishes the final
+        # event only after it, so no progress event can follow "done"
+        _worker["progress"].put({"job": job_id, "event": "worker_finished"})
+
+def job_params(request, default_solver):
+    # Validated job parameters from a submitted JSON object (ValueError if invalid)
+    if not isinstance(request, dict):
+        raise ValueError("A job must be a JSON object")
+    unknown = set(request) - set(JOB_DEFAULTS) - {"data", "data_file"}
+    if unknown:
+        raise ValueError(f"Unknown job fields: {', '.join(sorted(unknown))}")
+    params = {**JOB_DEFAULTS, **request}
+    if ("data" in params) == ("data_file" in params):
+        raise ValueError("A job needs either data (.dat contents) or data_file")
+    if "data_file" in params and not os.path.isfile(params["data_file"]):
+        raise ValueError(f"Data file {params['data_file']} not found")
+    for name, choices in CHOICES.items():
+        if params[name] not in choices:
+            raise ValueError(f"{name} must be one of {choices}, got {params[name]!r}")
+    try:
+        params["shift_max_percent"] = float(params["shift_max_percent"])
+        params["shift_max_hours"] = int(params["shift_max_hours"])
+        params["priority"] = float(params["priority"])
+        if params["cluster_tolerance"] is not None:
+            params["cluster_tolerance"] = float(params["cluster_tolerance"])
+        params["solver"] = as_solver_config(params["solver"] if params["solver"] is not None else default_solver)
+    except TypeError as error:
+        raise ValueError(f"Invalid solver settings: {error}")
+    if params["solver"]["name"] not in SOLVER_BACKENDS:
+        raise ValueError(f"solver must be one of {SOLVER_BACKENDS}, got {params['solver']['name']!r}")
+    name = params["name"]
+    if name is not None and (not isinstance(name, str) or not name or name.startswith(("_", ".")) or os.sep in name):
+        raise ValueError(f"Invalid results name {name!r}")
+    return params
+
+def job_summary(job):
+    # A job record without its events and inline data
+    summary = {k: v for k, v in job.items() if k != "events"}
+    summary["params"] = {k: v for k, v in job["params"].items() if k != "data"}
+    return summary
+
+class SolveService:
+    def __init__(self, results_dir, workers=None, default_solver="glpk"):
+        self.results_dir = results_dir
+        self.jobs_dir = os.path.join(results_dir, "_jobs")
+        self.workers = workers or os.cpu_count() or 1
+        self.default_solver = default_solver
+        self.jobs = {}                 # id -> job record
+        self.worker_finished = {}      # id -> future set when the worker's last message arrives
+        self._sequence = itertools.count()
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        self.load_jobs()
+
+    def load_jobs(self):
+        # Finished jobs from an earlier run of the service
+        for entry in sorted(os.scandir(self.jobs_dir), key=lambda e: e.name):
+            if entry.name.endswith(".json"):
+                with open(entry.path, "r") as f:
+                    job = json.load(f)
+                self.jobs[job["id"]] = {**job, "events": []}
+
+    def save_job(self, job):
+        # Written to a temporary file and renamed, so a record is never partial
+        path = os.path.join(self.jobs_dir, f"{job['id']}.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(job_summary(job), f, indent=4)
+        os.replace(path + ".tmp", path)
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        self.loop = asyncio.get_running_loop()
+        self.changed = asyncio.Condition()
+        self.queue = asyncio.PriorityQueue()
+        self.progress = multiprocessing.Queue()
+        self.pool = ProcessPoolExecutor(self.workers, initializer=init_worker, initargs=(self.progress,))
+        # Worker events arrive on a multiprocessing queue, read by a thread
+        self.reader = threading.Thread(target=self.read_progress, daemon=True)
+        self.reader.start()
+        self.dispatchers = [asyncio.create_task(self.dispatch()) for _ in range(self.workers)]
+        self.server = await asyncio.start_server(self.handle, host, port)
+        print(f"Solve service on http://{host}:{port} with {self.workers} worker(s), "
+              f"results in {self.results_dir}")
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        for task in self.dispatchers:
+            task.cancel()
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        self.progress.put(None)
+        self.reader.join()
+
+    def read_progress(self):
+        while True:
+            event = self.progress.get()
+            if event is None:
+                return
+            if event["event"] == "worker_finished":
+                asyncio.run_coroutine_threadsafe(self.drained(event["job"]), self.loop)
+            else:
+                asyncio.run_coroutine_threadsafe(self.publish(event["job"], event), self.loop)
+
+    async def drained(self, job_id):
+        # Runs after the publish calls of the job's earlier messages (the
+        # reader schedules them in queue order)
+        async with self.changed:
+            future = self.worker_finished.get(job_id)
+            if future is not None and not future.done():
+                future.set_result(None)
+
+    async def publish(self, job_id, event, **changes):
+        # Adds an event to a job, applies changes to its record and wakes streams
+        job = self.jobs[job_id]
+        if event["event"] == "progress" and job["state"] in FINISHED:
+            return
+        if event["event"] == "running":
+            changes.setdefault("state", "running")
+            changes.setdefault("started", event["time"])
+        async with self.changed:
+            job.update(changes)
+            job["events"].append(event)
+            self.changed.notify_all()
+
+    def name_in_use(self, name):
+        # Whether a job's results would overwrite another job's store: only
+        # cancelled jobs release their name
+        store = os.path.join(self.results_dir, name)
+        return os.path.exists(store) or any(job["store"] == store and job["state"] != "cancelled"
+                                            for job in self.jobs.values())
+
+    async def submit(self, params):
+        # Queues a job with validated parameters (see job_params)
+        job_id = uuid.uuid4().hex[:12]
+        job = {"id": job_id, "name": params["name"] or job_id, "priority": params["priority"], "state": "queued",
+               "submitted": time.time(), "started": None, "finished": None, "params": params,
+               "store": os.path.join(self.results_dir, params["name"] or job_id), "status": None, "error": None,
+               "events": []}
+        self.jobs[job_id] = job
+        await self.publish(job_id, {"job": job_id, "event": "queued", "time": job["submitted"]})
+        await self.queue.put((params["priority"], next(self._sequence), job_id))
+        return job
+
+    async def cancel(self, job_id):
+        if self.jobs[job_id]["state"] != "queued":
+            return False
+        # The queue entry stays; dispatch skips it
+        now = time.time()
+        await self.publish(job_id, {"job": job_id, "event": "cancelled", "time": now}, state="cancelled", finished=now)
+        self.save_job(self.jobs[job_id])
+        return True
+
+    async def dispatch(self):
+        # One dispatcher per worker, so the queue (not the pool) orders the jobs
+        while True:
+            _, _, job_id = await self.queue.get()
+            job = self.jobs[job_id]
+            if job["state"] != "queued":
+                continue
+            job["state"] = "running"
+            finished = self.worker_finished[job_id] = self.loop.create_future()
+            try:
+                status = await self.loop.run_in_executor(self.pool, run_job, job_id, job["params"], job["store"])
+                event, changes = {"event": "done", "total_cost": status["upper_bound"]}, {"status": status}
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                event, changes = {"event": "failed", "error": f"{type(error).__name__}: {error}"}, \
+                                 {"error": f"{type(error).__name__}: {error}"}
+                if isinstance(error, BrokenProcessPool):
+                    # The worker died without its last message
+                    finished.set_result(None)
+            now = time.time()
+            # The worker's progress events are published before the final one
+            await finished
+            del self.worker_finished[job_id]
+            await self.publish(job_id, {"job": job_id, **event, "time": now}, state=event["event"], finished=now,
+                               **changes)
+            self.save_job(job)
+            print(f"Job {job['name']} {event['event']} in {now - (job['started'] or job['submitted']):.2f} s")
+
+    async def handle(self, reader, writer):
+        # One HTTP/1.1 request per connection
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                key, _, val = line.partition(":")
+                headers[key.strip().lower()] = val.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            if len(request_line) < 2:
+                await self.respond(writer, 400, {"error": "Malformed request"})
+            else:
+                await self.route(request_line[0], request_line[1].rstrip("/").split("/")[1:], body, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body, writer):
+        if not path or path[0] != "jobs" or len(path) > 3:
+            return await self.respond(writer, 404, {"error": "Not found"})
+        if len(path) == 1:
+            if method == "GET":
+                return await self.respond(writer, 200, [job_summary(job) for job in self.jobs.values()])
+            if method == "POST":
+                try:
+                    params = job_params(json.loads(body or b"null"), self.default_solver)
+                except ValueError as error:
+                    return await self.respond(writer, 400, {"error": str(error)})
+                if params["name"] is not None and self.name_in_use(params["name"]):
+                    return await self.respond(writer, 409, {"error": f"Results name {params['name']!r} is already in use"})
+                job = await self.submit(params)
+                return await self.respond(writer, 201, {"id": job["id"], "name": job["name"], "store": job["store"]})
+            return await self.respond(writer, 405, {"error": f"{method} not allowed"})
+        job = self.jobs.get(path[1])
+        if job is None:
+            return await self.respond(writer, 404, {"error": f"No job {path[1]}"})
+        if len(path) == 3:
+            if path[2] != "events" or method != "GET":
+                return await self.respond(writer, 404, {"error": "Not found"})
+            return await self.stream(job, writer)
+        if method == "GET":
+            return await self.respond(writer, 200, job_summary(job))
+        if method == "DELETE":
+            if await self.cancel(job["id"]):
+                return await self.respond(writer, 200, job_summary(job))
+            return await self.respond(writer, 409, {"error": f"Job {job['id']} is {job['state']}, not queued"})
+        return await self.respond(writer, 405, {"error": f"{method} not allowed"})
+
+    async def respond(self, writer, code, payload):
+        body = json.dumps(payload).encode()
+        writer.write(f"HTTP/1.1 {code} {REASONS[code]}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+
+    async def stream(self, job, writer):
+        # Events as JSON lines; the body ends (connection closed) when the job has
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nConnection: close\r\n\r\n")
+        sent = 0
+        while True:
+            async with self.changed:
+                await self.changed.wait_for(lambda: len(job["events"]) > sent or job["state"] in FINISHED)
+                events = job["events"][sent:]
+                finished = job["state"] in FINISHED
+            sent += len(events)
+            writer.write(b"".join(json.dumps(event).encode() + b"\n" for event in events))
+            await writer.drain()
+            if finished:
+                return
+
+async def serve(results_dir, workers, default_solver, port):
+    service = SolveService(results_dir, workers, default_solver)
+    await service.start(port=port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.stop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local unit commitment solve service (see solve_client.py)")
+    parser.add_argument("--results", default="service_results", help="directory of the job results stores")
+    parser.add_argument("--workers", type=int, default=None, help="solver processes (default: CPU count)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    add_solver_arguments(parser)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.results, args.workers, solver_config_from_args(args), args.port))
+    except KeyboardInterrupt:
+        print("Solve service stopped")
+
+if __name__ == '__main__':
+    main()
@@ -1,79 +1,231 @@
 import json
+import numpy as np
 from pyomo.environ import *
-from pyomo.opt import SolverFactory
-from unit_commitment_model_solar import define_model
+from pyomo.contrib import appsi
+from unit_commitment_model_solar import define_model, update_demand_shift
+from results_store import write_store_arrays
+from data_loader import load_data
+from solver_config import solver_config, as_solver_config, make_solver, check_solution
+from instrumentation import timer, count
+from commitment_heuristic import fix_and_optimize
+from dc_network import solve_network
+from generator_clustering import cluster_generators, clustering_summary, disaggregate
 
-def solve_unit_commitment(data_file, 
-                          output_json="unit_commitment_results.json", 
-                          shift_max_percent=0.2,    
-                          shift_max_hours=4):
-    
-    print("Solving Unit Commitment Problem with Solar and Storage...")
-    # Load the model and data
-    instance = define_model(shift_max_percent, shift_max_hours).create_instance(data_file)
+# solve_unit_commitment modes: the full MILP, the LP-relaxation fix-and-optimize
+# heuristic (commitment_heuristic.py), or the heuristic followed by the MILP
+# warm-started from its solution
+SOLVE_MODES = ('milp', 'heuristic', 'heuristic_milp')
 
-    # Solve the optimization problem
-    solver = SolverFactory('glpk')
-    results = solver.solve(instance, tee=True)
+def make_persistent_solver(tee=False, threads=None, mip_gap=None, time_limit=None, logfile=None):
+    # In-memory HiGHS solver (appsi) that keeps the instance loaded between solves.
+    # With warmstart on, each solve hands the current variable values to HiGHS as a
+    # MIP start; HiGHS fixes the previous y/u/v commitment and solves the LP for the
+    # rest to get an incumbent before branch-and-bound starts.
+    solver = appsi.solvers.Highs()
+    if not solver.available():
+        raise RuntimeError("Persistent solver requires highspy (pip install highspy)")
+    solver.config.warmstart = True
+    solver.config.stream_solver = tee
+    solver.config.mip_gap = mip_gap
+    solver.config.time_limit = time_limit
+    if threads is not None:
+        solver.highs_options["threads"] = threads
+    if logfile is not None:
+        solver.highs_options.update(log_file=logfile, log_to_console=tee)
+    return solver
 
-    # Prepare results to be stored in a JSON format
-    results_data = {
-        "total_cost": value(instance.TotalCost),
-        "generators": {},
+def period_cost(instance, hours):
+    # Generation, startup and shutdown cost incurred in the given hours only
+    return value(sum(instance.Cgen[g] * instance.P[g, t] + instance.Cstartup[g] * instance.u[g, t]
+                     + instance.Cshutdown[g] * instance.v[g, t] for g in instance.G for t in hours))
+
+def variable_array(var, shape):
+    # Values of an indexed variable as a dense array in index order; unused
+    # variables (value None) are reported as 0
+    values = np.array([v.value for v in var.values()], dtype=np.float64)
+    return np.nan_to_num(values).reshape(shape)
+
+def net_shift_array(instance, buses, hours):
+    # Net demand shifted into each (bus, hour), computed from the shift variables
+    # in one pass instead of evaluating NetShift per (bus, hour)
+    shape = (len(buses), len(hours))
+    if value(instance.dr_formulation) == 'backlog':
+        return (variable_array(instance.shift_recover, shape) + variable_array(instance.shift_advance, shape)
+                - variable_array(instance.shift_defer, shape) - variable_array(instance.shift_repay, shape))
+    net = np.zeros(shape)
+    if len(instance.shift) == 0:
+        return net
+    bus_pos = {b: i for i, b in enumerate(buses)}
+    hour_pos = {t: i for i, t in enumerate(hours)}
+    keys = list(instance.shift.keys())
+    values = np.nan_to_num(np.array([v.value for v in instance.shift.values()], dtype=np.float64))
+    b = np.array([bus_pos[k[0]] for k in keys])
+    t_from = np.array([hour_pos[k[1]] for k in keys])
+    t_to = np.array([hour_pos[k[2]] for k in keys])
+    np.add.at(net, (b, t_to), values)     # shift (t1, t2) moves demand into t2 ...
+    np.add.at(net, (b, t_from), -values)  # ... and out of t1
+    return net
+
+def extract_arrays(instance):
+    # Solution of a solved instance as dense (components, hours) arrays per
+    # series, in the layout of results_store.write_store_arrays
+    hours = list(instance.T)
+    G, B, L, GS, SD = (list(s) for s in (instance.G, instance.B, instance.L, instance.GS, instance.SD))
+    num_hours = len(hours)
+
+    charge = variable_array(instance.Charge, (len(SD), num_hours))
+    discharge = variable_array(instance.Discharge, (len(SD), num_hours))
+    arrays = {
+        "generators": {
+            "power_output": variable_array(instance.P, (len(G), num_hours)),
+            "on_off_status": variable_array(instance.y, (len(G), num_hours)),
+            "startup": variable_array(instance.u, (len(G), num_hours)),
+            "shutdown": variable_array(instance.v, (len(G), num_hours)),
+        },
+        "buses": {
+            "demand": np.array([[instance.Demand[b, t] for t in hours] for b in B], dtype=np.float64).reshape(len(B), num_hours),
+            "shift": net_shift_array(instance, B, hours),
+        },
+        "transmission_lines": {
+            "flow": variable_array(instance.Flow, (len(L), num_hours)),
+        },
+        "renewables_generators": {
+            "power_output": variable_array(instance.P_renewables, (len(GS), num_hours)),
+        },
+        "storage": {
+            "charge_discharge": charge - discharge,
+            "charge": charge,
+            "discharge": discharge,
+            "SoC": variable_array(instance.SOC, (len(SD), num_hours)),
+        },
+    }
+    components = {"generators": G, "buses": B, "transmission_lines": L, "renewables_generators": GS, "storage": SD}
+    attributes = {
+        "generators": {"max_capacity": [value(instance.Pmax[g]) for g in G],
+                       "connected_bus": [str(instance.GenBus[g]) for g in G]},
         "buses": {},
-        "transmission_lines": {},
-        "renewables_generators": {},
-        "storage": {}
+        "transmission_lines": {"from_bus": [str(instance.LineFrom[l]) for l in L],
+                               "to_bus": [str(instance.LineTo[l]) for l in L]},
+        "renewables_generators": {"max_capacity": [value(instance.Pmax_renewables[g]) for g in GS],
+                                  "connected_bus": [str(instance.GenBusRenewables[g]) for g in GS]},
+        "storage": {"connected_bus": [str(instance.StorageBus[s]) for s in SD]},
     }
+    return {"hours": hours, "components": {c: [str(x) for x in ids] for c, ids in components.items()},
+            "attributes": attributes, "arrays": arrays}
 
-    # Store generator results
-    for g in instance.G:
-        results_data["generators"][str(g)] = {
-            "power_output": [value(instance.P[g, t]) for t in instance.T],
-            "on_off_status": [value(instance.y[g, t]) for t in instance.T],
-            "startup": [value(instance.u[g, t]) for t in instance.T],
-            "shutdown": [value(instance.v[g, t]) for t in instance.T],
-            "max_capacity": value(instance.Pmax[g]),
-            "connected_bus": str(instance.GenBus[g])
-        }
+def extract_results(instance, hours=None, extracted=None):
+    # Results of a solved instance as the JSON-ready dict written by
+    # solve_unit_commitment; hours restricts the series to a subset of instance.T
+    if extracted is None:
+        extracted = extract_arrays(instance)
+    columns = slice(None) if hours is None else [extracted["hours"].index(t) for t in hours]
 
-    # Store bus results (demand, curtailment)
-    for b in instance.B:
-        results_data["buses"][str(b)] = {
-            "demand": [value(instance.Demand[b, t]) for t in instance.T],
-            # "curtailment": [value(instance.Slack[b, t]) for t in instance.T]
-            "shift" : [sum(value(instance.shift[b, k, t]) for k in instance.T if k != t and abs(k - t) < shift_max_hours) - \
-                       sum(value(instance.shift[b, t, k]) for k in instance.T if k != t and abs(k - t) < shift_max_hours)
-                       for t in instance.T]
-        }
+    results_data = {
+        "total_cost": value(instance.TotalCost) if hours is None else period_cost(instance, hours),
+    }
+    results_data.update(arrays_to_results(extracted, columns))
+    return results_data
 
-    # Store transmission line flow results
-    for l in instance.L:
-        results_data["transmission_lines"][str(l)] = {
-            "flow": [value(instance.Flow[l, t]) for t in instance.T],
-            "from_bus": str(instance.LineFrom[l]),
-            "to_bus": str(instance.LineTo[l])
+def arrays_to_results(extracted, columns=slice(None)):
+    # Per-component JSON sections from extract_arrays output (also used by
+    # matrix_builder, which produces the same layout without an instance)
+    results_data = {}
+    for category, series in extracted["arrays"].items():
+        ids = extracted["components"][category]
+        attrs = extracted["attributes"][category]
+        rows = {name: array[:, columns].tolist() for name, array in series.items()}
+        results_data[category] = {
+            c: {**{name: rows[name][i] for name in series}, **{attr: attrs[attr][i] for attr in attrs}}
+            for i, c in enumerate(ids)
         }
+    return results_data
 
-    for g in instance.GS:
-        results_data["renewables_generators"][str(g)] = {
-            "power_output": [value(instance.P_renewables[g, t]) for t in instance.T],
-            "max_capacity": value(instance.Pmax_renewables[g]),
-            "connected_bus": str(instance.GenBusRenewables[g])
-        }
+def solve_unit_commitment(data_file, 
+                          output_json="unit_commitment_results.json", 
+                          shift_max_percent=0.2,    
+                          shift_max_hours=4,
+                          instance=None,
+                          solver=None,
+                          dr_formulation='pairwise',
+                          output_store=None,
+                          solver_settings=None,
+                          mode='milp',
+                          network='transport',
+                          commitment_formulation='basic',
+                          cluster_tolerance=None,
+                          disaggregate_clusters=True):
+    
+    if mode not in SOLVE_MODES:
+        raise ValueError(f"mode must be one of {SOLVE_MODES}, got {mode!r}")
+    print("Solving Unit Commitment Problem with Solar and Storage...")
+    # Load the model and data, or re-use an instance from create_concrete_model;
+    # data_file is a .dat path (read through data_loader) or a loaded data dict.
+    # cluster_tolerance merges near-identical generators on a bus into clusters
+    # with integer unit counts (generator_clustering.py); their schedules are
+    # mapped back to the units in the results unless disaggregate_clusters is False.
+    clusters = None
+    if instance is None:
+        with timer("data_load"):
+            data = load_data(data_file) if isinstance(data_file, str) else data_file
+        if cluster_tolerance is not None:
+            with timer("clustering"):
+                unit_data = data
+                data, clusters = cluster_generators(unit_data, cluster_tolerance)
+        with timer("define_model"):
+            model = define_model(shift_max_percent, shift_max_hours, dr_formulation=dr_formulation, network=network,
+                                 commitment_formulation=commitment_formulation)
+        with timer("create_instance"):
+            instance = model.create_instance(data)
+        count("variables", sum(len(v) for v in instance.component_objects(Var, active=True)))
+        count("constraints", sum(len(c) for c in instance.component_objects(Constraint, active=True)))
+    else:
+        if cluster_tolerance is not None:
+            raise ValueError("cluster_tolerance needs the data, not a prebuilt instance")
+        update_demand_shift(instance, shift_max_percent, shift_max_hours)
 
-    for g in instance.SD:
-        results_data["storage"][str(g)] = {
-            "charge_discharge": [value(instance.Charge[g, t]) - value(instance.Discharge[g, t]) for t in instance.T],
-            "charge": [value(instance.Charge[g, t]) for t in instance.T],
-            "discharge": [value(instance.Discharge[g, t]) for t in instance.T],
-            "SoC": [value(instance.SOC[g, t]) for t in instance.T],
-            "connected_bus": str(instance.StorageBus[g])
-        }
+    # Solve the optimization problem; a solver from make_persistent_solver keeps
+    # the instance loaded and warm-starts from the previous solution. Otherwise
+    # solver_settings is a solver name or solver_config dict (default: GLPK with
+    # its output on stdout).
+    config = None
+    if solver is None:
+        config = as_solver_config(solver_settings) if solver_settings is not None else solver_config('glpk', tee=True)
+        solver = make_solver(config)
+    # (DC network instances are re-solved until no line limit is violated)
+    heuristic = None
+    if mode == 'milp':
+        status = solve_network(solver, instance, config)
+    else:
+        heuristic = fix_and_optimize(instance, solver, config, warmstart_milp=mode == 'heuristic_milp',
+                                     solve=solve_network)
+        status = heuristic.pop("status")
+    check_solution(status)
+    # Solve information stored with the results
+    solve_info = {"solver": status}
+    if heuristic is not None:
+        solve_info["heuristic"] = heuristic
 
-    # Save the results to a JSON file
-    with open(output_json, "w") as f:
-        json.dump(results_data, f, indent=4)
+    with timer("extraction"):
+        extracted = extract_arrays(instance)
+    if clusters is not None:
+        solve_info["clustering"] = clustering_summary(clusters, cluster_tolerance, len(instance.T))
+        if disaggregate_clusters:
+            with timer("disaggregation"):
+                solve_info["clustering"]["disaggregation"] = disaggregate(extracted, clusters, unit_data)
 
-    print(f"Optimization results saved to {output_json}")
+    # Save the results to a JSON file and/or a columnar results store (results_store.py)
+    if output_json is not None:
+        with timer("extraction"):
+            results_data = extract_results(instance, extracted=extracted)
+        results_data.update(solve_info)
+        with timer("json_write"):
+            with open(output_json, "w") as f:
+                json.dump(results_data, f, indent=4)
+        print(f"Optimization results saved to {output_json}")
+    if output_store is not None:
+        with timer("store_write"):
+            write_store_arrays(output_store, extracted["components"], extracted["attributes"], extracted["arrays"],
+                               len(extracted["hours"]), value(instance.TotalCost), extra=solve_info)
+        print(f"Optimization results saved to {output_store}")
+    return status
 
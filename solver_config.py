@@ -0,0 +1,170 @@
+import math
+import time
+from pyomo.environ import *
+from pyomo.opt import SolverFactory, SolverStatus, TerminationCondition
+from pyomo.opt.results.container import UndefinedData
+from pyomo.contrib import appsi
+from instrumentation import timer, count
+
+# Solver backends and their tuning controls. A solver configuration is a plain
+# dict (so it can be passed to process-pool workers) with the backend name,
+# thread count, relative MIP gap, time limit in seconds and an optional log
+# file that replaces the solver output on stdout. Each backend spells these
+# options differently; OPTION_NAMES maps them, and options a backend does not
+# have are reported and skipped. The solve status, termination condition,
+# bounds and gap of every solve are returned by solve_status, so callers can
+# reject solves without a usable solution and record the rest, with the
+# branch-and-bound node count where the backend reports it.
+
+SOLVER_BACKENDS = ('glpk', 'cbc', 'highs', 'appsi_highs', 'scip')
+
+# backend -> {setting: solver option name}; None: not supported by the backend
+OPTION_NAMES = {
+    'glpk': {'threads': None, 'mip_gap': 'mipgap', 'time_limit': 'tmlim'},
+    'cbc': {'threads': 'threads', 'mip_gap': 'ratioGap', 'time_limit': 'seconds'},
+    'highs': {'threads': 'threads', 'mip_gap': 'mip_rel_gap', 'time_limit': 'time_limit'},
+    'appsi_highs': {'threads': 'threads', 'mip_gap': 'mip_rel_gap', 'time_limit': 'time_limit'},
+    'scip': {'threads': 'parallel/maxnthreads', 'mip_gap': 'limits/gap', 'time_limit': 'limits/time'},
+}
+
+# Backends whose Pyomo interface has no logfile argument: the log goes to a
+# file through the solver's own options instead
+HIGHS_BACKENDS = ('highs', 'appsi_highs')
+
+# Backends whose Pyomo interface accepts a MIP start (warmstart=True)
+WARMSTART_BACKENDS = ('cbc', 'appsi_highs')
+
+# Termination conditions that can come with a usable (possibly suboptimal) solution
+USABLE_TERMINATIONS = (TerminationCondition.optimal, TerminationCondition.locallyOptimal,
+                       TerminationCondition.globallyOptimal, TerminationCondition.feasible,
+                       TerminationCondition.maxTimeLimit, TerminationCondition.maxIterations,
+                       TerminationCondition.maxEvaluations, TerminationCondition.userInterrupt)
+
+def solver_config(name='glpk', threads=None, mip_gap=None, time_limit=None, logfile=None, tee=False):
+    return {"name": name, "threads": threads, "mip_gap": mip_gap, "time_limit": time_limit,
+            "logfile": logfile, "tee": tee}
+
+def as_solver_config(solver):
+    # A solver name or a solver_config dict -> solver_config dict
+    return solver_config(solver) if isinstance(solver, str) else solver_config(**solver)
+
+def solver_options(config):
+    # Backend-specific options for the settings of a solver configuration
+    names = OPTION_NAMES.get(config["name"], {})
+    options = {}
+    for setting in ("threads", "mip_gap", "time_limit"):
+        if config[setting] is None:
+            continue
+        if names.get(setting) is None:
+            print(f"Solver {config['name']}: {setting} is not supported, ignored")
+            continue
+        options[names[setting]] = config[setting]
+    if config["logfile"] is not None and config["name"] in HIGHS_BACKENDS:
+        options["log_file"] = config["logfile"]
+        options["log_to_console"] = config["tee"]
+    return options
+
+def make_solver(solver):
+    # Pyomo solver for a name or solver_config dict, with its options set
+    config = as_solver_config(solver)
+    instance = SolverFactory(config["name"])
+    if not instance.available(exception_flag=False):
+        raise RuntimeError(f"Solver {config['name']} is not available on this machine")
+    instance.options.update(solver_options(config))
+    return instance
+
+def run_solver(solver, instance, config, warmstart=False):
+    # Solves without loading the solution; see solve_instance
+    kwargs = {"tee": config["tee"], "load_solutions": False}
+    if config["logfile"] is not None and config["name"] not in HIGHS_BACKENDS:
+        kwargs["logfile"] = config["logfile"]
+    if warmstart:
+        if config["name"] in WARMSTART_BACKENDS:
+            kwargs["warmstart"] = True
+        else:
+            print(f"Solver {config['name']}: warm starts are not supported, solving from scratch")
+    start = time.perf_counter()
+    results = solver.solve(instance, **kwargs)
+    return results, time.perf_counter() - start
+
+def solve_status(results, wall_time=None, name=None):
+    # Status summary of a solve, written into the results JSON. Works for
+    # SolverFactory results and for the persistent appsi solver's results.
+    if isinstance(results, appsi.base.Results):
+        termination = results.termination_condition
+        status = {"name": name, "status": "ok" if termination == appsi.base.TerminationCondition.optimal else "warning",
+                  "termination_condition": termination.name,
+                  "has_solution": results.best_feasible_objective is not None,
+                  "upper_bound": results.best_feasible_objective,
+                  "lower_bound": results.best_objective_bound}
+    else:
+        termination = results.solver.termination_condition
+        lower = results.problem.lower_bound
+        upper = results.problem.upper_bound
+        status = {"name": name, "status": str(results.solver.status),
+                  "termination_condition": str(termination),
+                  "has_solution": (termination in USABLE_TERMINATIONS and len(results.solution) > 0
+                                   and results.solver.status in (SolverStatus.ok, SolverStatus.warning,
+                                                                 SolverStatus.aborted)),
+                  "upper_bound": upper, "lower_bound": lower}
+    for bound in ("upper_bound", "lower_bound"):
+        if status[bound] is not None and not math.isfinite(status[bound]):
+            status[bound] = None
+    upper, lower = status["upper_bound"], status["lower_bound"]
+    status["gap"] = abs(upper - lower) / max(abs(upper), 1e-10) if upper is not None and lower is not None else None
+    status["wall_time"] = wall_time
+    return status
+
+def mip_nodes(solver, results):
+    # Branch-and-bound nodes of the last solve, or None where the backend does
+    # not report them. The HiGHS interfaces keep their highspy model.
+    highs = getattr(solver, "_solver_model", None)
+    if highs is not None and hasattr(highs, "getInfo"):
+        return highs.getInfo().mip_node_count
+    if isinstance(results, appsi.base.Results):
+        return None
+    nodes = results.solver.statistics.branch_and_bound.number_of_created_subproblems
+    return None if isinstance(nodes, UndefinedData) else nodes
+
+def solve_instance(solver, instance, config=None, warmstart=False):
+    # Solves instance and loads the solution if there is one; returns the
+    # solve_status dict. solver is a Pyomo solver from make_solver (config is
+    # its configuration) or a persistent solver from make_persistent_solver
+    # (which always warm-starts). warmstart passes the current variable values
+    # as a MIP start, where the backend supports it.
+    count("solves")
+    if config is None:
+        with timer("solve", solver="appsi_highs_persistent"):
+            start = time.perf_counter()
+            results = solver.solve(instance)
+        status = solve_status(results, time.perf_counter() - start, "appsi_highs_persistent")
+        status["nodes"] = mip_nodes(solver, results)
+        return status
+    with timer("solve", solver=config["name"]):
+        results, wall_time = run_solver(solver, instance, config, warmstart)
+    status = solve_status(results, wall_time, config["name"])
+    status["nodes"] = mip_nodes(solver, results)
+    if status["has_solution"]:
+        with timer("load_solution"):
+            instance.solutions.load_from(results)
+    return status
+
+def check_solution(status):
+    # Raises when a solve left no solution to extract
+    if not status["has_solution"]:
+        raise RuntimeError(f"Solver {status['name']} returned no solution "
+                           f"(status {status['status']}, termination {status['termination_condition']})")
+    if status["termination_condition"] != "optimal":
+        gap = "unknown" if status["gap"] is None else f"{status['gap']:.4%}"
+        print(f"Warning: solver stopped with {status['termination_condition']}, gap {gap}")
+    return status
+
+def add_solver_arguments(parser, default='glpk'):
+    parser.add_argument("--solver", default=default, help=f"Pyomo solver name, e.g. {', '.join(SOLVER_BACKENDS)}")
+    parser.add_argument("--threads", type=int, default=None, help="solver threads (where supported)")
+    parser.add_argument("--mip-gap", type=float, default=None, help="relative MIP gap to stop at")
+    parser.add_argument("--time-limit", type=float, default=None, help="solver time limit in seconds")
+    parser.add_argument("--solver-log", default=None, help="write the solver log to this file instead of stdout")
+
+def solver_config_from_args(args):
+    return solver_config(args.solver, args.threads, args.mip_gap, args.time_limit, args.solver_log)
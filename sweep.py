@@ -0,0 +1,178 @@
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pyomo.environ import *
+from unit_commitment_model_solar import DR_FORMULATIONS, create_concrete_model, update_demand_shift
+from solve_uc_solar import extract_arrays, make_persistent_solver
+from scenario_store import ScenarioStore
+from data_loader import load_data
+from solver_config import (as_solver_config, make_solver, solve_instance, check_solution,
+                           add_solver_arguments, solver_config_from_args)
+
+# Demand-response sensitivity sweep over (shift_max_percent, shift_max_hours).
+# Replaces the serial loop in DR_plots.ipynb: cells are solved in a process
+# pool and every finished cell is appended to a checkpoint file, so an
+# interrupted sweep resumes where it stopped. Checkpoint entries record the
+# inputs of their solve (data file hash, dr_formulation, solver settings);
+# entries of other inputs are ignored, so a checkpoint file shared by sweeps
+# of different data or settings never supplies another sweep's costs. Each worker builds the Pyomo
+# instance once and re-solves it for every cell it receives; with --persistent
+# the instance also stays loaded in HiGHS and each cell warm-starts from the
+# previous cell's commitment. With --scenario-store every cell's full
+# solution is also kept (see scenario_store), for the dashboard's comparison
+# view.
+
+_worker = {}
+
+def sweep_grid(percent_steps=20, max_hours=24):
+    # Same grid as the notebook: shift_max_percent = p / 20, shift_max_hours = 0..23
+    return [(p / percent_steps, h) for p in range(percent_steps) for h in range(max_hours)]
+
+def init_worker(data_file, max_shift_hours, solver_name='glpk', persistent=False, dr_formulation='pairwise',
+                keep_solutions=False):
+    # solver_name: Pyomo solver name or solver_config dict; with persistent,
+    # only its threads/mip_gap/time_limit/logfile settings are used
+    config = as_solver_config(solver_name)
+    _worker["instance"] = create_concrete_model(load_data(data_file), max_shift_hours=max_shift_hours, dr_formulation=dr_formulation)
+    if persistent:
+        _worker["solver"] = make_persistent_solver(config["tee"], config["threads"], config["mip_gap"],
+                                                   config["time_limit"], config["logfile"])
+        _worker["solver_config"] = None
+    else:
+        _worker["solver"] = make_solver(config)
+        _worker["solver_config"] = config
+    _worker["keep_solutions"] = keep_solutions
+
+def solve_cell(shift_max_percent, shift_max_hours):
+    # (p, h, total cost, solution arrays or None, termination condition)
+    instance = _worker["instance"]
+    update_demand_shift(instance, shift_max_percent, shift_max_hours)
+    status = check_solution(solve_instance(_worker["solver"], instance, _worker["solver_config"]))
+    extracted = extract_arrays(instance) if _worker["keep_solutions"] else None
+    return shift_max_percent, shift_max_hours, int(instance.TotalCost()), extracted, status["termination_condition"]
+
+def scenario_name(shift_max_percent, shift_max_hours):
+    return f"p{shift_max_percent:g}_h{shift_max_hours}"
+
+def sweep_inputs(data_file, solver_name='glpk', persistent=False, dr_formulation='pairwise'):
+    # Everything besides (p, h) that a cell's cost depends on, as stored in the checkpoint
+    config = as_solver_config(solver_name)
+    with open(data_file, "rb") as f:
+        data_hash = hashlib.sha256(f.read()).hexdigest()
+    return {"data": data_hash, "dr_formulation": dr_formulation,
+            "solver": "persistent_highs" if persistent else config["name"],
+            "mip_gap": config["mip_gap"], "time_limit": config["time_limit"]}
+
+def load_checkpoint(checkpoint_file, inputs):
+    # One JSON object per line; a line cut short by a crash is ignored, and so
+    # are cells solved for other inputs (see sweep_inputs)
+    done = {}
+    if not os.path.exists(checkpoint_file):
+        return done
+    other = 0
+    with open(checkpoint_file, "r") as f:
+        for line in f:
+            try:
+                cell = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if cell.get("inputs") != inputs:
+                other += 1
+                continue
+            done[(cell["shift_max_percent"], cell["shift_max_hours"])] = cell["total_cost"]
+    if other:
+        print(f"Ignoring {other} cells of {checkpoint_file} solved for other inputs")
+    return done
+
+def append_checkpoint(checkpoint_file, shift_max_percent, shift_max_hours, total_cost, termination_condition=None,
+                      inputs=None):
+    with open(checkpoint_file, "a") as f:
+        f.write(json.dumps({
+            "shift_max_percent": shift_max_percent,
+            "shift_max_hours": shift_max_hours,
+            "total_cost": total_cost,
+            "termination_condition": termination_condition,
+            "inputs": inputs
+        }) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+def write_cost_df(costs, output_json):
+    # Same layout as cost_df.to_json(orient="index") in DR_plots.ipynb:
+    # {shift_max_hours: {shift_max_percent: total_cost}}
+    hours = sorted({h for _, h in costs})
+    percents = sorted({p for p, _ in costs})
+    cost_df = {
+        str(h): {str(p): costs[(p, h)] for p in percents if (p, h) in costs}
+        for h in hours
+    }
+    with open(output_json, "w") as f:
+        json.dump(cost_df, f, indent=4)
+
+def run_sweep(data_file="unit_commitment_data_solar.dat",
+              output_json="cost_df.json",
+              checkpoint_file="cost_df.checkpoint.jsonl",
+              workers=None,
+              percent_steps=20,
+              max_hours=24,
+              solver_name='glpk',
+              persistent=False,
+              dr_formulation='pairwise',
+              scenario_store=None):
+
+    grid = sweep_grid(percent_steps, max_hours)
+    inputs = sweep_inputs(data_file, solver_name, persistent, dr_formulation)
+    costs = load_checkpoint(checkpoint_file, inputs)
+    store = ScenarioStore(scenario_store) if scenario_store else None
+    # With a scenario store, cells solved before it was used are solved again for their solutions
+    pending = [cell for cell in grid
+               if cell not in costs or (store is not None and scenario_name(*cell) not in store.index)]
+    print(f"Sweep: {len(grid)} cells, {len(grid) - len(pending)} already in {checkpoint_file}")
+
+    if pending:
+        max_shift_hours = max(h for _, h in pending)
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(data_file, max_shift_hours, solver_name, persistent, dr_formulation,
+                                           store is not None)) as pool:
+            futures = [pool.submit(solve_cell, p, h) for p, h in pending]
+            for n, future in enumerate(as_completed(futures), start=1):
+                p, h, total_cost, extracted, termination = future.result()
+                if store is not None:
+                    store.add(scenario_name(p, h), {"shift_max_percent": p, "shift_max_hours": h,
+                                                    "dr_formulation": dr_formulation,
+                                                    "termination_condition": termination},
+                              total_cost, extracted["components"], extracted["attributes"],
+                              extracted["arrays"], len(extracted["hours"]))
+                append_checkpoint(checkpoint_file, p, h, total_cost, termination, inputs)
+                costs[(p, h)] = total_cost
+                print(f"[{n}/{len(pending)}] shift_max_percent={p} shift_max_hours={h} total_cost={total_cost}")
+
+    write_cost_df({cell: costs[cell] for cell in grid}, output_json)
+    print(f"Sweep results saved to {output_json}")
+    return costs
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel, resumable demand-response sensitivity sweep")
+    parser.add_argument("--data", default="unit_commitment_data_solar.dat", help="Pyomo .dat input file")
+    parser.add_argument("--output", default="cost_df.json", help="cost table read by DR_plots.ipynb")
+    parser.add_argument("--checkpoint", default="cost_df.checkpoint.jsonl", help="per-cell checkpoint file")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--percent-steps", type=int, default=20, help="shift_max_percent = p / percent-steps")
+    parser.add_argument("--max-hours", type=int, default=24, help="shift_max_hours = 0 .. max-hours - 1")
+    add_solver_arguments(parser)
+    parser.add_argument("--persistent", action="store_true",
+                        help="use the in-memory HiGHS solver with warm starts instead of --solver")
+    parser.add_argument("--dr-formulation", choices=DR_FORMULATIONS, default="pairwise",
+                        help="demand-shift formulation (see define_model)")
+    parser.add_argument("--scenario-store", default=None,
+                        help="also keep every cell's full solution in this scenario store directory")
+    args = parser.parse_args(argv)
+
+    run_sweep(args.data, args.output, args.checkpoint, args.workers,
+              args.percent_steps, args.max_hours, solver_config_from_args(args), args.persistent, args.dr_formulation,
+              args.scenario_store)
+
+if __name__ == '__main__':
+    main()
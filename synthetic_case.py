@@ -0,0 +1,183 @@
+import argparse
+import math
+import random
+
+# Synthetic unit commitment cases for define_model, returned as a Pyomo data
+# dict ({None: {...}}) that create_instance accepts directly. Component names
+# follow unit_commitment_data_solar.dat (B1.., G1.., L1.., SG1.., SD1..).
+
+def demand_shape(t):
+    # Daily load shape: night valley around 4-5 h, afternoon peak around 14-15 h
+    hour = (t - 1) % 24
+    return 0.75 + 0.25 * math.sin(2 * math.pi * (hour - 9) / 24)
+
+def solar_shape(t):
+    # Percent of capacity (0-100) between 6 h and 18 h, as RenewablesProfile
+    hour = (t - 1) % 24
+    if hour < 6 or hour > 18:
+        return 0
+    return 100 * math.sin(math.pi * (hour - 6) / 12)
+
+def generate_case(num_buses=30,
+                  num_generators=20,
+                  num_lines=None,
+                  num_renewables=3,
+                  num_storage=2,
+                  num_hours=24,
+                  seed=42,
+                  units_per_generator=1):
+    # units_per_generator > 1 splits every generator into that many identical
+    # units on its bus (a homogeneous fleet, see generator_clustering.py)
+    rng = random.Random(seed)
+    if num_lines is None:
+        num_lines = int(num_buses * 1.3)
+
+    buses = [f"B{i}" for i in range(1, num_buses + 1)]
+    generators = [f"G{i}" for i in range(1, num_generators + 1)]
+    lines = [f"L{i}" for i in range(1, num_lines + 1)]
+    renewables = [f"SG{i}" for i in range(1, num_renewables + 1)]
+    storage = [f"SD{i}" for i in range(1, num_storage + 1)]
+    hours = range(1, num_hours + 1)
+
+    # Bus demand: per-bus peak between 50 and 150 MW on a daily shape with noise
+    bus_peak = {b: rng.uniform(50, 150) for b in buses}
+    demand = {
+        (b, t): round(bus_peak[b] * demand_shape(t) * rng.uniform(0.95, 1.05), 1)
+        for b in buses for t in hours
+    }
+    system_peak = max(sum(demand[b, t] for b in buses) for t in hours)
+
+    # Generators: about 30% capacity margin over the system peak
+    avg_pmax = 1.3 * system_peak / max(num_generators, 1)
+    pmax = {g: round(avg_pmax * rng.uniform(0.7, 1.3), 1) for g in generators}
+    pmin = {g: round(pmax[g] * rng.uniform(0.2, 0.3), 1) for g in generators}
+    mut = {g: rng.randint(3, 8) for g in generators}
+
+    # Lines: a ring through all buses for connectivity, the rest random chords
+    line_from, line_to = {}, {}
+    for n, l in enumerate(lines):
+        if n < num_buses:
+            line_from[l], line_to[l] = buses[n], buses[(n + 1) % num_buses]
+        else:
+            line_from[l], line_to[l] = rng.sample(buses, 2)
+    avg_bus_peak = system_peak / num_buses
+
+    data = {
+        "G": {None: generators},
+        "B": {None: buses},
+        "L": {None: lines},
+        "GS": {None: renewables},
+        "SD": {None: storage},
+        "Pmin": pmin,
+        "Pmax": pmax,
+        "Cgen": {g: rng.randint(10, 16) for g in generators},
+        "Cstartup": {g: round(25 * pmax[g], -2) for g in generators},
+        "Cshutdown": {g: round(10 * pmax[g], -2) for g in generators},
+        "MUT": mut,
+        "MDT": {g: mut[g] for g in generators},
+        "Rup": {g: round(max(pmin[g], 0.25 * pmax[g]), 1) for g in generators},
+        "Rdown": {g: round(max(pmin[g], 0.25 * pmax[g]), 1) for g in generators},
+        "y0": {g: int(rng.random() < 0.6) for g in generators},
+        "GenBus": {g: rng.choice(buses) for g in generators},
+        "Demand": demand,
+        "LineMax": {l: round(5 * avg_bus_peak * rng.uniform(0.75, 1.25), 0) for l in lines},
+        "LineFrom": line_from,
+        "LineTo": line_to,
+        "Pmax_renewables": {gs: rng.randint(40, 80) for gs in renewables},
+        "RenewablesProfile": {
+            (gs, t): round(solar_shape(t) * rng.uniform(0.8, 1.0), 1)
+            for gs in renewables for t in hours
+        },
+        "GenBusRenewables": {gs: rng.choice(buses) for gs in renewables},
+        "Pmax_storage": {s: rng.choice([50, 100, 150]) for s in storage},
+        "Storage_duration": {s: rng.choice([2, 4]) for s in storage},
+        "Storage_efficiency": {s: 0.95 for s in storage},
+        "StorageBus": {s: rng.choice(buses) for s in storage},
+        "SOC_init": {s: 0.5 for s in storage},
+        # Drawn last so that the other parameters do not depend on it
+        "Reactance": {l: round(rng.uniform(0.05, 0.3), 4) for l in lines},
+    }
+    if units_per_generator > 1:
+        split_fleets(data, units_per_generator)
+    return {None: data}
+
+# Generator parameters that scale with unit size when a generator is split
+UNIT_SIZE_PARAMS = ("Pmin", "Pmax", "Rup", "Rdown", "Cstartup", "Cshutdown")
+
+def split_fleets(data, units):
+    # Replace each generator by `units` identical units of 1/units its size
+    generators = data["G"][None]
+    names = {g: [f"G{i * units + j + 1}" for j in range(units)] for i, g in enumerate(generators)}
+    for name, values in data.items():
+        if name == "G" or not isinstance(values, dict) or set(values) != set(generators):
+            continue
+        scale = units if name in UNIT_SIZE_PARAMS else 1
+        data[name] = {unit: round(values[g] / scale, 1) if scale > 1 else values[g]
+                      for g in generators for unit in names[g]}
+    data["G"] = {None: [unit for g in generators for unit in names[g]]}
+
+# Order of the parameters in a written .dat file (as in unit_commitment_data_solar.dat)
+SET_NAMES = ("G", "B", "L", "GS", "SD")
+
+def parse_case(spec):
+    # "BUSESxGENERATORS[xHOURS][,lines=N][,renewables=N][,storage=N][,units=N][,seed=N]"
+    # -> generate_case keyword arguments (units: units per generator)
+    sizes, *options = spec.lower().split(",")
+    counts = [int(n) for n in sizes.split("x")]
+    if len(counts) not in (2, 3):
+        raise ValueError(f"Synthetic case must be BUSESxGENERATORS[xHOURS][,name=value...], got {spec!r}")
+    case = dict(zip(("num_buses", "num_generators", "num_hours"), counts))
+    for option in options:
+        name, sep, count = option.partition("=")
+        if not sep or name not in ("lines", "renewables", "storage", "units", "seed"):
+            raise ValueError(f"Unknown synthetic case option {option!r} (lines, renewables, storage, units, seed)")
+        keys = {"seed": "seed", "units": "units_per_generator"}
+        case[keys.get(name, f"num_{name}")] = int(count)
+    return case
+
+def dat_token(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+def write_dat(data, path, per_line=10):
+    # Write a data dict from generate_case as an AMPL .dat file in the layout
+    # of unit_commitment_data_solar.dat (readable by data_loader and DataPortal)
+    params = data[None]
+    with open(path, "w") as f:
+        f.write("# Synthetic unit commitment case (synthetic_case.py)\n\n# Sets\n")
+        for name in SET_NAMES:
+            f.write(f"set {name} := {' '.join(map(str, params[name][None]))};\n")
+        for name, values in params.items():
+            if name in SET_NAMES:
+                continue
+            if values and isinstance(next(iter(values)), tuple):
+                # (component, hour) table: one row per component, one column per hour
+                rows = list(dict.fromkeys(c for c, _ in values))
+                columns = sorted({t for _, t in values})
+                f.write(f"\nparam {name}: {' '.join(map(str, columns))} :=\n")
+                f.write("\n".join(f"    {c} " + " ".join(dat_token(values[c, t]) for t in columns) for c in rows))
+                f.write(";\n")
+            else:
+                items = [f"{k} {dat_token(v)}" for k, v in values.items()]
+                f.write(f"\nparam {name} :=\n")
+                f.write("\n".join("    " + " ".join(items[i:i + per_line]) for i in range(0, len(items), per_line)))
+                f.write(";\n")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic unit commitment case as a .dat file")
+    parser.add_argument("output", help=".dat file to write")
+    parser.add_argument("--buses", type=int, default=30)
+    parser.add_argument("--generators", type=int, default=20)
+    parser.add_argument("--lines", type=int, default=None, help="default: 1.3 x buses")
+    parser.add_argument("--renewables", type=int, default=3)
+    parser.add_argument("--storage", type=int, default=2)
+    parser.add_argument("--hours", type=int, default=24)
+    parser.add_argument("--units", type=int, default=1, help="identical units per generator")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    write_dat(generate_case(args.buses, args.generators, args.lines, args.renewables, args.storage,
+                            args.hours, args.seed, args.units), args.output)
+    print(f"Synthetic case saved to {args.output} (use define_model(..., num_hours={args.hours}))")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,397 @@
+import argparse
+import json
+import math
+from concurrent.futures import ProcessPoolExecutor
+from pyomo.environ import *
+from unit_commitment_model_solar import define_model
+from solve_uc_solar import extract_arrays, extract_results
+from rolling_horizon import append_results, data_hours, initial_state, tile_days, time_in_state, window_data
+from data_loader import load_data, parse_timeseries_args
+from solver_config import as_solver_config, make_solver, solve_instance, add_solver_arguments, solver_config_from_args
+
+# Temporal decomposition of a multi-day unit commitment by Lagrangian relaxation.
+# The horizon is split into day blocks. Every block after the first gets its
+# starting status, output and storage SOC as free variables (y_start, P_start,
+# SOC_start) instead of initial-condition parameters, and hour 1 may switch
+# (y[1] - y_start = u[1] - v[1], as between any two hours). Demand shifts
+# between hours on both sides of a boundary (pairwise formulation) get a copy
+# in each of the two blocks: shift_end in the earlier block, shift_start in
+# the later one, each entering the net demand of its own hour, with the limit
+# on shifted demand kept at the source hour. The coupling constraints "end of
+# block k == start of block k+1" (status, output, SOC and boundary shifts) are
+# dualised with multipliers, so all blocks are solved independently in a
+# process pool.
+#
+# Both bounds refer to the monolithic problem. Each block keeps the
+# monolithic constraints inside it and only drops the minimum up/down time
+# windows that cross a boundary, so the Lagrangian dual value of an iteration
+# is a lower bound on the monolithic optimum. The primal repair pass solves
+# the blocks in order, each starting from the previous block's end state and
+# boundary shifts, with the minimum up/down time carried over (UT0/DT0 from
+# the stitched schedule, as in rolling_horizon.py), so its schedule is
+# feasible for the full horizon and its cost an upper bound. The duality gap
+# between the two is reported per iteration.
+
+COUPLING = ("y", "P", "SOC", "shift")
+
+_worker = {}
+
+def free_initial_state(instance):
+    # Replace the t=1 uses of y0, P0 and SOC_init by boundary variables; hour 1
+    # is linked to y_start only through StartupShutdownStart
+    m = instance
+    m.y_start = Var(m.G, domain=Binary)
+    m.P_start = Var(m.G, domain=NonNegativeReals)
+    m.SOC_start = Var(m.SD, bounds=(0, 1))
+
+    for g in m.G:
+        m.StartupShutdown[g, 1].deactivate()
+        m.InitialConditions[g].deactivate()
+        for t in m.T:
+            for c in (m.InitialMinUpTime, m.InitialMinDownTime):
+                if (g, t) in c:
+                    c[g, t].deactivate()
+        for c in (m.RampUp, m.RampDown):
+            if (g, 1) in c:
+                c[g, 1].deactivate()
+    for s in m.SD:
+        m.SOC_constraint[s, 1].deactivate()
+
+    m.StartupShutdownStart = Constraint(m.G, rule=lambda m, g: m.y[g, 1] - m.y_start[g] == m.u[g, 1] - m.v[g, 1])
+    m.RampUpStart = Constraint(m.G, rule=lambda m, g: m.P[g, 1] - m.P_start[g] <= m.Rup[g])
+    m.RampDownStart = Constraint(m.G, rule=lambda m, g: m.P_start[g] - m.P[g, 1] <= m.Rdown[g])
+    m.SOCStart = Constraint(m.SD, rule=lambda m, s: m.SOC[s, 1] == m.SOC_start[s]
+                            + (m.Charge[s, 1] * m.Storage_efficiency[s]) / (m.Pmax_storage[s] * m.Storage_duration[s])
+                            - m.Discharge[s, 1] / (m.Storage_efficiency[s] * (m.Pmax_storage[s] * m.Storage_duration[s])))
+
+def boundary_pairs(data, blocks, shift_max_percent, shift_max_hours, dr_formulation):
+    # [(bus, t1, t2)] per boundary: demand shifts from t1 to t2 (global hours)
+    # across the end of block k, within shift_max_hours
+    if dr_formulation != 'pairwise':
+        raise ValueError("The decomposition couples demand shifts across blocks in the pairwise formulation only")
+    if shift_max_percent == 0 or shift_max_hours == 0 or len(blocks) == 1:
+        return [[] for _ in blocks[:-1]]
+    if shift_max_hours >= min(length for _, length in blocks[:-1]):
+        raise ValueError(f"shift_max_hours={shift_max_hours} must be shorter than the blocks")
+    total_hours = blocks[-1][0] + blocks[-1][1]
+    pairs = []
+    for start, length in blocks[:-1]:
+        end = start + length
+        hours = range(end - shift_max_hours + 1, min(end + shift_max_hours, total_hours) + 1)
+        pairs.append([(b, t1, t2) for b in data[None]["B"][None] for t1 in hours for t2 in hours
+                      if 0 < abs(t1 - t2) <= shift_max_hours and min(t1, t2) <= end < max(t1, t2)])
+    return pairs
+
+def add_boundary_shifts(instance, data, start, shift_max_percent, side, pairs):
+    # shift_<side> copies of the boundary shifts: demand leaves the net demand
+    # of t1 and arrives at t2 where these hours are in the block, and counts
+    # against the shift limit of t1 there
+    m = instance
+    demand = data[None]["Demand"]
+    index = Set(dimen=3, initialize=pairs, ordered=True)
+    m.add_component(f"Shift{side.capitalize()}Pairs", index)
+    shift = Var(index, bounds=lambda m, b, t1, t2: (0, shift_max_percent * demand[b, t1]))
+    m.add_component(f"shift_{side}", shift)
+    hours = range(start + 1, start + len(m.T) + 1)
+    for (b, t1, t2), x in shift.items():
+        if t1 in hours:
+            m.NetShift[b, t1 - start].set_value(m.NetShift[b, t1 - start].expr - x)
+            limit = m.DemandShiftLimit[b, t1 - start]
+            limit.set_value((None, limit.body + x, limit.upper))
+        if t2 in hours:
+            m.NetShift[b, t2 - start].set_value(m.NetShift[b, t2 - start].expr + x)
+
+def start_vars(instance):
+    m = instance
+    return {"y": m.y_start, "P": m.P_start, "SOC": m.SOC_start, "shift": m.shift_start}
+
+def end_terms(instance):
+    # {name: {component: expression}} of the end state coupled to the next block
+    m = instance
+    last = m.T.last()
+    return {"y": {g: m.y[g, last] for g in m.G}, "P": {g: m.P[g, last] for g in m.G},
+            "SOC": {s: m.SOC[s, last] for s in m.SD},
+            "shift": dict(m.shift_end.items()) if m.component("shift_end") is not None else {}}
+
+def add_lagrangian_objective(instance, has_start, has_end):
+    # TotalCost plus multiplier terms: +lambda * end state, -lambda * start state
+    m = instance
+    expr = m.TotalCost.expr
+    if has_start:
+        for name, var in start_vars(m).items():
+            param = Param(var.index_set(), mutable=True, initialize=0)
+            m.add_component(f"lambda_{name}_start", param)
+            expr = expr - sum(param[c] * var[c] for c in var)
+    if has_end:
+        for name, terms in end_terms(m).items():
+            param = Param(list(terms), mutable=True, initialize=0)
+            m.add_component(f"lambda_{name}_end", param)
+            expr = expr + sum(param[c] * term for c, term in terms.items())
+    m.TotalCost.deactivate()
+    m.LagrangianCost = Objective(expr=expr, sense=minimize)
+
+def set_carry_over(instance, carry_over):
+    # Minimum up/down time carried over from before the block (repair pass):
+    # carry_over {"y", "UT0", "DT0"} as the initial_min_up/down_time rules
+    # of the model; None removes it (dual iterations)
+    m = instance
+    if m.component("CarryOver") is not None:
+        m.del_component("CarryOver")
+    m.CarryOver = ConstraintList()
+    if carry_over is None:
+        return
+    for g in m.G:
+        if carry_over["y"][g] == 1:
+            held, status = int(value(m.MUT[g])) - carry_over["UT0"][g], 1
+        else:
+            held, status = int(value(m.MDT[g])) - carry_over["DT0"][g], 0
+        for t in m.T:
+            if t <= held:
+                m.CarryOver.add(m.y[g, t] == status)
+
+def build_block(data, blocks, k, pairs, shift_max_percent, shift_max_hours, dr_formulation):
+    start, length = blocks[k]
+    model = define_model(shift_max_percent, min(shift_max_hours, length - 1),
+                         dr_formulation=dr_formulation, num_hours=length)
+    instance = model.create_instance(window_data(data, start, length, initial_state(data)))
+    has_start = k > 0
+    has_end = k < len(blocks) - 1
+    if has_start:
+        free_initial_state(instance)
+        add_boundary_shifts(instance, data, start, shift_max_percent, "start", pairs[k - 1])
+    if has_end:
+        add_boundary_shifts(instance, data, start, shift_max_percent, "end", pairs[k])
+    add_lagrangian_objective(instance, has_start, has_end)
+    return instance
+
+def init_worker(data, blocks, pairs, shift_max_percent, shift_max_hours, dr_formulation, solver_name):
+    config = as_solver_config(solver_name)
+    _worker.update(data=data, blocks=blocks, pairs=pairs, shift_max_percent=shift_max_percent,
+                   shift_max_hours=shift_max_hours, dr_formulation=dr_formulation,
+                   solver=make_solver(config), solver_config=config, instances={})
+
+def block_instance(k):
+    # Each worker builds a block the first time it is asked for it and keeps it
+    if k not in _worker["instances"]:
+        _worker["instances"][k] = build_block(_worker["data"], _worker["blocks"], k, _worker["pairs"],
+                                              _worker["shift_max_percent"], _worker["shift_max_hours"],
+                                              _worker["dr_formulation"])
+    return _worker["instances"][k]
+
+def boundary_shift_arrays(instance, extracted, start):
+    # Adds the boundary shifts to the bus shift series of extract_arrays output
+    m = instance
+    row = {b: i for i, b in enumerate(extracted["components"]["buses"])}
+    shift = extracted["arrays"]["buses"]["shift"]
+    for side in ("start", "end"):
+        var = m.component(f"shift_{side}")
+        for (b, t1, t2), x in (var.items() if var is not None else ()):
+            if 0 < t1 - start <= len(m.T):
+                shift[row[b], t1 - start - 1] -= x.value
+            if 0 < t2 - start <= len(m.T):
+                shift[row[b], t2 - start - 1] += x.value
+
+def clip(x, bounds):
+    lower, upper = bounds
+    return min(max(x, lower), upper)
+
+def solve_block(k, multipliers, fixed_start=None, carry_over=None, with_results=False, confine_shifts=False):
+    # multipliers: {"start": {...}, "end": {...}} with keys y/P/SOC/shift -> {component: value}.
+    # fixed_start: start state and boundary shifts to fix, carry_over the
+    # minimum up/down time to hold and confine_shifts fixes the shifts into
+    # the next block to zero (primal repair pass); with_results adds the
+    # block's results dict (as extract_results) to the returned solution.
+    m = block_instance(k)
+    for side in ("start", "end"):
+        for name in COUPLING:
+            param = m.component(f"lambda_{name}_{side}")
+            for c in (param if param is not None else ()):
+                param[c].set_value(multipliers.get(side, {}).get(name, {}).get(c, 0))
+    if m.component("y_start") is not None:
+        for name, var in start_vars(m).items():
+            for c in var:
+                if fixed_start is None:
+                    var[c].unfix()
+                else:
+                    var[c].fix(fixed_start[name][c])
+    set_carry_over(m, carry_over)
+    for x in end_terms(m)["shift"].values():
+        if confine_shifts:
+            x.fix(0)
+        else:
+            x.unfix()
+
+    status = solve_instance(_worker["solver"], m, _worker["solver_config"])
+    if not status["has_solution"]:
+        return {"feasible": False}
+
+    objective = value(m.LagrangianCost)
+    end = end_terms(m)
+    solution = {
+        "feasible": True,
+        "objective": objective,
+        # Solves stopped at a MIP gap or time limit only bound the block's optimum from below
+        "bound": objective if status["termination_condition"] == "optimal" or status["lower_bound"] is None
+                 else status["lower_bound"],
+        "cost": value(m.TotalCost),
+        # Rounded and clipped to the bounds of the next block's start variables
+        "end": {"y": {g: int(round(value(y))) for g, y in end["y"].items()},
+                "P": {g: max(value(p), 0) for g, p in end["P"].items()},
+                "SOC": {s: min(max(value(soc), 0), 1) for s, soc in end["SOC"].items()},
+                "shift": {c: clip(value(x), x.bounds) for c, x in end["shift"].items()}},
+    }
+    if m.component("y_start") is not None:
+        solution["start"] = {name: {c: value(var[c]) for c in var} for name, var in start_vars(m).items()}
+    if with_results:
+        extracted = extract_arrays(m)
+        boundary_shift_arrays(m, extracted, _worker["blocks"][k][0])
+        solution["results"] = extract_results(m, extracted=extracted)
+        solution["results"]["total_cost"] = solution["cost"]
+    return solution
+
+def carried_over(solutions, first_state):
+    # Status and hours in that status at the end of the blocks solved so far
+    end = solutions[-1]["end"]
+    carry_over = {"y": end["y"], "UT0": {}, "DT0": {}}
+    for g, status in end["y"].items():
+        history = [int(round(y)) for solution in solutions
+                   for y in solution["results"]["generators"][str(g)]["on_off_status"]]
+        initial = first_state.get("UT0" if status == 1 else "DT0", {}).get(g, 0)
+        hours = time_in_state(history, first_state["y0"][g], initial)
+        carry_over["UT0"][g], carry_over["DT0"][g] = (hours, 0) if status == 1 else (0, hours)
+    return carry_over
+
+def repair(pool, num_blocks, multipliers, first_state):
+    # Primal upper bound: blocks in order, each starting from the previous
+    # block's end and boundary shifts, with the minimum up/down time carried
+    # over; the current multipliers price each block's end state and shifts
+    # into the next block. A block that cannot serve the demand shifted into
+    # it sends the previous block back without shifts across their boundary.
+    solutions, confined = [], set()
+    while len(solutions) < num_blocks:
+        k = len(solutions)
+        end = solutions[-1]["end"] if solutions else None
+        carry_over = carried_over(solutions, first_state) if solutions else None
+        solution = pool.submit(solve_block, k, {"end": multipliers.get(k, {})}, end, carry_over, True,
+                               k in confined).result()
+        if solution["feasible"]:
+            solutions.append(solution)
+        elif k > 0 and k - 1 not in confined:
+            confined.add(k - 1)
+            solutions.pop()
+        else:
+            return math.inf, None
+    stitched = None
+    for solution in solutions:
+        stitched = append_results(stitched, solution["results"])
+    return sum(solution["cost"] for solution in solutions), stitched
+
+def run_decomposition(data,
+                      output_json="unit_commitment_results.json",
+                      block_hours=24,
+                      shift_max_percent=0.2,
+                      shift_max_hours=2,
+                      dr_formulation='pairwise',
+                      solver_name='glpk',
+                      workers=None,
+                      max_iterations=30,
+                      gap_tolerance=1e-3,
+                      repair_every=5,
+                      step_scale=0.5):
+
+    total_hours = data_hours(data)
+    blocks = [(start, min(block_hours, total_hours - start)) for start in range(0, total_hours, block_hours)]
+    boundaries = range(len(blocks) - 1)  # boundary k couples the end of block k to the start of block k+1
+    pairs = boundary_pairs(data, blocks, shift_max_percent, shift_max_hours, dr_formulation)
+    multipliers = {k: {name: {} for name in COUPLING} for k in boundaries}
+    first_state = initial_state(data)
+    lower_bound, upper_bound, best = -math.inf, math.inf, None
+    history = []
+    theta, stalled = step_scale, 0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(data, blocks, pairs, shift_max_percent, shift_max_hours,
+                                       dr_formulation, solver_name)) as pool:
+        for iteration in range(1, max_iterations + 1):
+            # Dual step: all blocks in parallel with the current multipliers
+            futures = [pool.submit(solve_block, k, {"start": multipliers.get(k - 1, {}), "end": multipliers.get(k, {})})
+                       for k in range(len(blocks))]
+            solutions = [f.result() for f in futures]
+            if not all(s["feasible"] for s in solutions):
+                raise RuntimeError(f"Block subproblem infeasible in iteration {iteration}")
+            dual_value = sum(s["bound"] for s in solutions)
+            if dual_value > lower_bound:
+                lower_bound, stalled = dual_value, 0
+            else:
+                stalled += 1
+                if stalled >= 3:
+                    theta, stalled = theta / 2, 0
+
+            # Subgradient: mismatch between block ends and next block starts
+            subgradient = {k: {name: {c: solutions[k]["end"][name][c] - solutions[k + 1]["start"][name][c]
+                                      for c in solutions[k]["end"][name]}
+                               for name in COUPLING}
+                           for k in boundaries}
+            norm = sum(g ** 2 for k in boundaries for name in subgradient[k] for g in subgradient[k][name].values())
+
+            if iteration == 1 or iteration % repair_every == 0 or norm == 0:
+                cost, stitched = repair(pool, len(blocks), multipliers, first_state)
+                if cost < upper_bound:
+                    upper_bound, best = cost, stitched
+
+            gap = (upper_bound - lower_bound) / abs(upper_bound) if math.isfinite(upper_bound) else math.inf
+            history.append({"iteration": iteration, "lower_bound": lower_bound, "upper_bound": upper_bound,
+                            "dual_value": dual_value, "gap": gap, "coupling_violation": math.sqrt(norm)})
+            print(f"Iteration {iteration}: lower bound {lower_bound:.2f}, upper bound {upper_bound:.2f}, "
+                  f"gap {gap:.4%}, coupling violation {math.sqrt(norm):.4f}")
+            if gap <= gap_tolerance or norm == 0:
+                break
+
+            # Polyak step towards the best known upper bound
+            target = upper_bound if math.isfinite(upper_bound) else dual_value + 0.01 * abs(dual_value)
+            step = theta * max(target - dual_value, 1e-6 * abs(target)) / norm
+            for k in boundaries:
+                for name in COUPLING:
+                    for c, g in subgradient[k][name].items():
+                        multipliers[k][name][c] = multipliers[k][name].get(c, 0) + step * g
+
+        if best is None:
+            upper_bound, best = repair(pool, len(blocks), multipliers, first_state)
+            if best is None:
+                raise RuntimeError("No feasible primal solution found by the repair pass")
+
+    best["total_cost"] = upper_bound
+    best["decomposition"] = {"block_hours": block_hours, "iterations": history}
+    with open(output_json, "w") as f:
+        json.dump(best, f, indent=4)
+
+    print(f"Decomposition results saved to {output_json}")
+    return best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-day unit commitment by Lagrangian temporal decomposition")
+    parser.add_argument("--data", default="unit_commitment_data_solar.dat")
+    parser.add_argument("--output", default="unit_commitment_results.json")
+    parser.add_argument("--timeseries", action="append", metavar="NAME=PATH",
+                        help="CSV/Parquet table replacing a time series of --data, e.g. Demand=demand.csv")
+    parser.add_argument("--days", type=int, default=1, help="repeat the input profile over this many days")
+    parser.add_argument("--block-hours", type=int, default=24, help="hours per block subproblem")
+    parser.add_argument("--shift-max-percent", type=float, default=0.2)
+    parser.add_argument("--shift-max-hours", type=int, default=2)
+    add_solver_arguments(parser)
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--max-iterations", type=int, default=30)
+    parser.add_argument("--gap", type=float, default=1e-3, help="stop at this relative duality gap")
+    parser.add_argument("--repair-every", type=int, default=5, help="iterations between primal repair passes")
+    parser.add_argument("--step-scale", type=float, default=0.5, help="initial Polyak step factor, halved when the bound stalls")
+    args = parser.parse_args(argv)
+
+    data = load_data(args.data, parse_timeseries_args(args.timeseries))
+    if args.days > 1:
+        data = tile_days(data, args.days)
+    run_decomposition(data, args.output, args.block_hours, args.shift_max_percent, args.shift_max_hours,
+                      'pairwise', solver_config_from_args(args), args.workers, args.max_iterations, args.gap,
+                      args.repair_every, args.step_scale)
+
+if __name__ == '__main__':
+    main()
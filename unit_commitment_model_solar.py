@@ -1,16 +1,57 @@
 from pyomo.environ import *
-def define_model(shift_max_percent, shift_max_hours):
+
+DR_FORMULATIONS = ('pairwise', 'backlog')
+NETWORK_MODES = ('transport', 'dc')
+COMMITMENT_FORMULATIONS = ('basic', 'tight')
+
+def define_model(shift_max_percent, shift_max_hours, max_shift_hours=None, dr_formulation='pairwise', num_hours=24,
+                 network='transport', commitment_formulation='basic'):
+    # max_shift_hours: build the demand-shift window once at this horizon so that
+    # shift_max_percent/shift_max_hours can later be changed in place on the instance
+    # with update_demand_shift (see create_concrete_model). None keeps the window
+    # at shift_max_hours.
+    # dr_formulation: 'pairwise' moves demand with one variable per (bus, t1, t2) pair
+    # in the window (|B|*|T|*2H variables); 'backlog' tracks deferred and advanced
+    # energy per bus as a state (6*|B|*|T| variables) and has the same optimal cost.
+    # num_hours: length of the horizon T; initial conditions (y0, UT0, DT0, P0,
+    # SOC_init) describe the hour before it (see rolling_horizon.py).
+    # network: 'transport' balances every bus with free line flows limited by
+    # LineMax; 'dc' is a DC power flow where flows follow from the bus
+    # injections through the PTDF matrix (Reactance), with one balance per
+    # island and hour and line limits added lazily by dc_network.solve_with_line_limits.
+    # commitment_formulation: 'basic' limits output by Pmax*y and ramps by a
+    # constant Rup/Rdown; 'tight' states the same limits in terms of the
+    # startup/shutdown binaries (output in a startup hour is at most Rup and
+    # before a shutdown at most Rdown, as the basic ramp rows imply) and adds
+    # the minimum up/down windows of the first hours. Both have the same
+    # optimal schedules; 'tight' has a stronger LP relaxation, so branch and
+    # bound explores fewer nodes (see benchmark_uc_formulations.py).
+    # Generators with Units > 1 are clusters of identical units: y/u/v count
+    # the units on, started and stopped (see generator_clustering.py).
+    if dr_formulation not in DR_FORMULATIONS:
+        raise ValueError(f"dr_formulation must be one of {DR_FORMULATIONS}, got {dr_formulation!r}")
+    if network not in NETWORK_MODES:
+        raise ValueError(f"network must be one of {NETWORK_MODES}, got {network!r}")
+    if commitment_formulation not in COMMITMENT_FORMULATIONS:
+        raise ValueError(f"commitment_formulation must be one of {COMMITMENT_FORMULATIONS}, got {commitment_formulation!r}")
+    tight = commitment_formulation == 'tight'
+    shift_window = shift_max_hours if max_shift_hours is None else max_shift_hours
+    shift_enabled = shift_window != 0 if max_shift_hours is not None else (shift_max_percent != 0 and shift_max_hours != 0)
+
     # --- Model Definition ---
     model = AbstractModel()
 
     # --- Sets ---
-    model.T = RangeSet(1, 24)              # Time periods (1 to 24 hours)
+    model.T = RangeSet(1, num_hours)       # Time periods (1 to 24 hours by default)
     model.G = Set()                        # Set of generators
     model.GS = Set()                       # Renewable Generators
     model.SD = Set()                       # Energy Storage Set
     model.B = Set()                        # Set of buses
     model.L = Set()                        # Set of transmission lines
-    model.tpairs = Set(dimen=2, initialize= [(t1, t2) for t1 in model.T for t2 in model.T if 0 < abs(t1 - t2) <= shift_max_hours])
+    if dr_formulation == 'pairwise':
+        model.tpairs = Set(dimen=2, initialize= [(t1, t2) for t1 in model.T for t2 in model.T if 0 < abs(t1 - t2) <= shift_window])
+    else:
+        model.ShiftLags = RangeSet(0, shift_window - 1)  # Hours between shifting demand out and serving it, minus one
 
     # --- Parameters ---
     # Generator parameters
@@ -24,12 +65,27 @@ def define_model(shift_max_percent, shift_max_hours):
     model.Rup = Param(model.G)             # Ramp up limit
     model.Rdown = Param(model.G)           # Ramp down limit
     model.y0 = Param(model.G)              # Initial on/off status
+    model.UT0 = Param(model.G, default=0)  # Hours already on before t=1 (0: no carry-over)
+    model.DT0 = Param(model.G, default=0)  # Hours already off before t=1 (0: no carry-over)
+    model.P0 = Param(model.G, within=Any, default=None)  # Output in the hour before t=1 (None: no ramp limit at t=1)
+    model.Units = Param(model.G, within=PositiveIntegers, default=1)  # Identical units in a generator cluster (generator_clustering.py)
     model.GenBus = Param(model.G,within=Any)          # Bus each generator is connected to
     # model.Ccurtail = Param()        # Curtailment cost at each bus
 
 
+    # Demand response parameters (mutable so they can be changed between re-solves)
+    model.shift_max_percent = Param(within=NonNegativeReals, mutable=True, initialize=shift_max_percent)
+    model.shift_max_hours = Param(within=NonNegativeIntegers, mutable=True, initialize=shift_max_hours)
+    model.shift_window = Param(within=NonNegativeIntegers, initialize=shift_window)  # Largest shift the instance can represent
+    model.dr_formulation = Param(within=Any, initialize=dr_formulation)
+    if dr_formulation == 'backlog':
+        # 1 for lags shorter than shift_max_hours: limits how long demand may stay deferred/advanced
+        model.shift_lag_active = Param(model.ShiftLags, mutable=True, initialize=lambda m, j: int(j < shift_max_hours))
+
     # Bus demand
     model.Demand = Param(model.B, model.T)  # Demand at each bus in each time period
+    model.BusX = Param(model.B, within=Any, default=None)  # Optional drawing coordinates, only used by the dashboard layout
+    model.BusY = Param(model.B, within=Any, default=None)
 
     # Line limits (max flow)
     model.LineMax = Param(model.L)         # Maximum line capacity
@@ -37,6 +93,7 @@ def define_model(shift_max_percent, shift_max_hours):
     # Line incidence matrix (to describe line connections)
     model.LineFrom = Param(model.L,within=Any)        # Bus where each line originates
     model.LineTo = Param(model.L,within=Any)          # Bus where each line terminates
+    model.Reactance = Param(model.L, within=Any, default=None)  # Line reactance, only used by the DC network mode
 
     #Renewable Generation Parameters
     model.Pmax_renewables = Param(model.GS)             # Max capacity of each renewable energy generator
@@ -50,11 +107,28 @@ def define_model(shift_max_percent, shift_max_hours):
     model.StorageBus = Param(model.SD, within=model.B)                   # Storage units mapped to buses
     model.SOC_init = Param(model.SD, within=NonNegativeReals)            # Initial state of charge for storage
 
+    # --- Bus Incidence Index ---
+    # Components connected to each bus, built in one pass per set when the
+    # instance is created so the balance rule does not scan every set per (bus, hour)
+    def components_by_bus(model, components, bus_of):
+        index = {b: [] for b in model.B}
+        for c in components:
+            index[bus_of[c]].append(c)
+        return index
+
+    model.GenAtBus = Set(model.B, within=model.G, initialize=lambda m: components_by_bus(m, m.G, m.GenBus))
+    model.RenewablesAtBus = Set(model.B, within=model.GS, initialize=lambda m: components_by_bus(m, m.GS, m.GenBusRenewables))
+    model.StorageAtBus = Set(model.B, within=model.SD, initialize=lambda m: components_by_bus(m, m.SD, m.StorageBus))
+    model.LinesFromBus = Set(model.B, within=model.L, initialize=lambda m: components_by_bus(m, m.L, m.LineFrom))
+    model.LinesToBus = Set(model.B, within=model.L, initialize=lambda m: components_by_bus(m, m.L, m.LineTo))
+
     # --- Decision Variables ---
-    # Binary variables
-    model.y = Var(model.G, model.T, domain=Binary)   # On/off status for each generator
-    model.u = Var(model.G, model.T, domain=Binary)   # Startup decision for each generator
-    model.v = Var(model.G, model.T, domain=Binary)   # Shutdown decision for each generator
+    # Binary variables (unit counts for generator clusters: y units on, u started, v stopped)
+    def commitment_domain(model, g, t):
+        return Binary if model.Units[g] == 1 else NonNegativeIntegers
+    model.y = Var(model.G, model.T, domain=commitment_domain)   # On/off status for each generator
+    model.u = Var(model.G, model.T, domain=commitment_domain)   # Startup decision for each generator
+    model.v = Var(model.G, model.T, domain=commitment_domain)   # Shutdown decision for each generator
 
     # Continuous variables
     model.P    = Var(model.G, model.T, domain=NonNegativeReals)       # Power output for each generator
@@ -64,7 +138,15 @@ def define_model(shift_max_percent, shift_max_hours):
     model.Charge = Var(model.SD, model.T, within=NonNegativeReals)    # Storage charge
     model.Discharge = Var(model.SD, model.T, within=NonNegativeReals) # Storage discharge
     model.SOC = Var(model.SD, model.T, within=NonNegativeReals)       # Storage State-of-charge
-    model.shift = Var(model.B, model.tpairs, domain=NonNegativeReals)  # Demand shift at each bus in each time period
+    if dr_formulation == 'pairwise':
+        model.shift = Var(model.B, model.tpairs, domain=NonNegativeReals)  # Demand shift at each bus in each time period
+    else:
+        model.shift_defer = Var(model.B, model.T, domain=NonNegativeReals)      # Demand taken out at t, served later
+        model.shift_recover = Var(model.B, model.T, domain=NonNegativeReals)    # Deferred demand served at t
+        model.shift_advance = Var(model.B, model.T, domain=NonNegativeReals)    # Later demand served early at t
+        model.shift_repay = Var(model.B, model.T, domain=NonNegativeReals)      # Demand taken out at t, already served earlier
+        model.deferred_backlog = Var(model.B, model.T, domain=NonNegativeReals) # Deferred demand not yet served after t
+        model.advanced_backlog = Var(model.B, model.T, domain=NonNegativeReals) # Advanced demand not yet repaid after t
 
     # --- Objective Function ---
     def objective_rule(model):
@@ -78,34 +160,113 @@ def define_model(shift_max_percent, shift_max_hours):
 
     # --- Constraints ---
 
+    # Net demand shifted into (bus, hour): shift in minus shift out
+    def net_shift_rule(model, b, t):
+        if not shift_enabled:
+            return 0
+        if dr_formulation == 'pairwise':
+            shift_in = sum(model.shift[b, (k, t)] for k in model.T if k != t and abs(k - t) <= shift_window)
+            shift_out = sum(model.shift[b, (t, k)] for k in model.T if k != t and abs(k - t) <= shift_window)
+            return shift_in - shift_out
+        return model.shift_recover[b, t] + model.shift_advance[b, t] - model.shift_defer[b, t] - model.shift_repay[b, t]
+    model.NetShift = Expression(model.B, model.T, rule=net_shift_rule)
+
     # Power balance constraints for each bus
     def relaxed_power_balance_rule(model, b, t):
-        gen_renewables = sum(model.P_renewables[gs, t] for gs in model.GS if model.GenBusRenewables[gs] == b)
-        gen_sum = sum(model.P[g, t] for g in model.G if model.GenBus[g] == b)
-        discharge = sum(model.Discharge[i, t] for i in model.SD if model.StorageBus[i] == b)
-        charge = sum(model.Charge[i, t] for i in model.SD if model.StorageBus[i] == b)
+        gen_renewables = sum(model.P_renewables[gs, t] for gs in model.RenewablesAtBus[b])
+        gen_sum = sum(model.P[g, t] for g in model.GenAtBus[b])
+        discharge = sum(model.Discharge[i, t] for i in model.StorageAtBus[b])
+        charge = sum(model.Charge[i, t] for i in model.StorageAtBus[b])
         line_flow_sum = (
-            sum(model.Flow[l, t] for l in model.L if model.LineFrom[l] == b)
-            - sum(model.Flow[l, t] for l in model.L if model.LineTo[l] == b)
+            sum(model.Flow[l, t] for l in model.LinesFromBus[b])
+            - sum(model.Flow[l, t] for l in model.LinesToBus[b])
         )
-        net_shift = 0
-        if shift_max_percent != 0 and shift_max_hours != 0:
-            shift_in = sum(model.shift[b, (k, t)] for k in model.T if k != t and abs(k - t) <= shift_max_hours)
-            shift_out = sum(model.shift[b, (t, k)] for k in model.T if k != t and abs(k - t) <= shift_max_hours)
-            net_shift = shift_in - shift_out
         # return gen_sum + gen_renewables + discharge - charge + line_flow_sum + model.Slack[b, t] == model.Demand[b, t]
-        return gen_sum + gen_renewables + discharge - charge + line_flow_sum == model.Demand[b, t] + net_shift
-
-    model.PowerBalance = Constraint(model.B, model.T, rule=relaxed_power_balance_rule)
+        return gen_sum + gen_renewables + discharge - charge + line_flow_sum == model.Demand[b, t] + model.NetShift[b, t]
+
+    # DC network mode: net injection per (bus, hour), balanced over each island
+    # (connected component of the lines), since no power flows between islands
+    # and the PTDF matrix has one slack bus per island; line flows are
+    # PTDF-weighted sums of injections, and their limits are added to LineLimit
+    # (indexed by the (line, hour) pairs in LineLimitIndex) only when a solve
+    # violates them
+    def island_buses(model):
+        # Buses of each island, keyed by its first bus in B (the PTDF slack bus)
+        parent = {b: b for b in model.B}
+        def root(b):
+            while parent[b] != b:
+                parent[b] = parent[parent[b]]
+                b = parent[b]
+            return b
+        for l in model.L:
+            parent[root(model.LineFrom[l])] = root(model.LineTo[l])
+        islands = {}
+        for b in model.B:
+            islands.setdefault(root(b), []).append(b)
+        return {buses[0]: buses for buses in islands.values()}
+
+    def injection_rule(model, b, t):
+        gen_renewables = sum(model.P_renewables[gs, t] for gs in model.RenewablesAtBus[b])
+        gen_sum = sum(model.P[g, t] for g in model.GenAtBus[b])
+        discharge = sum(model.Discharge[i, t] for i in model.StorageAtBus[b])
+        charge = sum(model.Charge[i, t] for i in model.StorageAtBus[b])
+        return gen_sum + gen_renewables + discharge - charge - model.Demand[b, t] - model.NetShift[b, t]
+
+    def system_balance_rule(model, i, t):
+        return sum(model.Injection[b, t] for b in model.IslandBuses[i]) == 0
+
+    if network == 'transport':
+        model.PowerBalance = Constraint(model.B, model.T, rule=relaxed_power_balance_rule)
+    else:
+        model.Injection = Expression(model.B, model.T, rule=injection_rule)
+        model.Islands = Set(within=model.B, ordered=True, initialize=lambda m: list(island_buses(m)))
+        model.IslandBuses = Set(model.Islands, within=model.B, initialize=lambda m: island_buses(m))
+        model.SystemBalance = Constraint(model.Islands, model.T, rule=system_balance_rule)
+        model.LineLimitIndex = Set(dimen=2, initialize=[], ordered=True)
+        model.LineLimit = Constraint(model.LineLimitIndex)
 
     # Demand shift constraints
     def demand_shift_limit_rule(model, b, t):
-        if shift_max_percent == 0 or shift_max_hours == 0:
+        if not shift_enabled:
             return Constraint.Feasible
+        elif dr_formulation == 'pairwise':
+            return sum(model.shift[b, (t, k)] for k in model.T if k != t and abs(k - t) <= shift_window) <= model.shift_max_percent * model.Demand[b, t]
         else:
-            return sum(model.shift[b, (t, k)] for k in model.T if k != t and abs(k - t) <= shift_max_hours) <= shift_max_percent * model.Demand[b, t]
+            return model.shift_defer[b, t] + model.shift_repay[b, t] <= model.shift_max_percent * model.Demand[b, t]
     model.DemandShiftLimit = Constraint(model.B, model.T, rule=demand_shift_limit_rule)
 
+    # Backlog formulation: deferred (advanced) demand accumulates in a per-bus backlog
+    # that must only hold energy shifted within the last shift_max_hours hours and
+    # be empty at the end of the horizon. Serving the backlog first-in first-out
+    # makes this equivalent to the pairwise window |t1 - t2| <= shift_max_hours.
+    if dr_formulation == 'backlog':
+        # Rules take component names: they run on the instance, not on this abstract model
+        def backlog_balance(backlog_name, shift_in_name, shift_out_name):
+            def rule(model, b, t):
+                if not shift_enabled:
+                    return Constraint.Skip
+                backlog = model.component(backlog_name)
+                shift_in, shift_out = model.component(shift_in_name), model.component(shift_out_name)
+                previous = backlog[b, t - 1] if t > model.T.first() else 0
+                return backlog[b, t] == previous + shift_in[b, t] - shift_out[b, t]
+            return rule
+
+        def backlog_window(backlog_name, shift_in_name):
+            def rule(model, b, t):
+                if not shift_enabled:
+                    return Constraint.Skip
+                backlog, shift_in = model.component(backlog_name), model.component(shift_in_name)
+                if t == model.T.last():
+                    return backlog[b, t] == 0
+                recent = sum(model.shift_lag_active[j] * shift_in[b, t - j] for j in model.ShiftLags if t - j >= model.T.first())
+                return backlog[b, t] <= recent
+            return rule
+
+        model.DeferredBacklog = Constraint(model.B, model.T, rule=backlog_balance('deferred_backlog', 'shift_defer', 'shift_recover'))
+        model.DeferredWindow = Constraint(model.B, model.T, rule=backlog_window('deferred_backlog', 'shift_defer'))
+        model.AdvancedBacklog = Constraint(model.B, model.T, rule=backlog_balance('advanced_backlog', 'shift_advance', 'shift_repay'))
+        model.AdvancedWindow = Constraint(model.B, model.T, rule=backlog_window('advanced_backlog', 'shift_advance'))
+
     # def demand_shift_hours_rule(model, b, t1, t2):
     #     if abs(t1 - t2) > shift_max_hours:
     #         return model.shift[b, (t1, t2)] == 0
@@ -124,18 +285,73 @@ def define_model(shift_max_percent, shift_max_hours):
 
     # Upper bound: Generator must produce no more than Pmax when it is on
     def gen_limits_max_rule(model, g, t):
+        if tight:
+            return Constraint.Skip
         return model.P[g, t] <= model.Pmax[g] * model.y[g, t]
     model.GenLimitsMax = Constraint(model.G, model.T, rule=gen_limits_max_rule)
 
+    # Tight formulation: output in a startup hour is at most the startup ramp
+    # SU = min(Rup, Pmax), and in the hour before a shutdown at most
+    # SD = min(Rdown, Pmax). A unit with MUT >= 2 cannot start and stop in
+    # consecutive hours, so both fit in one row; MUT = 1 needs one row each.
+    # Generator clusters always have these rows, extended over the units'
+    # ramp trajectories: a unit started k hours ago (k < MUT, so it is still
+    # on) makes at most SU + k*Rup, one stopping in k + 1 hours at most
+    # SD + k*Rdown. Without them a cluster could ramp units already at Pmax.
+    def startup_ramp(model, g):
+        return min(value(model.Rup[g]), value(model.Pmax[g]))
+
+    def shutdown_ramp(model, g):
+        return min(value(model.Rdown[g]), value(model.Pmax[g]))
+
+    def trajectory(model, g, switches, first_limit, ramp, hours):
+        # sum of (Pmax - output limit) over the units switching at hours[k]
+        terms = []
+        for k, t in enumerate(hours[:int(model.MUT[g])]):
+            reduction = value(model.Pmax[g]) - first_limit - k * value(ramp)
+            if reduction <= 0:
+                break
+            terms.append(reduction * switches[g, t])
+        return sum(terms)
+
+    def startup_capacity_rule(model, g, t):
+        if model.Units[g] > 1:
+            started = trajectory(model, g, model.u, startup_ramp(model, g), model.Rup[g], list(range(t, 0, -1)))
+            return model.P[g, t] <= model.Pmax[g] * model.y[g, t] - started
+        if not tight:
+            return Constraint.Skip
+        limit = model.Pmax[g] * model.y[g, t] - (model.Pmax[g] - startup_ramp(model, g)) * model.u[g, t]
+        if model.MUT[g] >= 2 and t < model.T.last():
+            limit -= (model.Pmax[g] - shutdown_ramp(model, g)) * model.v[g, t + 1]
+        return model.P[g, t] <= limit
+    model.StartupCapacity = Constraint(model.G, model.T, rule=startup_capacity_rule)
+
+    def shutdown_capacity_rule(model, g, t):
+        if t == model.T.last():
+            return Constraint.Skip
+        if model.Units[g] > 1:
+            stopping = trajectory(model, g, model.v, shutdown_ramp(model, g), model.Rdown[g],
+                                  list(range(t + 1, model.T.last() + 1)))
+            return model.P[g, t] <= model.Pmax[g] * model.y[g, t] - stopping
+        if not tight or model.MUT[g] >= 2:
+            return Constraint.Skip
+        return model.P[g, t] <= model.Pmax[g] * model.y[g, t] - (model.Pmax[g] - shutdown_ramp(model, g)) * model.v[g, t + 1]
+    model.ShutdownCapacity = Constraint(model.G, model.T, rule=shutdown_capacity_rule)
+
 
     # Transmission line flow limits
     # Lower bound: Flow cannot be less than -LineMax
+    # (DC network mode: Flow only holds the flows computed after a solve)
     def flow_limits_lower_rule(model, l, t):
+        if network == 'dc':
+            return Constraint.Skip
         return model.Flow[l, t] >= -model.LineMax[l]
     model.FlowLimitsLower = Constraint(model.L, model.T, rule=flow_limits_lower_rule)
 
     # Upper bound: Flow cannot exceed LineMax
     def flow_limits_upper_rule(model, l, t):
+        if network == 'dc':
+            return Constraint.Skip
         return model.Flow[l, t] <= model.LineMax[l]
     model.FlowLimitsUpper = Constraint(model.L, model.T, rule=flow_limits_upper_rule)
 
@@ -148,40 +364,71 @@ def define_model(shift_max_percent, shift_max_hours):
             return model.y[g, t] - model.y[g, t-1] == model.u[g, t] - model.v[g, t]
     model.StartupShutdown = Constraint(model.G, model.T, rule=startup_shutdown_rule)
 
+    # Generator clusters: at most Units units on
+    def unit_count_rule(model, g, t):
+        if model.Units[g] == 1:
+            return Constraint.Skip
+        return model.y[g, t] <= model.Units[g]
+    model.UnitCount = Constraint(model.G, model.T, rule=unit_count_rule)
+
     # Minimum up time constraints
+    # (tight: also the windows of the first MUT - 1 hours, cut at hour 1)
     def min_up_time_rule(model, g, t):
-        if t < model.MUT[g]:
+        if t < model.MUT[g] and not tight:
             return Constraint.Skip
-        return sum(model.u[g, k] for k in range(t - int(model.MUT[g]) + 1, t + 1)) <= model.y[g, t]
+        return sum(model.u[g, k] for k in range(max(t - int(model.MUT[g]) + 1, 1), t + 1)) <= model.y[g, t]
     model.MinUpTime = Constraint(model.G, model.T, rule=min_up_time_rule)
 
     # Minimum down time constraints
     def min_down_time_rule(model, g, t):
-        if t < model.MDT[g]:
+        if t < model.MDT[g] and not tight:
             return Constraint.Skip
-        return sum(model.v[g, k] for k in range(t - int(model.MDT[g]) + 1, t + 1)) <= 1 - model.y[g, t]
+        return sum(model.v[g, k] for k in range(max(t - int(model.MDT[g]) + 1, 1), t + 1)) <= model.Units[g] - model.y[g, t]
     model.MinDownTime = Constraint(model.G, model.T, rule=min_down_time_rule)
 
-    # Ramp up limits
+    # Minimum up/down time carried over from before the horizon: a unit that has
+    # been on for UT0 < MUT hours stays on for the remaining MUT - UT0 hours
+    def initial_min_up_time_rule(model, g, t):
+        if model.y0[g] >= 1 and 0 < model.UT0[g] and t <= model.MUT[g] - model.UT0[g]:
+            return model.y[g, t] == model.y0[g]
+        return Constraint.Skip
+    model.InitialMinUpTime = Constraint(model.G, model.T, rule=initial_min_up_time_rule)
+
+    def initial_min_down_time_rule(model, g, t):
+        if model.y0[g] == 0 and 0 < model.DT0[g] and t <= model.MDT[g] - model.DT0[g]:
+            return model.y[g, t] == 0
+        return Constraint.Skip
+    model.InitialMinDownTime = Constraint(model.G, model.T, rule=initial_min_down_time_rule)
+
+    # Ramp up limits (hour 1 ramps from P0, with y0 units on before it)
     def ramp_up_rule(model, g, t):
-        if t == 1:
+        if t == 1 and model.P0[g] is None:
             return Constraint.Skip
-        return model.P[g, t] - model.P[g, t-1] <= model.Rup[g]
+        previous = model.P0[g] if t == 1 else model.P[g, t-1]
+        if tight or model.Units[g] > 1:
+            # Rup while on, SU in a startup hour, nothing while off (per unit
+            # for clusters, where the constant Rup of one unit does not apply)
+            return model.P[g, t] - previous <= model.Rup[g] * model.y[g, t] - (model.Rup[g] - startup_ramp(model, g)) * model.u[g, t]
+        return model.P[g, t] - previous <= model.Rup[g]
     model.RampUp = Constraint(model.G, model.T, rule=ramp_up_rule)
 
     # Ramp down limits
     def ramp_down_rule(model, g, t):
-        if t == 1:
+        if t == 1 and model.P0[g] is None:
             return Constraint.Skip
-        return model.P[g, t-1] - model.P[g, t] <= model.Rdown[g]
+        previous = model.P0[g] if t == 1 else model.P[g, t-1]
+        if tight or model.Units[g] > 1:
+            # Rdown while on, SD in the hour before a shutdown, nothing while off
+            on_before = model.y0[g] if t == 1 else model.y[g, t-1]
+            return previous - model.P[g, t] <= model.Rdown[g] * on_before - (model.Rdown[g] - shutdown_ramp(model, g)) * model.v[g, t]
+        return previous - model.P[g, t] <= model.Rdown[g]
     model.RampDown = Constraint(model.G, model.T, rule=ramp_down_rule)
 
     # Enforce initial conditions (optional if necessary)
+    # (not redundant: it rules out switching in hour 1; presolve removes it.
+    # rolling_horizon.py deactivates it where y0 is a previous window's end state)
     def initial_conditions_rule(model, g):
-        if model.y0[g] == 1:
-            return model.y[g, 1] == 1
-        else:
-            return model.y[g, 1] == 0
+        return model.y[g, 1] == model.y0[g]
     model.InitialConditions = Constraint(model.G, rule=initial_conditions_rule)
 
     # Add Renewables generation constraints
@@ -213,4 +460,33 @@ def define_model(shift_max_percent, shift_max_hours):
 
 
     # --- End of Model Definition ---
-    return model
\ No newline at end of file
+    return model
+
+
+def update_demand_shift(instance, shift_max_percent, shift_max_hours):
+    # Change the demand response settings of an instance in place. Shifts longer
+    # than shift_max_hours are fixed to zero (pairwise) or dropped from the backlog
+    # window (backlog) instead of being removed from the model.
+    if shift_max_hours > instance.shift_window:
+        raise ValueError(f"shift_max_hours={shift_max_hours} exceeds the instance shift window of {value(instance.shift_window)} hours")
+    instance.shift_max_percent.set_value(shift_max_percent)
+    instance.shift_max_hours.set_value(shift_max_hours)
+    if value(instance.dr_formulation) == 'backlog':
+        for j in instance.ShiftLags:
+            instance.shift_lag_active[j].set_value(int(j < shift_max_hours))
+        return
+    for (b, t1, t2) in instance.shift:
+        if abs(t1 - t2) > shift_max_hours:
+            instance.shift[b, t1, t2].fix(0)
+        else:
+            instance.shift[b, t1, t2].unfix()
+
+
+def create_concrete_model(data, shift_max_percent=0, shift_max_hours=0, max_shift_hours=23, dr_formulation='pairwise', num_hours=24,
+                          network='transport', commitment_formulation='basic'):
+    # Build the instance once with the demand-shift window at its largest horizon;
+    # re-solve other (shift_max_percent, shift_max_hours) points via update_demand_shift
+    instance = define_model(shift_max_percent, shift_max_hours, max_shift_hours, dr_formulation, num_hours,
+                            network, commitment_formulation).create_instance(data)
+    update_demand_shift(instance, shift_max_percent, shift_max_hours)
+    return instance